@@ -1,16 +1,26 @@
 import os
+import json
+import uuid
+import base64
+import threading
 from dotenv import load_dotenv
 import psycopg2
-from flask import Flask, jsonify, request
+from flask import Flask, Response, jsonify, request, stream_with_context
 from flask_cors import CORS
+import numpy as np
 import pandas as pd
 from process_weather_data import run_all
-import requests
+from response_cache import cached_response, response_cache
+from schema_catalog import SchemaCatalog
+from db_pool import ThreadSafeConnectionPool
+from downsample import DOWNSAMPLE_METHODS, downsample
+from response_format import columnar_response, compress_response, negotiate_format, vary_on_accept
+from pws_proxy import PWS_BATCH_DEADLINE, PWS_UPSTREAM_TIMEOUT, PWSCurrentCache
 from urllib.parse import urlparse
 
 TWC_API_KEY = os.getenv("WEATHER_API_KEY")  # set this in Render/Vercel env
-PWS_CACHE_TTL = int(os.getenv("PWS_CACHE_TTL", "60"))  # seconds
-_pws_cache = {}  # {station_id: (expires_epoch, payload)}
+# Current observations are cached per station (PWS_CACHE_TTL etc. in pws_proxy.py)
+pws_cache = PWSCurrentCache(TWC_API_KEY)
 
 ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 ENV_PATH = os.path.join(ROOT_DIR, ".env")
@@ -32,20 +42,16 @@ DATABASE_URL = os.getenv("DATABASE_URL")
 print("Loaded DATABASE_URL:", DATABASE_URL)
 app = Flask(__name__)
 CORS(app)
-from psycopg2 import pool
-
+app.after_request(compress_response)
 db_pool = None
+_db_pool_lock = threading.Lock()
 
 def init_db_pool():
     global db_pool
-    if db_pool is None:
-        db_pool = pool.SimpleConnectionPool(
-            minconn=1,
-            maxconn=20,  # Increased pool size
-            dsn=DATABASE_URL
-        )
-        if db_pool:
-            print("✅ Database connection pool created")
+    with _db_pool_lock:
+        if db_pool is None:
+            db_pool = ThreadSafeConnectionPool(dsn=DATABASE_URL)
+            print(f"✅ Database connection pool created (max {db_pool.maxconn})")
 
 def get_pg_connection():
     if db_pool is None:
@@ -56,142 +62,250 @@ def release_pg_connection(conn):
     if db_pool and conn:
         db_pool.putconn(conn)
 
+schema_catalog = SchemaCatalog(pooled_conn)
+
+try:
+    schema_catalog.ensure_loaded()
+except Exception as e:
+    print(f"⚠️ Schema catalog not loaded at startup, will retry on first use: {e}")
+
 def column_exists(table, column):
-    conn = get_pg_connection()
-    try:
-        with conn.cursor() as cur:
-            cur.execute("""
-                SELECT EXISTS (
-                    SELECT 1 FROM information_schema.columns
-                    WHERE table_name = %s AND column_name = %s
-                );
-            """, (table, column))
-            return cur.fetchone()[0]
-    finally:
-        release_pg_connection(conn)
+    return schema_catalog.has_column(table, column)
+
+# Period -> WHERE clause on weather_hourly.local_time. Bounding the scan here lets
+# Postgres use the (station_id, local_time) index instead of reading full history.
+SUMMARY_PERIOD_FILTERS = {
+    "1d": "AND local_time >= NOW() - INTERVAL '1 day'",
+    "7d": "AND local_time >= NOW() - INTERVAL '7 days'",
+    "30d": "AND local_time >= NOW() - INTERVAL '30 days'",
+    "ytd": "AND local_time >= date_trunc('year', NOW()) "
+           "AND local_time < date_trunc('year', NOW()) + INTERVAL '1 year'",
+}
+
+# (json key, SQL aggregate) returned by /api/summary_data
+SUMMARY_AGGREGATES = [
+    ("temp_avg", "AVG(temp_avg)"),
+    ("temp_low", "MIN(temp_avg)"),
+    ("temp_high", "MAX(temp_avg)"),
+    ("humidity_avg", "AVG(humidity_avg)"),
+    ("wind_speed_high", "MAX(wind_speed_avg)"),
+    ("wind_speed_low", "MIN(wind_speed_avg)"),
+    ("wind_speed_avg", "AVG(wind_speed_avg)"),
+    ("wind_gust_max", "MAX(wind_gust_max)"),
+    ("dew_point_avg", "AVG(dew_point_avg)"),
+    ("windchillAvg", "AVG(windchillAvg)"),
+    ("heatindexAvg", "AVG(heatindexAvg)"),
+    ("pressureTrend", "AVG(pressureTrend)"),
+    ("solar_rad_max", "MAX(solar_rad_max)"),
+    ("uv_max", "MAX(uv_max)"),
+    ("precip_total", "SUM(precip_total)"),
+]
+
+def build_summary_query(period):
+    """Single-row aggregate over weather_hourly for one station and period."""
+    select_list = ",\n            ".join(
+        f'{expr} AS "{key}"' for key, expr in SUMMARY_AGGREGATES
+    )
+    return f"""
+        SELECT
+            {select_list}
+        FROM weather_hourly
+        WHERE station_id = %s
+        {SUMMARY_PERIOD_FILTERS.get(period, "")}
+    """
+
+def fetch_summary(conn, station_id, period):
+    with conn.cursor() as cur:
+        cur.execute(build_summary_query(period), (station_id,))
+        row = cur.fetchone()
+
+    summary = {
+        key: round(float(value), 2) if value is not None else None
+        for (key, _), value in zip(SUMMARY_AGGREGATES, row)
+    }
+    summary["precipRate"] = 0.0
+    # SUM over zero rows is NULL in SQL but 0 in pandas
+    if summary["precip_total"] is None:
+        summary["precip_total"] = 0.0
+    return summary
 
 @app.route("/api/summary_data")
+@cached_response(tables=("weather_hourly",))
 def get_summary_data():
     station_id = request.args.get("station_id")
     period = request.args.get("period", "1d")
-    conn = get_pg_connection()
-    try:
-        df = pd.read_sql_query(
-            "SELECT * FROM weather_hourly WHERE station_id = %s",
-            conn,
-            params=(station_id,)
-        )
-    finally:
-        release_pg_connection(conn)
-
-    df["local_time"] = pd.to_datetime(df["local_time"])
-    df = df.sort_values("local_time")
+    with pooled_conn() as conn:
+        summary = fetch_summary(conn, station_id, period)
 
-    now = pd.Timestamp.now()
-    if period == "1d":
-        df = df[df["local_time"] >= now - pd.Timedelta(days=1)]
-    elif period == "7d":
-        df = df[df["local_time"] >= now - pd.Timedelta(days=7)]
-    elif period == "30d":
-        df = df[df["local_time"] >= now - pd.Timedelta(days=30)]
-    elif period == "ytd":
-        df = df[df["local_time"].dt.year == now.year]
+    return jsonify(summary)
 
-    summary = {
-        "temp_avg": round(df["temp_avg"].mean(skipna=True), 2),
-        "temp_low": round(df["temp_avg"].min(skipna=True), 2),
-        "temp_high": round(df["temp_avg"].max(skipna=True), 2),
-        "humidity_avg": round(df["humidity_avg"].mean(skipna=True), 2),
-        "wind_speed_high": round(df["wind_speed_avg"].max(skipna=True), 2),
-        "wind_speed_low": round(df["wind_speed_avg"].min(skipna=True), 2),
-        "wind_speed_avg": round(df["wind_speed_avg"].mean(skipna=True), 2),
-        "wind_gust_max": round(df["wind_gust_max"].max(skipna=True), 2),
-        "dew_point_avg": round(df["dew_point_avg"].mean(skipna=True), 2),
-        "windchillAvg": round(df["windchillAvg"].mean(skipna=True), 2),
-        "heatindexAvg": round(df["heatindexAvg"].mean(skipna=True), 2),
-        "pressureTrend": round(df["pressureTrend"].mean(skipna=True), 2),
-        "solar_rad_max": round(df["solar_rad_max"].max(skipna=True), 2),
-        "uv_max": round(df["uv_max"].max(skipna=True), 2),
-        "precipRate": 0.0,
-        "precip_total": round(df["precip_total"].sum(skipna=True), 2)
-    }
+# Period -> (table, timestamp column, days of history) for the graph endpoints
+GRAPH_PERIODS = {
+    "1d": ("weather_hourly", "hour", 1),
+    "7d": ("weather_hourly", "local_time", 7),
+    "30d": ("weather_daily", "date", 30),
+    "ytd": ("weather_daily", "date", 365),
+}
 
-    return jsonify(summary)
+def thin_series(df, columns, max_points, method):
+    """
+    Downsample one series frame (ts + value columns) to at most max_points rows.
+    Each column gets an equal share of the budget and the kept rows are the
+    union, so every column keeps its own peaks on a shared time axis. Callers
+    make sure every column's share is at least 3 points.
+    """
+    if not max_points or len(df) <= max_points:
+        return df
+    x = df["ts"].astype("int64").to_numpy()
+    budget = max_points // len(columns)
+    keep = [downsample(x, pd.to_numeric(df[col], errors="coerce").to_numpy(dtype="float64"), budget, method)
+            for col in columns]
+    return df.iloc[np.unique(np.concatenate(keep))]
 
 @app.route("/api/graph_data")
+@cached_response(tables=("weather_hourly", "weather_daily"))
 def get_graph_data():
     station_ids_param = request.args.get("station_id") or request.args.get("station_ids")
     period = request.args.get("period", "1d")
     column = request.args.get("column", "temp_avg")
+    max_points = request.args.get("max_points", type=int)
+    method = request.args.get("downsample", "minmax")
 
     print(f"📊 Request received: station_ids={station_ids_param}, period={period}, column={column}")
 
     if not station_ids_param or not column:
         return jsonify({"error": "Missing required parameters"}), 400
 
+    if max_points is not None and max_points < 3:
+        return jsonify({"error": "max_points must be at least 3"}), 400
+    if method not in DOWNSAMPLE_METHODS:
+        return jsonify({"error": f"Invalid downsample method '{method}'"}), 400
+
     station_ids = station_ids_param.split(",")
 
-    if period == "1d":
-        table = "weather_hourly"
-        timestamp_field = "hour"
-        days_back = 1
-    elif period == "7d":
-        table = "weather_hourly"
-        timestamp_field = "local_time"
-        days_back = 7
-    elif period in ["30d", "ytd"]:
-        table = "weather_daily"
-        timestamp_field = "date"
-        days_back = 30 if period == "30d" else 365
-    else:
+    if period not in GRAPH_PERIODS:
         return jsonify({"error": "Invalid period"}), 400
+    table, timestamp_field, days_back = GRAPH_PERIODS[period]
 
     if not column_exists(table, column):
         return jsonify({"error": f"Invalid column '{column}' for table '{table}'"}), 400
 
-    conn = get_pg_connection()
     try:
-        if len(station_ids) == 1:
-            df = pd.read_sql_query(
-                f"""
-                SELECT {timestamp_field} AS ts, {column}
-                FROM {table}
-                WHERE station_id = %s AND {timestamp_field} >= NOW() - INTERVAL '{days_back} days'
-                ORDER BY {timestamp_field}
-                """,
-                conn,
-                params=(station_ids[0],)
-            )
-        else:
-            station_placeholders = ",".join(["%s"] * len(station_ids))
+        with pooled_conn() as conn:
+            if len(station_ids) == 1:
+                df = pd.read_sql_query(
+                    f"""
+                    SELECT {timestamp_field} AS ts, {column}
+                    FROM {table}
+                    WHERE station_id = %s AND {timestamp_field} >= NOW() - INTERVAL '{days_back} days'
+                    ORDER BY {timestamp_field}
+                    """,
+                    conn,
+                    params=(station_ids[0],)
+                )
+            else:
+                station_placeholders = ",".join(["%s"] * len(station_ids))
+                df = pd.read_sql_query(
+                    f"""
+                    SELECT {timestamp_field} AS ts, AVG({column}) AS {column}
+                    FROM {table}
+                    WHERE station_id IN ({station_placeholders})
+                      AND {timestamp_field} >= NOW() - INTERVAL '{days_back} days'
+                    GROUP BY {timestamp_field}
+                    ORDER BY {timestamp_field}
+                    """,
+                    conn,
+                    params=station_ids
+                )
+
+        fmt = negotiate_format()
+        if df.empty and fmt == "records":
+            return vary_on_accept(jsonify({"timestamps": [], "values": []}))
+
+        df["ts"] = pd.to_datetime(df["ts"])
+        # Thin the series server-side; min/max buckets keep peaks, lttb keeps the shape
+        df = thin_series(df, [column], max_points, method)
+        if fmt != "records":
+            return columnar_response(df[["ts", column]], "ts", fmt)
+        return vary_on_accept(jsonify({
+            "timestamps": df["ts"].dt.strftime("%Y-%m-%d %H:%M").tolist(),
+            "values": df[column].where(pd.notnull(df[column]), None).tolist()
+        }))
+    except Exception as e:
+        import traceback
+        print(f"❌ Error loading graph data: {e}")
+        traceback.print_exc()
+        return jsonify({"error": f"Internal server error: {str(e)}"}), 500
+
+@app.route("/api/graph_batch")
+@cached_response(tables=("weather_hourly", "weather_daily"))
+def get_graph_batch():
+    """
+    Several columns for several stations from one time-bounded scan, e.g.
+    /api/graph_batch?station_ids=A,B&columns=temp_avg,wind_gust_max&period=7d
+
+    Each station's series come back side by side on their own time axis:
+    {"period": ..., "columns": [...], "series": {station: {"timestamps": [...],
+    "values": {column: [...]}}}}
+    """
+    station_ids = [s for s in (request.args.get("station_ids") or request.args.get("station_id") or "").split(",") if s]
+    columns = [c for c in (request.args.get("columns") or request.args.get("column") or "").split(",") if c]
+    period = request.args.get("period", "1d")
+    max_points = request.args.get("max_points", type=int)
+    method = request.args.get("downsample", "minmax")
+
+    if not station_ids or not columns:
+        return jsonify({"error": "Missing required parameters"}), 400
+    if period not in GRAPH_PERIODS:
+        return jsonify({"error": "Invalid period"}), 400
+    if max_points is not None and max_points < 3:
+        return jsonify({"error": "max_points must be at least 3"}), 400
+    if method not in DOWNSAMPLE_METHODS:
+        return jsonify({"error": f"Invalid downsample method '{method}'"}), 400
+
+    table, timestamp_field, days_back = GRAPH_PERIODS[period]
+    # station_id and the timestamp are always selected as keys; asking for them as values would duplicate them
+    key_columns = {"station_id", timestamp_field, "ts"}
+    columns = [c for c in dict.fromkeys(columns) if c not in key_columns]
+    if not columns:
+        return jsonify({"error": "No value columns requested (station_id and the timestamp are always included)"}), 400
+    if max_points is not None and max_points < 3 * len(columns):
+        # Each column's share has to keep its endpoints and an extreme, or the union overshoots max_points
+        return jsonify({"error": f"max_points must be at least 3 per column ({3 * len(columns)})"}), 400
+    invalid = [c for c in columns if not column_exists(table, c)]
+    if invalid:
+        return jsonify({"error": f"Invalid column(s) {', '.join(invalid)} for table '{table}'"}), 400
+
+    station_placeholders = ",".join(["%s"] * len(station_ids))
+    try:
+        with pooled_conn() as conn:
             df = pd.read_sql_query(
                 f"""
-                SELECT {timestamp_field} AS ts, AVG({column}) AS {column}
+                SELECT station_id, {timestamp_field} AS ts, {", ".join(columns)}
                 FROM {table}
                 WHERE station_id IN ({station_placeholders})
                   AND {timestamp_field} >= NOW() - INTERVAL '{days_back} days'
-                GROUP BY {timestamp_field}
-                ORDER BY {timestamp_field}
+                ORDER BY station_id, {timestamp_field}
                 """,
                 conn,
                 params=station_ids
             )
 
-        if df.empty:
-            return jsonify({"timestamps": [], "values": []})
-
         df["ts"] = pd.to_datetime(df["ts"])
-        return jsonify({
-            "timestamps": df["ts"].dt.strftime("%Y-%m-%d %H:%M").tolist(),
-            "values": df[column].where(pd.notnull(df[column]), None).tolist()
-        })
+        groups = dict(tuple(df.groupby("station_id", sort=False)))
+        series = {}
+        for station_id in station_ids:
+            station_df = thin_series(groups.get(station_id, df.iloc[0:0]), columns, max_points, method)
+            series[station_id] = {
+                "timestamps": station_df["ts"].dt.strftime("%Y-%m-%d %H:%M").tolist(),
+                "values": {c: station_df[c].where(pd.notnull(station_df[c]), None).tolist() for c in columns},
+            }
+        return jsonify({"period": period, "columns": columns, "series": series})
     except Exception as e:
         import traceback
-        print(f"❌ Error loading graph data: {e}")
+        print(f"❌ Error loading graph batch: {e}")
         traceback.print_exc()
         return jsonify({"error": f"Internal server error: {str(e)}"}), 500
-    finally:
-        release_pg_connection(conn)
 
 @app.route("/api/pws_current")
 def pws_current():
@@ -201,126 +315,210 @@ def pws_current():
     if not TWC_API_KEY:
         return jsonify({"error": "TWC_API_KEY not configured"}), 500
 
-    url = "https://api.weather.com/v2/pws/observations/current"
-    params = {
-        "stationId": station_id,
-        "format": "json",
-        "units": "e",                 # e = English (°F, mph, inHg, inches)
-        "numericPrecision": "decimal",
-        "apiKey": TWC_API_KEY,
-    }
+    result, status = pws_cache.get(station_id)
+    return jsonify(result), status
 
-    try:
-        r = requests.get(url, params=params, timeout=8)
-        # Some stations return 204 or 200 with empty observations when >60 min old
-        if r.status_code == 204:
-            return jsonify({"expired": True, "message": "No recent observation"}), 200
-
-        r.raise_for_status()
-        payload = r.json()
-
-        obs_list = payload.get("observations") or []
-        if not obs_list:
-            # TWC returns no obs when data is older than 60min (“data expired” case)
-            return jsonify({"expired": True, "message": "No recent observation"}), 200
-
-        obs = obs_list[0]
-        imp = obs.get("imperial", {})  # because we requested units=e
-        result = {
-            "station_id": obs.get("stationID"),
-            "timestamp_local": obs.get("obsTimeLocal"),
-            "timestamp_utc": obs.get("obsTimeUtc"),
-            "humidity": obs.get("humidity"),
-            "uv": obs.get("uv"),
-            "solar_radiation": obs.get("solarRadiation"),
-            "wind_dir": obs.get("winddir"),
-            # imperial block
-            "temp": imp.get("temp"),
-            "dew_point": imp.get("dewpt"),
-            "wind_speed": imp.get("windSpeed"),
-            "wind_gust": imp.get("windGust"),
-            "wind_chill": imp.get("windChill"),
-            "heat_index": imp.get("heatIndex"),
-            "pressure": imp.get("pressure"),
-            "precip": imp.get("precipRate"),
-            "precip_total": imp.get("precipTotal"),
-            "elev": imp.get("elev"),
-            # flags
-            "expired": False,
-            "fallback": False,
-        }
-        return jsonify(result)
-    except requests.HTTPError as e:
-        return jsonify({"error": "TWC HTTP error", "detail": str(e), "expired": True}), 200
-    except Exception as e:
-        return jsonify({"error": "Upstream error", "detail": str(e)}), 502
+# Upper bound on stations per /api/pws_current_batch call
+PWS_BATCH_MAX_STATIONS = int(os.getenv("PWS_BATCH_MAX_STATIONS", "25"))
+
+@app.route("/api/pws_current_batch")
+def pws_current_batch():
+    """
+    Current conditions for several stations in one call:
+    /api/pws_current_batch?station_ids=A,B[&deadline=3]
+
+    Always 200 with whatever could be had in time. Each station carries its
+    own expired/fallback flags (and error, if there was nothing to show).
+    """
+    station_ids = [s for s in (request.args.get("station_ids") or request.args.get("station_id") or "").split(",") if s]
+    if not station_ids:
+        return jsonify({"error": "Missing station_ids"}), 400
+    if len(station_ids) > PWS_BATCH_MAX_STATIONS:
+        return jsonify({"error": f"At most {PWS_BATCH_MAX_STATIONS} stations per request"}), 400
+    if not TWC_API_KEY:
+        return jsonify({"error": "TWC_API_KEY not configured"}), 500
+    deadline = min(request.args.get("deadline", default=PWS_BATCH_DEADLINE, type=float), PWS_UPSTREAM_TIMEOUT)
+
+    stations = {}
+    for station_id, (result, status) in pws_cache.get_many(station_ids, deadline).items():
+        stations[station_id] = {"expired": False, "fallback": False, **result, "status": status}
+    complete = all(s["status"] == 200 and "error" not in s for s in stations.values())
+    return jsonify({"stations": stations, "complete": complete})
+
+@app.route("/api/pws_current/stats")
+def get_pws_current_stats():
+    return jsonify(pws_cache.stats())
+
+# Rows per /api/table_data page when neither page_size nor limit is given, and the cap
+TABLE_PAGE_SIZE = int(os.getenv("TABLE_PAGE_SIZE", "100"))
+TABLE_MAX_PAGE_SIZE = int(os.getenv("TABLE_MAX_PAGE_SIZE", "5000"))
+# Rows fetched per round trip by the server-side cursor behind stream=1
+TABLE_STREAM_CHUNK = int(os.getenv("TABLE_STREAM_CHUNK", "2000"))
+
+def encode_cursor(local_time, station_id):
+    """Opaque keyset cursor for the row after (local_time, station_id) in table order."""
+    raw = json.dumps([pd.Timestamp(local_time).isoformat(), station_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(token):
+    raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+    local_time, station_id = json.loads(raw)
+    return pd.Timestamp(local_time).to_pydatetime(), str(station_id)
+
+def build_table_query(station_ids, columns, hours=None, after=None, limit=None):
+    """
+    Newest-first rows ordered on (local_time, station_id). `after` is a decoded
+    cursor that continues from the last row instead of an OFFSET that rescans
+    skipped rows. The row-value comparison leads with local_time, so the
+    (station_id, local_time) index can't seek on it; the redundant
+    `local_time <= %s` bound is what lets that index range-scan each station,
+    and the row comparison only settles ties at the cursor's timestamp.
+    """
+    placeholders = ",".join(["%s"] * len(station_ids))
+    sql = f"""
+        SELECT {", ".join(columns)}
+        FROM weather_hourly
+        WHERE station_id IN ({placeholders})
+    """
+    params = list(station_ids)
+    if hours:
+        sql += " AND local_time >= NOW() - INTERVAL %s"
+        params.append(f"{int(hours)} hours")
+    if after:
+        sql += " AND local_time <= %s AND (local_time, station_id) < (%s, %s)"
+        params.extend([after[0], *after])
+    sql += " ORDER BY local_time DESC, station_id DESC"
+    if limit:
+        sql += " LIMIT %s"
+        params.append(int(limit))
+    return sql, params
+
+def _stream_rows(cur, columns):
+    """Chunks of {"rows": [...]} JSON from a server-side cursor, TABLE_STREAM_CHUNK rows at a time."""
+    yield '{"rows": ['
+    first = True
+    while True:
+        batch = cur.fetchmany(TABLE_STREAM_CHUNK)
+        if not batch:
+            break
+        # Same JSON provider as jsonify, one call per chunk rather than per row
+        chunk = app.json.dumps([dict(zip(columns, row)) for row in batch])[1:-1]
+        yield chunk if first else "," + chunk
+        first = False
+    yield "]}"
 
 @app.route("/api/table_data")
+@cached_response(tables=("weather_hourly",))
 def get_table_data():
     """
-    Returns recent rows for one or more stations.
+    Returns recent rows for one or more stations, newest first, one page at a time.
     Query params:
       - station_id (or station_ids=ID1,ID2)
-      - hours: integer (e.g., 24, 48) -> returns rows where local_time >= now - hours
-      - limit: integer (fallback if 'hours' not provided) -> returns last N rows ordered by time desc
+      - hours: integer (e.g., 24, 48) -> returns rows where local_time >= now - hours.
+        Without page_size/limit/cursor the whole window comes back in one page
+        (next_cursor null), as it did before paging existed
+      - limit / page_size: rows per page (default TABLE_PAGE_SIZE)
+      - cursor: next_cursor from the previous page
+      - columns: comma-separated projection (default: every weather_hourly column)
+      - stream=1: the whole window as one chunked response read through a
+        server-side cursor, instead of a page
+      - format=columnar, or Accept: application/msgpack / application/vnd.apache.arrow.stream,
+        for column arrays keyed by local_time epoch seconds instead of one dict per row.
+        next_cursor is in the body (JSON-encoded under the Arrow schema metadata
+        key "next_cursor") and in the X-Next-Cursor header
     """
     station_ids_param = request.args.get("station_id") or request.args.get("station_ids")
     if not station_ids_param:
         return jsonify({"error": "Missing station_id(s)"}), 400
 
     station_ids = station_ids_param.split(",")
-    hours = request.args.get("hours")
-    limit = request.args.get("limit", "100")  # default last 100 rows
+    hours = request.args.get("hours", type=int)
+    page_size_arg = request.args.get("page_size", type=int) or request.args.get("limit", type=int)
+    page_size = max(1, min(page_size_arg or TABLE_PAGE_SIZE, TABLE_MAX_PAGE_SIZE))
+    # Existing hours=N callers (no page_size/limit/cursor) keep getting the full window
+    paged = not hours or page_size_arg is not None or bool(request.args.get("cursor"))
+    stream = request.args.get("stream") == "1"
+
+    requested = [c for c in (request.args.get("columns") or "").split(",") if c]
+    columns = requested or schema_catalog.columns("weather_hourly")
+    invalid = [c for c in columns if not column_exists("weather_hourly", c)]
+    if invalid or not columns:
+        return jsonify({"error": f"Invalid column(s) {', '.join(invalid)} for table 'weather_hourly'"}), 400
+    # The cursor keys on these, so they are always selected
+    columns = list(dict.fromkeys(["local_time", "station_id"] + columns))
+
+    after = None
+    if request.args.get("cursor"):
+        try:
+            after = decode_cursor(request.args["cursor"])
+        except (ValueError, TypeError):
+            return jsonify({"error": "Invalid cursor"}), 400
+
+    if stream:
+        # Without hours the window is the last `limit` rows, as in page mode
+        sql, params = build_table_query(station_ids, columns, hours, after,
+                                        limit=None if hours else page_size)
+        conn = get_pg_connection()
+        try:
+            cur = conn.cursor(name=f"table_stream_{uuid.uuid4().hex}")
+            cur.itersize = TABLE_STREAM_CHUNK
+            cur.execute(sql, params)
+        except Exception as e:
+            release_pg_connection(conn)
+            print("❌ Error fetching table data:", e)
+            return jsonify({"error": "Internal server error"}), 500
+
+        response = Response(stream_with_context(_stream_rows(cur, columns)), mimetype="application/json")
+
+        def _close():
+            try:
+                cur.close()
+            except psycopg2.Error:
+                pass
+            release_pg_connection(conn)
+
+        # Runs however the response ends (finished, client gone, never iterated)
+        response.call_on_close(_close)
+        return response
 
     try:
+        # One extra row tells us whether there is a next page
+        sql, params = build_table_query(station_ids, columns, hours, after,
+                                        limit=page_size + 1 if paged else None)
         with pooled_conn() as conn:
-            placeholders = ",".join(["%s"] * len(station_ids))
-
-            if hours:
-                # Filter by last X hours
-                sql = f"""
-                    SELECT *
-                    FROM weather_hourly
-                    WHERE station_id IN ({placeholders})
-                      AND local_time >= NOW() - INTERVAL %s
-                    ORDER BY local_time DESC
-                """
-                params = station_ids + [f"{int(hours)} hours"]
-            else:
-                # Return last N rows
-                sql = f"""
-                    SELECT *
-                    FROM weather_hourly
-                    WHERE station_id IN ({placeholders})
-                    ORDER BY local_time DESC
-                    LIMIT %s
-                """
-                params = station_ids + [int(limit)]
-
-            df = pd.read_sql_query(sql, conn, params=params)
-
-        return jsonify({"rows": df.to_dict(orient="records")})
+            with conn.cursor() as cur:
+                cur.execute(sql, params)
+                rows = cur.fetchall()
+
+        next_cursor = None
+        if paged and len(rows) > page_size:
+            rows = rows[:page_size]
+            next_cursor = encode_cursor(rows[-1][0], rows[-1][1])
+        df = pd.DataFrame(rows, columns=columns)
+
+        fmt = negotiate_format()
+        if fmt != "records":
+            response = columnar_response(df, "local_time", fmt, extra={"next_cursor": next_cursor})
+        else:
+            response = vary_on_accept(jsonify({"rows": df.to_dict(orient="records"), "next_cursor": next_cursor}))
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
+        return response
     except Exception as e:
         print("❌ Error fetching table data:", e)
         return jsonify({"error": "Internal server error"}), 500
 
+@app.route("/api/cache/stats")
+def get_cache_stats():
+    return jsonify(response_cache.stats())
+
 @app.route("/api/debug/weather_daily_columns")
 def get_weather_daily_columns():
-    conn = get_pg_connection()
     try:
-        with conn.cursor() as cur:
-            cur.execute("""
-                SELECT column_name
-                FROM information_schema.columns
-                WHERE table_name = 'weather_hourly';
-            """)
-            columns = [row[0] for row in cur.fetchall()]
-        return jsonify({"columns": columns})
+        return jsonify({"columns": schema_catalog.columns("weather_hourly")})
     except Exception as e:
         print(f"❌ Error in get_weather_daily_columns: {e}")
         return jsonify({"error": "Failed to fetch columns"}), 500
-    finally:
-        release_pg_connection(conn)
 
 @app.route("/api/generate_summary")
 def generate_summary():
@@ -336,13 +534,16 @@ def generate_summary():
 
 @app.route("/api/test_db")
 def test_db():
-    conn = get_pg_connection()
-    try:
+    with pooled_conn() as conn:
         with conn.cursor() as cur:
             cur.execute("SELECT 1;")
             return jsonify({"results": cur.fetchone()[0]})
-    finally:
-        release_pg_connection(conn)
+
+@app.route("/api/debug/pool_stats")
+def get_pool_stats():
+    if db_pool is None:
+        return jsonify({"initialized": False})
+    return jsonify(dict(db_pool.stats(), initialized=True))
 
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", 5000))
@@ -0,0 +1,82 @@
+"""
+Serialisation cost and bytes on the wire of the /api/table_data response formats,
+on a synthetic weather_hourly frame (no database needed).
+
+    python benchmarks/bench_response_format.py [rows]      # from backend/
+
+Compares the legacy records JSON (to_dict(orient="records") + jsonify) with the
+columnar JSON, MessagePack and Arrow IPC encodings in response_format.py, and
+the size of each after gzip and brotli.
+"""
+import os
+import sys
+import gzip
+import time
+
+import numpy as np
+import pandas as pd
+from flask import Flask, jsonify
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from response_format import (columnar_response, brotli, msgpack,  # noqa: E402
+                             RESPONSE_BROTLI_QUALITY, RESPONSE_GZIP_LEVEL)
+
+REPEATS = 3
+MEASURES = [
+    "temp_avg", "temp_min", "temp_max", "humidity_avg", "humidity_min", "humidity_max",
+    "wind_speed_avg", "wind_speed_min", "wind_speed_max", "wind_gust_max", "dew_point_avg",
+    "windchill_avg", "heatindex_avg", "pressure_max", "pressure_min", "pressure_avg", "precip_total",
+]
+
+def synthetic_hourly(rows):
+    rnd = np.random.default_rng(0)
+    local_time = pd.date_range("2024-01-01", periods=rows, freq="h")
+    df = pd.DataFrame({
+        "station_id": "KBENCH1",
+        "hour": local_time.strftime("%Y-%m-%d %H:00:00"),
+        "local_time": local_time,
+        "day": local_time.strftime("%Y-%m-%d"),
+    })
+    for col in MEASURES:
+        values = rnd.normal(50, 15, rows).round(2)
+        values[rnd.random(rows) < 0.02] = np.nan
+        df[col] = values
+    return df
+
+def timed(fn):
+    best = float("inf")
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        body = fn()
+        best = min(best, time.perf_counter() - start)
+    return body, best
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    df = synthetic_hourly(rows)
+    app = Flask(__name__)
+
+    encoders = {
+        "records json": lambda: jsonify({"rows": df.to_dict(orient="records")}).get_data(),
+        "columnar json": lambda: columnar_response(df, "local_time", "columnar").get_data(),
+    }
+    if msgpack is not None:
+        encoders["msgpack"] = lambda: columnar_response(df, "local_time", "msgpack").get_data()
+    encoders["arrow ipc"] = lambda: columnar_response(df, "local_time", "arrow").get_data()
+
+    print(f"{rows:,} rows x {len(df.columns)} columns")
+    print(f"{'format':<15} {'encode':>9} {'raw':>11} {'gzip':>11} {'brotli':>11}")
+    with app.test_request_context():
+        for name, encode in encoders.items():
+            try:
+                body, seconds = timed(encode)
+            except ImportError as e:
+                print(f"{name:<15} skipped ({e})")
+                continue
+            gz = len(gzip.compress(body, compresslevel=RESPONSE_GZIP_LEVEL))
+            br = len(brotli.compress(body, quality=RESPONSE_BROTLI_QUALITY)) if brotli is not None else None
+            print(f"{name:<15} {seconds * 1000:7.1f}ms {len(body):>11,} {gz:>11,} "
+                  f"{br if br is None else format(br, ','):>11}")
+
+if __name__ == "__main__":
+    main()
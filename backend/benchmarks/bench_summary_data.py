@@ -0,0 +1,89 @@
+"""
+Latency of /api/summary_data as station history grows.
+
+Seeds a session-local TEMP weather_hourly (it shadows the real table, nothing is
+written to it) with 1..N years of synthetic hourly rows, then times the old
+pandas full-history path against the single-row SQL aggregate in app.py.
+
+    python benchmarks/bench_summary_data.py            # from backend/
+"""
+import os
+import sys
+import time
+import statistics
+
+import pandas as pd
+import psycopg2
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from app import DATABASE_URL, fetch_summary  # noqa: E402
+
+STATION = "BENCH001"
+YEARS = [1, 2, 5, 10]
+PERIODS = ["1d", "7d", "30d", "ytd"]
+REPEATS = 5
+
+def seed(conn, years):
+    with conn.cursor() as cur:
+        cur.execute("DROP TABLE IF EXISTS pg_temp.weather_hourly;")
+        cur.execute("""
+            CREATE TEMP TABLE weather_hourly (
+                station_id TEXT, local_time TIMESTAMP,
+                temp_avg REAL, humidity_avg REAL, wind_speed_avg REAL,
+                wind_gust_max REAL, dew_point_avg REAL, windchillAvg REAL,
+                heatindexAvg REAL, pressureTrend REAL, solar_rad_max REAL,
+                uv_max REAL, precip_total REAL
+            );
+        """)
+        cur.execute("""
+            INSERT INTO weather_hourly
+            SELECT %s, ts,
+                   50 + 20 * random(), 60 + 30 * random(), 10 * random(),
+                   25 * random(), 40 + 10 * random(), 45 + 5 * random(),
+                   55 + 5 * random(), random() - 0.5, 800 * random(),
+                   10 * random(), 0.1 * random()
+            FROM generate_series(
+                date_trunc('hour', NOW()) - make_interval(years => %s),
+                date_trunc('hour', NOW()),
+                INTERVAL '1 hour'
+            ) AS ts;
+        """, (STATION, years))
+        cur.execute("CREATE INDEX ON weather_hourly (station_id, local_time);")
+        cur.execute("ANALYZE weather_hourly;")
+    conn.commit()
+
+def legacy_summary(conn, period):
+    df = pd.read_sql_query(
+        "SELECT * FROM weather_hourly WHERE station_id = %s", conn, params=(STATION,)
+    )
+    df["local_time"] = pd.to_datetime(df["local_time"])
+    now = pd.Timestamp.now()
+    if period == "ytd":
+        df = df[df["local_time"].dt.year == now.year]
+    else:
+        df = df[df["local_time"] >= now - pd.Timedelta(days=int(period[:-1]))]
+    return df["temp_avg"].mean()
+
+def time_ms(fn):
+    samples = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+def main():
+    conn = psycopg2.connect(DATABASE_URL)
+    try:
+        print(f"{'years':>5} {'period':>6} {'legacy ms':>10} {'sql ms':>8}")
+        for years in YEARS:
+            seed(conn, years)
+            for period in PERIODS:
+                legacy = time_ms(lambda: legacy_summary(conn, period))
+                pushed = time_ms(lambda: fetch_summary(conn, STATION, period))
+                print(f"{years:>5} {period:>6} {legacy:>10.1f} {pushed:>8.1f}")
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Per-element vs array unit conversion for noa_avc_data_fetch.to_pws_metrics, on a
+synthetic year of 10-minute buoy observations (no network needed).
+
+    python benchmarks/bench_unit_conversion.py [rows]      # from backend/
+
+"per-element" is the old path: Series.apply() with the scalar helpers plus a
+list comprehension over rh_from_t_and_td. "array" is the same work through
+fetch/unit_kernels.py. Both must agree before the timings are printed.
+"""
+import os
+import sys
+import math
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "fetch")))
+import unit_kernels as kernels  # noqa: E402
+
+REPEATS = 3
+ROWS_PER_YEAR = 365 * 24 * 6
+
+# The scalar helpers as they were before unit_kernels
+def legacy_c_to_f(c):
+    return None if c is None or pd.isna(c) else (c * 9/5 + 32)
+
+def legacy_ms_to_mph(v):
+    return None if v is None or pd.isna(v) else (v * 2.236936)
+
+def legacy_hpa_to_inhg(v):
+    return None if v is None or pd.isna(v) else (v / 33.8639)
+
+def legacy_rh(temp_c, dewpoint_c):
+    if temp_c is None or dewpoint_c is None or pd.isna(temp_c) or pd.isna(dewpoint_c):
+        return None
+    a, b = 17.625, 243.04
+    rh = 100.0 * (math.exp(a * dewpoint_c / (b + dewpoint_c)) / math.exp(a * temp_c / (b + temp_c)))
+    return max(0.0, min(100.0, rh))
+
+def synthetic_buoy(rows):
+    rnd = np.random.default_rng(0)
+    df = pd.DataFrame({"time_utc": pd.date_range("2024-01-01", periods=rows, freq="10min", tz="UTC")})
+    df["temp_c"] = rnd.normal(12, 4, rows)
+    df["dewpoint_c"] = df["temp_c"] - np.abs(rnd.normal(2, 2, rows))
+    df["wind_mps"] = np.abs(rnd.normal(6, 3, rows))
+    df["gust_mps"] = df["wind_mps"] * 1.3
+    df["pressure_hpa"] = rnd.normal(1015, 8, rows)
+    df["sea_temp_c"] = rnd.normal(11, 2, rows)
+    for col in df.columns[1:]:
+        df.loc[rnd.random(rows) < 0.03, col] = np.nan  # NDBC "missing" codes after coercion
+    return df
+
+def per_element(df):
+    return {
+        "humidity": pd.Series([legacy_rh(t, d) for t, d in zip(df["temp_c"], df["dewpoint_c"])],
+                              index=df.index, dtype=float),
+        "temp_f": df["temp_c"].apply(legacy_c_to_f),
+        "dew_point_f": df["dewpoint_c"].apply(legacy_c_to_f),
+        "wind_mph": df["wind_mps"].apply(legacy_ms_to_mph),
+        "gust_mph": df["gust_mps"].apply(legacy_ms_to_mph),
+        "pressure_inhg": df["pressure_hpa"].apply(legacy_hpa_to_inhg),
+        "sea_temp_f": df["sea_temp_c"].apply(legacy_c_to_f),
+    }
+
+def array(df):
+    return {
+        "humidity": kernels.rh_from_t_and_td(df["temp_c"], df["dewpoint_c"]),
+        "temp_f": kernels.c_to_f(df["temp_c"]),
+        "dew_point_f": kernels.c_to_f(df["dewpoint_c"]),
+        "wind_mph": kernels.ms_to_mph(df["wind_mps"]),
+        "gust_mph": kernels.ms_to_mph(df["gust_mps"]),
+        "pressure_inhg": kernels.hpa_to_inhg(df["pressure_hpa"]),
+        "sea_temp_f": kernels.c_to_f(df["sea_temp_c"]),
+    }
+
+def timed(fn, df):
+    best = float("inf")
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        out = fn(df)
+        best = min(best, time.perf_counter() - start)
+    return out, best
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else ROWS_PER_YEAR
+    df = synthetic_buoy(rows)
+
+    slow, slow_s = timed(per_element, df)
+    fast, fast_s = timed(array, df)
+    for name in slow:
+        expected = slow[name].astype(float).to_numpy()
+        np.testing.assert_allclose(fast[name].to_numpy(), expected, rtol=1e-12, equal_nan=True, err_msg=name)
+
+    print(f"{rows:,} rows x {len(slow)} derived columns")
+    print(f"per-element  {slow_s * 1000:8.1f}ms")
+    print(f"array        {fast_s * 1000:8.1f}ms   ({slow_s / fast_s:.0f}x faster)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+import os
+import threading
+import time
+
+import psycopg2
+from psycopg2 import extensions
+from psycopg2.pool import PoolError
+
+DB_POOL_MINCONN = int(os.getenv("DB_POOL_MINCONN", "1"))
+DB_POOL_MAXCONN = int(os.getenv("DB_POOL_MAXCONN", "20"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "5"))  # seconds to wait for a free connection
+# Connections idle longer than this get a `SELECT 1` before being handed out
+DB_POOL_HEALTHCHECK_IDLE = float(os.getenv("DB_POOL_HEALTHCHECK_IDLE", "30"))
+
+
+class PoolTimeout(PoolError):
+    """No connection became free within the checkout timeout."""
+
+
+class ThreadSafeConnectionPool:
+    """
+    psycopg2 connection pool that is safe to share between threads (gunicorn
+    --threads), waits up to `timeout` seconds for a connection instead of raising
+    immediately, and replaces dead connections on checkout.
+    """
+
+    def __init__(self, dsn, minconn=DB_POOL_MINCONN, maxconn=DB_POOL_MAXCONN,
+                 timeout=DB_POOL_TIMEOUT, healthcheck_idle=DB_POOL_HEALTHCHECK_IDLE):
+        self.dsn = dsn
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.timeout = timeout
+        self.healthcheck_idle = healthcheck_idle
+
+        self._idle = []  # [(conn, returned_at_epoch)], most recently returned last
+        self._in_use = set()
+        self._opening = 0  # connections being opened outside the lock
+        self._cond = threading.Condition()
+        self._warmed = False
+        self._closed = False
+
+        self.checkouts = 0
+        self.waits = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self.timeouts = 0
+        self.created = 0
+        self.discarded = 0
+
+    # ---------- public API ----------
+
+    def getconn(self):
+        self._prewarm()
+        start = time.perf_counter()
+        waited = False
+        deadline = start + self.timeout
+
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise PoolError("connection pool is closed")
+                if self._idle:
+                    conn, returned_at = self._idle.pop()
+                    self._in_use.add(conn)
+                    break
+                if len(self._in_use) + self._opening < self.maxconn:
+                    conn, returned_at = None, None
+                    self._opening += 1
+                    break
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    self.timeouts += 1
+                    raise PoolTimeout(
+                        f"no free connection after {self.timeout}s ({self.maxconn} in use)"
+                    )
+                waited = True
+                self._cond.wait(remaining)
+
+        if conn is None:
+            conn = self._open_reserved()
+        elif not self._is_healthy(conn, returned_at):
+            conn = self._replace_unhealthy(conn)
+
+        with self._cond:
+            elapsed = time.perf_counter() - start
+            self.checkouts += 1
+            if waited:
+                self.waits += 1
+                self.wait_seconds_total += elapsed
+                self.wait_seconds_max = max(self.wait_seconds_max, elapsed)
+        return conn
+
+    def putconn(self, conn, close=False):
+        with self._cond:
+            if conn not in self._in_use:
+                raise PoolError("trying to put unkeyed connection")
+
+        if not close and not conn.closed:
+            # Same reset rules as psycopg2.pool: roll back anything left open
+            status = conn.info.transaction_status
+            if status == extensions.TRANSACTION_STATUS_UNKNOWN:
+                close = True
+            elif status != extensions.TRANSACTION_STATUS_IDLE:
+                try:
+                    conn.rollback()
+                except psycopg2.Error:
+                    close = True
+
+        with self._cond:
+            self._in_use.discard(conn)
+            if close or conn.closed or self._closed:
+                self.discarded += 1
+                self._close_quietly(conn)
+            else:
+                self._idle.append((conn, time.time()))
+            self._cond.notify()
+
+    def closeall(self):
+        with self._cond:
+            self._closed = True
+            for conn, _ in self._idle:
+                self._close_quietly(conn)
+            for conn in self._in_use:
+                self._close_quietly(conn)
+            self._idle.clear()
+            self._in_use.clear()
+            self._cond.notify_all()
+
+    def stats(self):
+        with self._cond:
+            return {
+                "minconn": self.minconn,
+                "maxconn": self.maxconn,
+                "in_use": len(self._in_use),
+                "idle": len(self._idle),
+                "checkouts": self.checkouts,
+                "waits": self.waits,
+                "wait_seconds_total": round(self.wait_seconds_total, 4),
+                "wait_seconds_max": round(self.wait_seconds_max, 4),
+                "timeouts": self.timeouts,
+                "created": self.created,
+                "discarded": self.discarded,
+            }
+
+    # ---------- internals ----------
+
+    def _prewarm(self):
+        """Open `minconn` connections on first use rather than at import time."""
+        if self._warmed:
+            return
+        with self._cond:
+            if self._warmed:
+                return
+            self._warmed = True
+            missing = max(0, self.minconn - len(self._idle) - len(self._in_use))
+            self._opening += missing
+        for _ in range(missing):
+            try:
+                conn = self._connect()
+            except psycopg2.Error as e:
+                print(f"⚠️ Pool pre-warm connection failed: {e}")
+                with self._cond:
+                    self._opening -= 1
+                continue
+            with self._cond:
+                self._opening -= 1
+                self._idle.append((conn, time.time()))
+                self._cond.notify()
+
+    def _connect(self):
+        conn = psycopg2.connect(self.dsn)
+        with self._cond:
+            self.created += 1
+        return conn
+
+    def _open_reserved(self):
+        """Open a connection for a slot already reserved via `_opening`."""
+        try:
+            conn = self._connect()
+        except Exception:
+            with self._cond:
+                self._opening -= 1
+                self._cond.notify()
+            raise
+        with self._cond:
+            self._opening -= 1
+            self._in_use.add(conn)
+        return conn
+
+    def _replace_unhealthy(self, conn):
+        with self._cond:
+            self._in_use.discard(conn)
+            self.discarded += 1
+            self._opening += 1  # keep the slot reserved while reconnecting
+        self._close_quietly(conn)
+        return self._open_reserved()
+
+    def _is_healthy(self, conn, returned_at):
+        if conn.closed:
+            return False
+        if time.time() - returned_at < self.healthcheck_idle:
+            return True
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1;")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    @staticmethod
+    def _close_quietly(conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
@@ -0,0 +1,104 @@
+"""
+Shape-preserving downsampling for chart series, used by /api/graph_data?max_points=N.
+
+Both methods return sorted integer positions into the input, so callers can
+slice timestamps and values (or a whole DataFrame) with the same index:
+
+    keep = downsample(x, y, max_points, method="minmax")
+    df = df.iloc[keep]
+
+minmax keeps the lowest and highest point of every bucket, so peaks such as
+wind_gust_max survive exactly. lttb (Largest-Triangle-Three-Buckets) keeps one
+visually significant point per bucket for smoother lines.
+"""
+import numpy as np
+
+DOWNSAMPLE_METHODS = ("minmax", "lttb")
+
+def _bucket_starts(n, buckets, offset=0):
+    """Start positions of `buckets` near-equal buckets over n points (all non-empty)."""
+    return offset + np.unique(np.linspace(0, n, buckets + 1)[:-1].astype(np.int64))
+
+def _first_match(mask, bucket, starts):
+    """Per bucket, the first position where mask is true; bucket start if none."""
+    picked = starts.copy()
+    hits = np.flatnonzero(mask)
+    buckets_hit, first = np.unique(bucket[hits], return_index=True)
+    picked[buckets_hit] = hits[first]
+    return picked
+
+def _few_points(y, max_points):
+    """At most max_points (< 4) positions: the endpoints, then the point furthest from the mean."""
+    n = len(y)
+    keep = [0, n - 1][:max(0, max_points)]
+    if max_points == 1 or max_points == 3:
+        deviation = np.abs(y - np.nanmean(y)) if np.isfinite(y).any() else np.zeros(n)
+        extreme = int(np.argmax(np.where(np.isnan(deviation), -1.0, deviation)))
+        keep = [extreme] if max_points == 1 else keep + [extreme]
+    return np.unique(np.asarray(keep, dtype=np.int64))
+
+def minmax_indices(y, max_points):
+    """Positions of the min and max of each bucket, plus both endpoints (never more than max_points)."""
+    y = np.asarray(y, dtype=np.float64)
+    n = len(y)
+    if n <= max_points:
+        return np.arange(n)
+    if max_points < 4:
+        # Too few points for even one min/max bucket between the endpoints
+        return _few_points(y, max_points)
+
+    starts = _bucket_starts(n, max(1, (max_points - 2) // 2))
+    counts = np.diff(np.append(starts, n))
+    bucket = np.repeat(np.arange(len(starts)), counts)
+
+    # fmin/fmax skip NaN; an all-NaN bucket keeps its first point so the gap still shows
+    lows = np.fmin.reduceat(y, starts)
+    highs = np.fmax.reduceat(y, starts)
+    low_pos = _first_match(y == lows[bucket], bucket, starts)
+    high_pos = _first_match(y == highs[bucket], bucket, starts)
+    return np.unique(np.concatenate(([0, n - 1], low_pos, high_pos)))
+
+def lttb_indices(x, y, max_points):
+    """
+    Largest-Triangle-Three-Buckets. Each bucket's triangle areas are computed in
+    one NumPy expression; only the walk from bucket to bucket is a Python loop,
+    since every choice depends on the point picked in the previous bucket.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n = len(y)
+    if n <= max_points:
+        return np.arange(n)
+    if max_points < 3:
+        return _few_points(y, max_points)
+
+    # First and last points are always kept; the rest are split into max_points - 2 buckets
+    edges = np.append(_bucket_starts(n - 2, max_points - 2, offset=1), n - 1)
+    # Mean of each bucket, used as the third vertex for the bucket before it
+    inner_x, inner_y = x[1:n - 1], y[1:n - 1]
+    starts = edges[:-1] - 1
+    valid = ~np.isnan(inner_y)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean_x = np.add.reduceat(inner_x, starts) / np.diff(edges)
+        mean_y = np.add.reduceat(np.where(valid, inner_y, 0.0), starts) / np.add.reduceat(valid, starts)
+    mean_x = np.append(mean_x, x[-1])
+    mean_y = np.append(mean_y, y[-1])
+
+    keep = np.empty(len(edges) + 1, dtype=np.int64)
+    keep[0], keep[-1] = 0, n - 1
+    a = 0
+    for b in range(len(edges) - 1):
+        lo, hi = edges[b], edges[b + 1]
+        cx, cy = mean_x[b + 1], mean_y[b + 1]
+        area = np.abs((x[a] - cx) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (cy - y[a]))
+        area = np.where(np.isnan(area), -1.0, area)
+        a = lo + int(np.argmax(area))
+        keep[b + 1] = a
+    return keep
+
+def downsample(x, y, max_points, method="minmax"):
+    if method == "lttb":
+        return lttb_indices(x, y, max_points)
+    if method == "minmax":
+        return minmax_indices(y, max_points)
+    raise ValueError(f"Unknown downsample method '{method}' (expected one of {DOWNSAMPLE_METHODS})")
@@ -2,6 +2,8 @@ import os
 import pandas as pd
 from sqlalchemy import create_engine, text
 from dotenv import load_dotenv
+from cache_invalidation import notify_tables_changed
+from aggregation_watermarks import ensure_watermark_table, read_raw_since_watermark, advance_watermarks
 
 # Load environment variables
 load_dotenv()
@@ -11,50 +13,52 @@ DATABASE_URL = os.getenv("DATABASE_URL")
 engine = create_engine(DATABASE_URL)
 
 def main():
-    # Read weather_raw into DataFrame
-    df = pd.read_sql("SELECT * FROM weather_raw", engine)
-
-    if df.empty:
-        print("No data in weather_raw table.")
-        return
-
-    # Parse and extract date
-    df["local_time"] = pd.to_datetime(df["local_time"])
-    df["date"] = df["local_time"].dt.date
-
-    # Group and aggregate
-    agg = df.groupby(["station_id", "date"]).agg({
-        "avg_temp": ["mean", "min", "max"],
-        "avg_humidity": ["mean", "min", "max"],
-        "avg_wnd_spd": ["mean", "min", "max"],
-        "avg_wnd_gust": "max",
-        "avg_dewpt": "mean",
-        "avg_wnd_chill": "mean",
-        "avg_heat_indx": "mean",
-        "pressure_trend": "mean",
-        "pressure_max": "max",
-        "pressure_min": "min",
-        "total_precip": "sum",
-        "solar_rad_max": "max",
-        "uv_max": "max"
-    })
-
-    # Rename columns
-    agg.columns = [
-        "temp_avg", "temp_low", "temp_high",
-        "humidity_avg", "humidity_min", "humidity_max",
-        "wind_speed_avg", "wind_speed_low", "wind_speed_high",
-        "wind_gust_max", "dew_point_avg", "windchill_avg",
-        "heatindex_avg", "pressureTrend", "pressure_max",
-        "pressure_min", "precip_total", "solar_rad_max", "uv_max"
-    ]
-    agg = agg.reset_index()
-
-    agg["local_time"] = pd.to_datetime(agg["date"])
-    agg["day"] = agg["date"].astype(str)
-
-    # Insert using SQLAlchemy
+    # Read, aggregate, upsert and advance the watermark in one transaction so a
+    # failed run leaves the watermark where it was.
     with engine.begin() as conn:
+        ensure_watermark_table(conn)
+        df = read_raw_since_watermark(conn, "daily")
+
+        if df.empty:
+            print("No new data in weather_raw since the last daily aggregation.")
+            return
+
+        # Parse and extract date
+        df["local_time"] = pd.to_datetime(df["local_time"])
+        df["date"] = df["local_time"].dt.date
+
+        # Group and aggregate
+        agg = df.groupby(["station_id", "date"]).agg({
+            "avg_temp": ["mean", "min", "max"],
+            "avg_humidity": ["mean", "min", "max"],
+            "avg_wnd_spd": ["mean", "min", "max"],
+            "avg_wnd_gust": "max",
+            "avg_dewpt": "mean",
+            "avg_wnd_chill": "mean",
+            "avg_heat_indx": "mean",
+            "pressure_trend": "mean",
+            "pressure_max": "max",
+            "pressure_min": "min",
+            "total_precip": "sum",
+            "solar_rad_max": "max",
+            "uv_max": "max"
+        })
+
+        # Rename columns
+        agg.columns = [
+            "temp_avg", "temp_low", "temp_high",
+            "humidity_avg", "humidity_min", "humidity_max",
+            "wind_speed_avg", "wind_speed_low", "wind_speed_high",
+            "wind_gust_max", "dew_point_avg", "windchill_avg",
+            "heatindex_avg", "pressureTrend", "pressure_max",
+            "pressure_min", "precip_total", "solar_rad_max", "uv_max"
+        ]
+        agg = agg.reset_index()
+
+        agg["local_time"] = pd.to_datetime(agg["date"])
+        agg["day"] = agg["date"].astype(str)
+
+        # Insert using SQLAlchemy
         for _, row in agg.iterrows():
             row_dict = row.to_dict()
 
@@ -119,6 +123,9 @@ def main():
                     uv_max = EXCLUDED.uv_max
             """), row_dict)
 
+        advance_watermarks(conn, "daily", df)
+        notify_tables_changed(conn, ["weather_daily"])
+
     print("✅ Daily aggregation complete and inserted into weather_daily.")
 
 if __name__ == "__main__":
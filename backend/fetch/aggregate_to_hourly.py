@@ -2,6 +2,10 @@ import os
 import pandas as pd
 from sqlalchemy import create_engine, text
 from dotenv import load_dotenv
+from cache_invalidation import notify_tables_changed
+from aggregation_watermarks import ensure_watermark_table, read_raw_since_watermark, advance_watermarks
+from bulk_upsert import bulk_upsert, DEFAULT_BATCH_SIZE
+import time
 
 # Load environment variables
 load_dotenv()
@@ -10,92 +14,123 @@ DATABASE_URL = os.getenv("DATABASE_URL")
 # Create SQLAlchemy engine
 engine = create_engine(DATABASE_URL)
 
+# copy (COPY + one set-based upsert), values (paged execute_values) or rows (legacy per-row loop)
+UPSERT_METHOD = os.getenv("HOURLY_UPSERT_METHOD", "copy")
+UPSERT_BATCH_SIZE = int(os.getenv("HOURLY_UPSERT_BATCH_SIZE", str(DEFAULT_BATCH_SIZE)))
+
+HOURLY_COLUMNS = [
+    "station_id", "hour", "local_time", "day",
+    "temp_avg", "temp_min", "temp_max",
+    "humidity_avg", "humidity_min", "humidity_max",
+    "wind_speed_avg", "wind_speed_min", "wind_speed_max",
+    "wind_gust_max", "dew_point_avg", "windchill_avg", "heatindex_avg",
+    "pressure_max", "pressure_min", "pressure_avg",
+    "precip_total"
+]
+
+def upsert_rows_loop(conn, agg):
+    """Original one-statement-per-row upsert, kept for comparing against bulk_upsert."""
+    start = time.perf_counter()
+    for _, row in agg.iterrows():
+        row_dict = row.to_dict()
+        conn.execute(text("""
+            INSERT INTO weather_hourly (
+                station_id, hour, local_time, day, 
+                temp_avg, temp_min, temp_max,
+                humidity_avg, humidity_min, humidity_max,
+                wind_speed_avg, wind_speed_min, wind_speed_max,
+                wind_gust_max, dew_point_avg, windchill_avg, heatindex_avg,
+                pressure_max, pressure_min, pressure_avg,
+                precip_total
+            )
+            VALUES (
+                :station_id, :hour, :local_time, :day,
+                :temp_avg, :temp_min, :temp_max,
+                :humidity_avg, :humidity_min, :humidity_max,
+                :wind_speed_avg, :wind_speed_min, :wind_speed_max,
+                :wind_gust_max, :dew_point_avg, :windchill_avg, :heatindex_avg,
+                :pressure_max, :pressure_min, :pressure_avg,
+                :precip_total
+            )
+            ON CONFLICT (station_id, hour) DO UPDATE
+            SET
+            local_time = EXCLUDED.local_time,
+            day = EXCLUDED.day,
+            temp_avg = EXCLUDED.temp_avg,
+            temp_min = EXCLUDED.temp_min,
+            temp_max = EXCLUDED.temp_max,
+            humidity_avg = EXCLUDED.humidity_avg,
+            humidity_min = EXCLUDED.humidity_min,
+            humidity_max = EXCLUDED.humidity_max,
+            wind_speed_avg = EXCLUDED.wind_speed_avg,
+            wind_speed_min = EXCLUDED.wind_speed_min,
+            wind_speed_max = EXCLUDED.wind_speed_max,
+            wind_gust_max = EXCLUDED.wind_gust_max,
+            dew_point_avg = EXCLUDED.dew_point_avg,
+            windchill_avg = EXCLUDED.windchill_avg,
+            heatindex_avg = EXCLUDED.heatindex_avg,
+            pressure_max = EXCLUDED.pressure_max,
+            pressure_min = EXCLUDED.pressure_min,
+            pressure_avg = EXCLUDED.pressure_avg,
+            precip_total = EXCLUDED.precip_total
+        """), row_dict)
+    elapsed = time.perf_counter() - start
+    print(f"⏱️ Upserted {len(agg)} rows into weather_hourly via rows in {elapsed:.2f}s "
+          f"— {len(agg) / elapsed if elapsed > 0 else float('inf'):,.0f} rows/s")
+
 def main():
-    # Read data from PostgreSQL
-    df = pd.read_sql("SELECT * FROM weather_raw", engine)
+    # Read, aggregate, upsert and advance the watermark in one transaction so a
+    # failed run leaves the watermark where it was.
+    with engine.begin() as conn:
+        ensure_watermark_table(conn)
+        df = read_raw_since_watermark(conn, "hourly")
 
-    if df.empty:
-        print("No data in weather_raw table.")
-        return
+        if df.empty:
+            print("No new data in weather_raw since the last hourly aggregation.")
+            return
 
-    # Convert to datetime and extract hour
-    df["local_time"] = pd.to_datetime(df["local_time"])
-    df["hour"] = df["local_time"].dt.floor("h")
+        # Convert to datetime and extract hour
+        df["local_time"] = pd.to_datetime(df["local_time"])
+        df["hour"] = df["local_time"].dt.floor("h")
 
-    # Group and aggregate
-    agg = df.groupby(["station_id", "hour"]).agg({
-        "avg_temp": ["mean", "min", "max"],
-        "avg_humidity": ["mean", "min", "max"],
-        "avg_wnd_spd": ["mean", "min", "max"],
-        "avg_wnd_gust": "max",
-        "avg_dewpt": "mean",
-        "avg_wnd_chill": "mean",
-        "avg_heat_indx": "mean",
-        "pressure_max": "max",
-        "pressure_min": "min",
-        "pressure_trend": "mean",
-        "total_precip": "sum"
-    })
+        # Group and aggregate
+        agg = df.groupby(["station_id", "hour"]).agg({
+            "avg_temp": ["mean", "min", "max"],
+            "avg_humidity": ["mean", "min", "max"],
+            "avg_wnd_spd": ["mean", "min", "max"],
+            "avg_wnd_gust": "max",
+            "avg_dewpt": "mean",
+            "avg_wnd_chill": "mean",
+            "avg_heat_indx": "mean",
+            "pressure_max": "max",
+            "pressure_min": "min",
+            "pressure_trend": "mean",
+            "total_precip": "sum"
+        })
 
-    # Rename columns
-    agg.columns = [
-        "temp_avg", "temp_min", "temp_max",
-        "humidity_avg", "humidity_min", "humidity_max",
-        "wind_speed_avg", "wind_speed_min", "wind_speed_max",
-        "wind_gust_max", "dew_point_avg", "windchill_avg",
-        "heatindex_avg", "pressure_max", "pressure_min",
-        "pressure_avg", "precip_total"
-    ]
-    agg = agg.reset_index()
+        # Rename columns
+        agg.columns = [
+            "temp_avg", "temp_min", "temp_max",
+            "humidity_avg", "humidity_min", "humidity_max",
+            "wind_speed_avg", "wind_speed_min", "wind_speed_max",
+            "wind_gust_max", "dew_point_avg", "windchill_avg",
+            "heatindex_avg", "pressure_max", "pressure_min",
+            "pressure_avg", "precip_total"
+        ]
+        agg = agg.reset_index()
 
-    agg["day"] = agg["hour"].dt.strftime("%Y-%m-%d")
-    agg["local_time"] = agg["hour"]
+        agg["day"] = agg["hour"].dt.strftime("%Y-%m-%d")
+        agg["local_time"] = agg["hour"]
 
-    # Insert aggregated data into weather_hourly
-    with engine.begin() as conn:
-        for _, row in agg.iterrows():
-            row_dict = row.to_dict()
-            conn.execute(text("""
-                INSERT INTO weather_hourly (
-                    station_id, hour, local_time, day, 
-                    temp_avg, temp_min, temp_max,
-                    humidity_avg, humidity_min, humidity_max,
-                    wind_speed_avg, wind_speed_min, wind_speed_max,
-                    wind_gust_max, dew_point_avg, windchill_avg, heatindex_avg,
-                    pressure_max, pressure_min, pressure_avg,
-                    precip_total
-                )
-                VALUES (
-                    :station_id, :hour, :local_time, :day,
-                    :temp_avg, :temp_min, :temp_max,
-                    :humidity_avg, :humidity_min, :humidity_max,
-                    :wind_speed_avg, :wind_speed_min, :wind_speed_max,
-                    :wind_gust_max, :dew_point_avg, :windchill_avg, :heatindex_avg,
-                    :pressure_max, :pressure_min, :pressure_avg,
-                    :precip_total
-                )
-                ON CONFLICT (station_id, hour) DO UPDATE
-                SET
-                local_time = EXCLUDED.local_time,
-                day = EXCLUDED.day,
-                temp_avg = EXCLUDED.temp_avg,
-                temp_min = EXCLUDED.temp_min,
-                temp_max = EXCLUDED.temp_max,
-                humidity_avg = EXCLUDED.humidity_avg,
-                humidity_min = EXCLUDED.humidity_min,
-                humidity_max = EXCLUDED.humidity_max,
-                wind_speed_avg = EXCLUDED.wind_speed_avg,
-                wind_speed_min = EXCLUDED.wind_speed_min,
-                wind_speed_max = EXCLUDED.wind_speed_max,
-                wind_gust_max = EXCLUDED.wind_gust_max,
-                dew_point_avg = EXCLUDED.dew_point_avg,
-                windchill_avg = EXCLUDED.windchill_avg,
-                heatindex_avg = EXCLUDED.heatindex_avg,
-                pressure_max = EXCLUDED.pressure_max,
-                pressure_min = EXCLUDED.pressure_min,
-                pressure_avg = EXCLUDED.pressure_avg,
-                precip_total = EXCLUDED.precip_total
-            """), row_dict)
+        # Insert aggregated data into weather_hourly
+        if UPSERT_METHOD == "rows":
+            upsert_rows_loop(conn, agg)
+        else:
+            bulk_upsert(conn, "weather_hourly", agg[HOURLY_COLUMNS], ["station_id", "hour"],
+                        method=UPSERT_METHOD, batch_size=UPSERT_BATCH_SIZE)
+
+        advance_watermarks(conn, "hourly", df)
+        notify_tables_changed(conn, ["weather_hourly"])
 
     print("✅ Hourly aggregation complete and inserted into weather_hourly.")
 
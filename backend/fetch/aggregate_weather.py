@@ -0,0 +1,177 @@
+import os
+import numpy as np
+import pandas as pd
+from sqlalchemy import create_engine, text
+from dotenv import load_dotenv
+from cache_invalidation import notify_tables_changed
+from aggregation_watermarks import (ensure_watermark_table, advance_watermarks, read_store_since,
+                                    AGGREGATE_FULL_REBUILD, AGGREGATE_SOURCE)
+from bulk_upsert import bulk_upsert, DEFAULT_BATCH_SIZE
+
+# Load environment variables
+load_dotenv()
+DATABASE_URL = os.getenv("DATABASE_URL")
+
+# Create SQLAlchemy engine
+engine = create_engine(DATABASE_URL)
+
+UPSERT_METHOD = os.getenv("AGGREGATE_UPSERT_METHOD", "copy")
+UPSERT_BATCH_SIZE = int(os.getenv("AGGREGATE_UPSERT_BATCH_SIZE", str(DEFAULT_BATCH_SIZE)))
+
+# (output column, weather_raw column, statistic) — same rollups as aggregate_to_hourly.py
+HOURLY_OUTPUT = [
+    ("temp_avg", "avg_temp", "mean"), ("temp_min", "avg_temp", "min"), ("temp_max", "avg_temp", "max"),
+    ("humidity_avg", "avg_humidity", "mean"), ("humidity_min", "avg_humidity", "min"), ("humidity_max", "avg_humidity", "max"),
+    ("wind_speed_avg", "avg_wnd_spd", "mean"), ("wind_speed_min", "avg_wnd_spd", "min"), ("wind_speed_max", "avg_wnd_spd", "max"),
+    ("wind_gust_max", "avg_wnd_gust", "max"),
+    ("dew_point_avg", "avg_dewpt", "mean"),
+    ("windchill_avg", "avg_wnd_chill", "mean"),
+    ("heatindex_avg", "avg_heat_indx", "mean"),
+    ("pressure_max", "pressure_max", "max"),
+    ("pressure_min", "pressure_min", "min"),
+    ("pressure_avg", "pressure_trend", "mean"),
+    ("precip_total", "total_precip", "sum"),
+]
+
+# Same rollups as aggregate_to_daily.py
+DAILY_OUTPUT = [
+    ("temp_avg", "avg_temp", "mean"), ("temp_low", "avg_temp", "min"), ("temp_high", "avg_temp", "max"),
+    ("humidity_avg", "avg_humidity", "mean"), ("humidity_min", "avg_humidity", "min"), ("humidity_max", "avg_humidity", "max"),
+    ("wind_speed_avg", "avg_wnd_spd", "mean"), ("wind_speed_low", "avg_wnd_spd", "min"), ("wind_speed_high", "avg_wnd_spd", "max"),
+    ("wind_gust_max", "avg_wnd_gust", "max"),
+    ("dew_point_avg", "avg_dewpt", "mean"),
+    ("windchill_avg", "avg_wnd_chill", "mean"),
+    ("heatindex_avg", "avg_heat_indx", "mean"),
+    ("pressureTrend", "pressure_trend", "mean"),
+    ("pressure_max", "pressure_max", "max"),
+    ("pressure_min", "pressure_min", "min"),
+    ("precip_total", "total_precip", "sum"),
+    ("solar_rad_max", "solar_rad_max", "max"),
+    ("uv_max", "uv_max", "max"),
+]
+
+# Partial state kept per hour so days can be rolled up from hours, not raw rows:
+# a mean needs sum + count, everything else is re-aggregated with itself.
+PARTIALS_FOR = {
+    "mean": ("sum", "count"),
+    "min": ("min",),
+    "max": ("max",),
+    "sum": ("sum",),
+}
+# How each partial combines when rolling hours up into days
+COMBINE = {"sum": "sum", "count": "sum", "min": "min", "max": "max"}
+
+def _partial_columns():
+    needed = {}
+    for _, raw_col, stat in HOURLY_OUTPUT + DAILY_OUTPUT:
+        for part in PARTIALS_FOR[stat]:
+            needed[f"{raw_col}__{part}"] = (raw_col, part)
+    return needed
+
+PARTIAL_COLUMNS = _partial_columns()
+
+def read_raw_slice(conn, full_rebuild=AGGREGATE_FULL_REBUILD, source=AGGREGATE_SOURCE):
+    """
+    Raw rows for every day at or after the older of each station's hourly/daily
+    watermark. Whole days are re-read so both rollups see complete buckets.
+    With source="store" the rows come from the local station store instead of weather_raw.
+    """
+    if full_rebuild:
+        print("♻️ Full rebuild requested — ignoring watermarks.")
+        if source == "store":
+            return read_store_since({})
+        return pd.read_sql(text("SELECT * FROM weather_raw"), conn)
+
+    if source == "store":
+        rows = conn.execute(text("""
+            SELECT station_id, date_trunc('day', MIN(watermark))
+            FROM aggregation_watermarks
+            WHERE grain IN ('hourly', 'daily')
+            GROUP BY station_id
+            HAVING COUNT(*) = 2
+        """)).fetchall()
+        return read_store_since(dict(rows))
+
+    return pd.read_sql(text("""
+        WITH station_start AS (
+            SELECT station_id, date_trunc('day', MIN(watermark)) AS since,
+                   COUNT(*) AS grains
+            FROM aggregation_watermarks
+            WHERE grain IN ('hourly', 'daily')
+            GROUP BY station_id
+        )
+        SELECT r.*
+        FROM weather_raw r
+        LEFT JOIN station_start s ON s.station_id = r.station_id
+        WHERE s.since IS NULL
+           OR s.grains < 2
+           OR r.local_time >= s.since
+    """), conn)
+
+def hourly_partials(df):
+    """One row per (station_id, hour) with sum/count/min/max partials of each measure."""
+    df = df.copy()
+    df["hour"] = df["local_time"].dt.floor("h")
+    return df.groupby(["station_id", "hour"]).agg(**PARTIAL_COLUMNS).reset_index()
+
+def daily_partials(hourly):
+    hourly = hourly.copy()
+    hourly["date"] = hourly["hour"].dt.date
+    return hourly.groupby(["station_id", "date"]).agg(**{
+        col: (col, COMBINE[part]) for col, (_, part) in PARTIAL_COLUMNS.items()
+    }).reset_index()
+
+def finalize(partials, keys, output):
+    out = partials[keys].copy()
+    for out_col, raw_col, stat in output:
+        if stat == "mean":
+            count = partials[f"{raw_col}__count"]
+            out[out_col] = partials[f"{raw_col}__sum"] / count.replace(0, np.nan)
+        else:
+            out[out_col] = partials[f"{raw_col}__{stat}"]
+    return out
+
+def build_rollups(df):
+    df["local_time"] = pd.to_datetime(df["local_time"])
+    hourly_parts = hourly_partials(df)
+
+    hourly = finalize(hourly_parts, ["station_id", "hour"], HOURLY_OUTPUT)
+    hourly["local_time"] = hourly["hour"]
+    hourly["day"] = hourly["hour"].dt.strftime("%Y-%m-%d")
+
+    daily = finalize(daily_partials(hourly_parts), ["station_id", "date"], DAILY_OUTPUT)
+    daily["local_time"] = pd.to_datetime(daily["date"])
+    daily["day"] = daily["local_time"].dt.strftime("%Y-%m-%d")
+
+    hourly_cols = ["station_id", "hour", "local_time", "day"] + [c for c, _, _ in HOURLY_OUTPUT]
+    daily_cols = ["station_id", "date", "local_time", "day"] + [c for c, _, _ in DAILY_OUTPUT]
+    return hourly[hourly_cols], daily[daily_cols]
+
+def main():
+    # One read of weather_raw feeds both rollups; both tables, both watermarks and
+    # the cache notification commit together.
+    with engine.begin() as conn:
+        ensure_watermark_table(conn)
+        df = read_raw_slice(conn)
+
+        if df.empty:
+            print("No new data in weather_raw since the last aggregation.")
+            return
+
+        hourly, daily = build_rollups(df)
+        print(f"🧮 {len(df)} raw rows -> {len(hourly)} hourly, {len(daily)} daily buckets")
+
+        bulk_upsert(conn, "weather_hourly", hourly, ["station_id", "hour"],
+                    method=UPSERT_METHOD, batch_size=UPSERT_BATCH_SIZE)
+        bulk_upsert(conn, "weather_daily", daily, ["station_id", "date"],
+                    method=UPSERT_METHOD, batch_size=UPSERT_BATCH_SIZE)
+
+        advance_watermarks(conn, "hourly", df)
+        advance_watermarks(conn, "daily", df)
+        notify_tables_changed(conn, ["weather_hourly", "weather_daily"])
+
+    print("✅ Hourly and daily aggregation complete.")
+    return len(df)
+
+if __name__ == "__main__":
+    main()
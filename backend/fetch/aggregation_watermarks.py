@@ -0,0 +1,82 @@
+import os
+import pandas as pd
+from sqlalchemy import text
+
+# Set to 1 to ignore watermarks and re-aggregate every bucket (e.g. after backfilling
+# raw rows older than the current watermark).
+AGGREGATE_FULL_REBUILD = os.getenv("AGGREGATE_FULL_REBUILD", "0") == "1"
+
+# db (weather_raw) or store (the memory-mapped per-station files from station_store.py)
+AGGREGATE_SOURCE = os.getenv("AGGREGATE_SOURCE", "db")
+
+# grain -> date_trunc unit of the buckets it aggregates into
+GRAIN_UNITS = {
+    "hourly": "hour",
+    "daily": "day",
+}
+
+def ensure_watermark_table(conn):
+    conn.execute(text("""
+        CREATE TABLE IF NOT EXISTS aggregation_watermarks (
+            station_id TEXT NOT NULL,
+            grain TEXT NOT NULL,
+            watermark TIMESTAMP NOT NULL,
+            updated_at TIMESTAMP NOT NULL DEFAULT NOW(),
+            PRIMARY KEY (station_id, grain)
+        );
+    """))
+
+def read_store_since(since_by_station):
+    """
+    Raw rows from the station store, each station from its entry in
+    `since_by_station` (stations without one are read in full).
+    """
+    from station_store import StationStore
+
+    store = StationStore()
+    frames = [store.read_frame(station_id, start=since_by_station.get(station_id))
+              for station_id in store.stations()]
+    frames = [df for df in frames if not df.empty]
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+def read_raw_since_watermark(conn, grain, full_rebuild=AGGREGATE_FULL_REBUILD, source=AGGREGATE_SOURCE):
+    """
+    Raw rows for every bucket at or after each station's watermark. The bucket the
+    watermark falls in is re-read whole, since it may have been partial last run.
+    Stations with no watermark yet are read in full.
+    """
+    if full_rebuild:
+        print(f"♻️ Full rebuild requested — ignoring {grain} watermarks.")
+        if source == "store":
+            return read_store_since({})
+        return pd.read_sql(text("SELECT * FROM weather_raw"), conn)
+
+    if source == "store":
+        rows = conn.execute(text("""
+            SELECT station_id, date_trunc(:unit, watermark)
+            FROM aggregation_watermarks
+            WHERE grain = :grain
+        """), {"grain": grain, "unit": GRAIN_UNITS[grain]}).fetchall()
+        return read_store_since(dict(rows))
+
+    return pd.read_sql(text("""
+        SELECT r.*
+        FROM weather_raw r
+        LEFT JOIN aggregation_watermarks w
+          ON w.station_id = r.station_id AND w.grain = :grain
+        WHERE w.watermark IS NULL
+           OR r.local_time >= date_trunc(:unit, w.watermark)
+    """), conn, params={"grain": grain, "unit": GRAIN_UNITS[grain]})
+
+def advance_watermarks(conn, grain, df):
+    """Move each station's watermark to the newest local_time just aggregated."""
+    latest = df.groupby("station_id")["local_time"].max()
+    for station_id, watermark in latest.items():
+        conn.execute(text("""
+            INSERT INTO aggregation_watermarks (station_id, grain, watermark, updated_at)
+            VALUES (:station_id, :grain, :watermark, NOW())
+            ON CONFLICT (station_id, grain) DO UPDATE
+            SET watermark = GREATEST(aggregation_watermarks.watermark, EXCLUDED.watermark),
+                updated_at = NOW()
+        """), {"station_id": station_id, "grain": grain, "watermark": watermark.to_pydatetime()})
+        print(f"🔖 {grain} watermark for {station_id} -> {watermark}")
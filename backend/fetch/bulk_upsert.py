@@ -0,0 +1,82 @@
+import io
+import time
+import uuid
+
+import pandas as pd
+from psycopg2.extras import execute_values
+
+DEFAULT_BATCH_SIZE = 5000
+
+
+def _update_clause(columns, key_cols):
+    return ",\n                ".join(
+        f"{c} = EXCLUDED.{c}" for c in columns if c not in key_cols
+    )
+
+
+def _copy_upsert(cur, table, df, key_cols, batch_size):
+    """COPY into a temp staging table, then one set-based INSERT ... ON CONFLICT."""
+    columns = df.columns.tolist()
+    col_list = ", ".join(columns)
+    staging = f"_stg_{table}_{uuid.uuid4().hex[:8]}"
+
+    cur.execute(f"""
+        CREATE TEMP TABLE {staging} ON COMMIT DROP
+        AS SELECT {col_list} FROM {table} WITH NO DATA;
+    """)
+    for start in range(0, len(df), batch_size):
+        buf = io.StringIO()
+        # Empty unquoted CSV fields load as NULL, which is what NaN should become
+        df.iloc[start:start + batch_size].to_csv(buf, index=False, header=False)
+        buf.seek(0)
+        cur.copy_expert(f"COPY {staging} ({col_list}) FROM STDIN WITH (FORMAT csv)", buf)
+
+    cur.execute(f"""
+        INSERT INTO {table} ({col_list})
+        SELECT {col_list} FROM {staging}
+        ON CONFLICT ({", ".join(key_cols)}) DO UPDATE
+        SET {_update_clause(columns, key_cols)}
+    """)
+    cur.execute(f"DROP TABLE {staging};")
+
+
+def _values_upsert(cur, table, df, key_cols, batch_size):
+    """Multi-row INSERT ... VALUES pages via execute_values."""
+    columns = df.columns.tolist()
+    rows = list(df.astype(object).where(df.notna(), None).itertuples(index=False, name=None))
+    execute_values(cur, f"""
+        INSERT INTO {table} ({", ".join(columns)}) VALUES %s
+        ON CONFLICT ({", ".join(key_cols)}) DO UPDATE
+        SET {_update_clause(columns, key_cols)}
+    """, rows, page_size=batch_size)
+
+
+UPSERT_METHODS = {
+    "copy": _copy_upsert,
+    "values": _values_upsert,
+}
+
+
+def bulk_upsert(conn, table, df: pd.DataFrame, key_cols, method="copy", batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Upsert every row of `df` into `table` on `key_cols` using the caller's
+    SQLAlchemy connection (so it commits or rolls back with the caller's
+    transaction). Returns (rows, seconds).
+    """
+    if method not in UPSERT_METHODS:
+        raise ValueError(f"Unknown upsert method '{method}', expected one of {list(UPSERT_METHODS)}")
+    if df.empty:
+        return 0, 0.0
+
+    start = time.perf_counter()
+    cur = conn.connection.cursor()
+    try:
+        UPSERT_METHODS[method](cur, table, df, list(key_cols), batch_size)
+    finally:
+        cur.close()
+    elapsed = time.perf_counter() - start
+
+    rate = len(df) / elapsed if elapsed > 0 else float("inf")
+    print(f"⏱️ Upserted {len(df)} rows into {table} via {method} "
+          f"(batch {batch_size}) in {elapsed:.2f}s — {rate:,.0f} rows/s")
+    return len(df), elapsed
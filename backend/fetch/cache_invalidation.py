@@ -0,0 +1,16 @@
+from sqlalchemy import text
+
+# Postgres NOTIFY channel the API listens on (see backend/response_cache.py)
+CACHE_INVALIDATION_CHANNEL = "weather_cache_invalidate"
+
+def notify_tables_changed(conn, tables):
+    """
+    Tell every API worker that cached responses built from `tables` are stale.
+    Call inside the same transaction as the upsert: Postgres delivers NOTIFY only
+    on commit, so a rolled-back write never invalidates anything.
+    """
+    conn.execute(
+        text("SELECT pg_notify(:channel, :payload)"),
+        {"channel": CACHE_INVALIDATION_CHANNEL, "payload": ",".join(tables)}
+    )
+    print(f"📣 Cache invalidation sent for: {', '.join(tables)}")
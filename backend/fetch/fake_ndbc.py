@@ -0,0 +1,94 @@
+"""
+Offline stand-in for ndbc_api.NdbcApi, so the buoy fetchers run without NDBC:
+
+    NDBC_CLIENT=fake python noa_avc_data_fetch.py      # METARs still come from AWC
+
+FakeNdbcApi.get_data takes the same arguments as the real client and returns
+synthetic 10-minute stdmet rows in the same shapes: one station and mode gives
+a frame indexed by `timestamp`; station_ids/modes give a [timestamp, station_id]
+MultiIndex. Values are deterministic per station and timestamp, so repeated or
+overlapping requests agree.
+
+latency (seconds, or {station: seconds}) slows calls down and failures
+({station: message}) makes them raise, to exercise timeouts and per-station
+error handling. Every call is recorded in .calls.
+"""
+from __future__ import annotations
+import threading
+import time
+import zlib
+from typing import Dict, List, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+STDMET_COLS = ["WDIR", "WSPD", "GST", "WVHT", "DPD", "APD", "MWD", "PRES", "ATMP", "WTMP", "DEWP", "VIS", "PTDY", "TIDE"]
+CWIND_COLS = ["WDIR", "WSPD", "GDR", "GST", "GTIME"]
+MODE_COLS = {"stdmet": STDMET_COLS, "cwind": CWIND_COLS}
+
+# (mean, spread) of the synthetic values
+_VALUE_RANGES = {
+    "WDIR": (180, 90), "WSPD": (6, 3), "GST": (8, 4), "GDR": (180, 90), "GTIME": (1200, 600),
+    "WVHT": (2, 1), "DPD": (10, 3), "APD": (7, 2), "MWD": (270, 40), "PRES": (1015, 8),
+    "ATMP": (12, 4), "WTMP": (11, 2), "DEWP": (9, 4), "VIS": (10, 3), "PTDY": (0, 1), "TIDE": (0, 1),
+}
+
+def _to_utc(value) -> pd.Timestamp:
+    ts = pd.Timestamp(value)
+    return ts.tz_localize("UTC") if ts.tzinfo is None else ts.tz_convert("UTC")
+
+def synthetic_stdmet(station_id: str, start, end, mode: str = "stdmet", freq: str = "10min") -> pd.DataFrame:
+    """Deterministic rows for one station/mode on the `freq` grid between start and end (inclusive)."""
+    index = pd.date_range(_to_utc(start).ceil(freq), _to_utc(end), freq=freq, name="timestamp")
+    epoch = ((index - pd.Timestamp(0, tz="UTC")) // pd.Timedelta(seconds=1)).to_numpy()
+    frame = {}
+    for col in MODE_COLS[mode]:
+        mean, spread = _VALUE_RANGES[col]
+        phase = zlib.crc32(f"{station_id}:{col}".encode()) % 1000
+        values = mean + spread * np.sin((epoch / 3600.0 + phase) / 7.0)
+        if col == "DEWP" and "ATMP" in frame:
+            values = np.minimum(values, frame["ATMP"])  # dewpoint never above air temperature
+        # NDBC leaves some sensors unreported; keep the gaps stable per timestamp
+        values[(epoch // 600 + phase) % 37 == 0] = np.nan
+        frame[col] = values.round(1)
+    return pd.DataFrame(frame, index=index.tz_localize(None))
+
+class FakeNdbcApi:
+    def __init__(self, latency: Union[float, Dict[str, float]] = 0.0,
+                 failures: Optional[Dict[str, str]] = None):
+        self.latency = latency
+        self.failures = failures or {}
+        self.calls: List[dict] = []
+        self._lock = threading.Lock()
+
+    def _station_call(self, station_id: str, mode: str, start_time, end_time) -> pd.DataFrame:
+        with self._lock:
+            self.calls.append({"station_id": station_id, "mode": mode,
+                               "start_time": start_time, "end_time": end_time})
+        delay = self.latency.get(station_id, 0.0) if isinstance(self.latency, dict) else self.latency
+        if delay:
+            time.sleep(delay)
+        if station_id in self.failures:
+            raise RuntimeError(self.failures[station_id])
+        return synthetic_stdmet(station_id, start_time, end_time, mode)
+
+    def get_data(self, station_id: Optional[str] = None, mode: Optional[str] = None,
+                 start_time=None, end_time=None, use_timestamp: bool = True, as_df: bool = True,
+                 cols: Optional[List[str]] = None, station_ids: Optional[List[str]] = None,
+                 modes: Optional[List[str]] = None):
+        end_time = end_time or pd.Timestamp.now(tz="UTC")
+        start_time = start_time or _to_utc(end_time) - pd.Timedelta(days=45)
+        if station_ids is None and modes is None:
+            df = self._station_call(station_id, mode, start_time, end_time)
+            return df[[c for c in cols if c in df.columns]] if cols else df
+
+        frames = []
+        for stn in station_ids or [station_id]:
+            per_mode = [self._station_call(stn, m, start_time, end_time) for m in modes or [mode]]
+            # Later modes only fill columns the earlier ones lack, as the real client merges them
+            merged = per_mode[0]
+            for extra in per_mode[1:]:
+                merged = merged.combine_first(extra)
+            frames.append(merged.assign(station_id=stn).set_index("station_id", append=True))
+        df = pd.concat(frames).sort_index()
+        return df[[c for c in cols if c in df.columns]] if cols else df
@@ -1,28 +1,60 @@
 import os
 import requests
 import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
+from http_session import make_session
 
 load_dotenv()
 
-def fetch_station_data(station_id, alias, start_date, end_date, base_output=None):
-    # 🔧 Set base_output to "weather_dashboard/data/" regardless of current location
-    if base_output is None:
-        project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
-        base_output = os.path.join(project_root, "data")
+TWC_BASE_URL = os.getenv("TWC_BASE_URL", "https://api.weather.com")  # point at a mock server for tests
+PWS_FETCH_CONCURRENCY = int(os.getenv("PWS_FETCH_CONCURRENCY", "4"))
+# TWC PWS keys are typically limited to 30 calls/minute
+PWS_RATE_PER_MIN = float(os.getenv("PWS_RATE_PER_MIN", "30"))
+PWS_MAX_RETRIES = int(os.getenv("PWS_MAX_RETRIES", "4"))
+PWS_REQUEST_TIMEOUT = float(os.getenv("PWS_REQUEST_TIMEOUT", "30"))
+RETRY_STATUSES = {429, 500, 502, 503, 504}
 
-    api_key = os.getenv("WEATHER_API_KEY")
-    if not api_key:
-        print("❌ WEATHER_API_KEY missing in .env")
-        return
+WINDOW_DAYS = 31
+
+def default_output_dir():
+    # 🔧 "weather_dashboard/data/" regardless of current location
+    project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+    return os.path.join(project_root, "data")
+
+class TokenBucket:
+    """Blocking token bucket shared by all fetch threads: `rate_per_min` calls, `burst` at once."""
+
+    def __init__(self, rate_per_min, burst=1):
+        self.rate = rate_per_min / 60.0
+        self.capacity = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
 
+def plan_windows(station_id, alias, start_date, end_date, base_output):
+    """31-day windows still to fetch; windows already on disk are what makes a rerun resume."""
     output_dir = os.path.join(base_output, alias)
     os.makedirs(output_dir, exist_ok=True)
 
-    delta = timedelta(days=31)
+    delta = timedelta(days=WINDOW_DAYS)
     current_start = start_date
-
+    windows = []
     while current_start < end_date:
         current_end = min(current_start + delta - timedelta(days=1), end_date)
         start_str = current_start.strftime("%Y%m%d")
@@ -30,52 +62,118 @@ def fetch_station_data(station_id, alias, start_date, end_date, base_output=None
         file_name = f"{station_id}_{start_str}_{end_str}.json"
         file_path = os.path.join(output_dir, file_name)
 
-        print(f"\n🔍 Checking {alias} ({station_id}) for {start_str} to {end_str}")
         if os.path.exists(file_path):
-            print(f"✅ Skipping {file_name}, already exists.")
+            print(f"✅ Skipping {alias}/{file_name}, already exists.")
+        else:
+            windows.append((station_id, alias, start_str, end_str, file_path))
+        current_start += delta
+    return windows
+
+def _retry_delay(response, attempt):
+    retry_after = response.headers.get("Retry-After") if response is not None else None
+    if retry_after:
+        try:
+            return float(retry_after)
+        except ValueError:
+            pass
+    return min(60, 2 ** attempt)
+
+def fetch_window(session, limiter, api_key, window, base_url=TWC_BASE_URL, max_retries=PWS_MAX_RETRIES):
+    """Fetch one window and save it. Returns a short status string for the progress log."""
+    station_id, alias, start_str, end_str, file_path = window
+    url = f"{base_url}/v2/pws/history/hourly"
+    params = {
+        "stationId": station_id, "format": "json", "units": "e",
+        "startDate": start_str, "endDate": end_str, "apiKey": api_key,
+    }
+
+    for attempt in range(max_retries + 1):
+        limiter.acquire()
+        response = None
+        try:
+            response = session.get(url, params=params, timeout=PWS_REQUEST_TIMEOUT)
+        except requests.RequestException as e:
+            print(f"⚠️ {alias} {start_str}-{end_str}: {e} (attempt {attempt + 1})")
         else:
-            url = (
-                f"https://api.weather.com/v2/pws/history/hourly?"
-                f"stationId={station_id}&format=json&units=e"
-                f"&startDate={start_str}&endDate={end_str}&apiKey={api_key}"
-            )
-            print(f"➡️ Requesting: {url}")
+            status = response.status_code
+            if status == 200:
+                payload = response.json()
+                if not payload.get("observations"):
+                    return "empty"
+                # Write to a temp file first so an interrupted run never leaves a
+                # truncated window that the next run would skip as done.
+                tmp_path = file_path + ".part"
+                with open(tmp_path, "w") as f:
+                    json.dump(payload, f, indent=2)
+                os.replace(tmp_path, file_path)
+                return "saved"
+            if status == 204:
+                return "no data (204)"
+            if status == 401:
+                return "unauthorized (401) — check your API key"
+            if status == 403:
+                return "forbidden (403) — API key might lack permissions"
+            if status not in RETRY_STATUSES:
+                return f"error {status}: {response.text[:200]}"
+            print(f"⚠️ {alias} {start_str}-{end_str}: HTTP {status} (attempt {attempt + 1})")
 
+        if attempt < max_retries:
+            time.sleep(_retry_delay(response, attempt))
+    return "gave up after retries"
+
+def fetch_all_stations(station_map, start_date, end_date, base_output=None,
+                       concurrency=PWS_FETCH_CONCURRENCY, rate_per_min=PWS_RATE_PER_MIN,
+                       base_url=TWC_BASE_URL, api_key=None):
+    """
+    Fetch every missing window for every station on one thread pool, sharing a
+    keep-alive session and a rate limiter. Returns {status: count}.
+    """
+    api_key = api_key or os.getenv("WEATHER_API_KEY")
+    if not api_key:
+        print("❌ WEATHER_API_KEY missing in .env")
+        return {}
+    base_output = base_output or default_output_dir()
+
+    windows = []
+    for station_id, alias in station_map.items():
+        windows.extend(plan_windows(station_id, alias, start_date, end_date, base_output))
+    if not windows:
+        print("✅ All windows already fetched.")
+        return {}
+
+    print(f"🔍 Fetching {len(windows)} windows with {concurrency} workers at ≤{rate_per_min:g} calls/min")
+    limiter = TokenBucket(rate_per_min)
+    results = {}
+    with make_session(concurrency) as session, ThreadPoolExecutor(max_workers=concurrency) as pool:
+        futures = {
+            pool.submit(fetch_window, session, limiter, api_key, window, base_url): window
+            for window in windows
+        }
+        for done, future in enumerate(as_completed(futures), start=1):
+            station_id, alias, start_str, end_str, _ = futures[future]
             try:
-                response = requests.get(url)
-                print(f"📡 Status Code: {response.status_code}")
-
-                if response.status_code == 200:
-                    data = response.json()
-                    obs = data.get("observations", [])
-                    if obs:
-                        with open(file_path, "w") as f:
-                            json.dump(data, f, indent=2)
-                        print(f"✅ Data saved: {file_name}")
-                    else:
-                        print(f"⚠️ No observations in response — skipping save.")
-                elif response.status_code == 204:
-                    print(f"❌ No data available (204 No Content)")
-                elif response.status_code == 401:
-                    print(f"❌ Unauthorized (401). Check your API key.")
-                elif response.status_code == 403:
-                    print(f"❌ Forbidden (403). API key might lack permissions.")
-                else:
-                    print(f"❌ Error {response.status_code}: {response.text}")
+                status = future.result()
             except Exception as e:
-                print(f"❌ Exception occurred: {e}")
+                status = f"exception: {e}"
+            results[status] = results.get(status, 0) + 1
+            print(f"[{done}/{len(windows)}] {alias} ({station_id}) {start_str}-{end_str}: {status}")
+    return results
 
-        current_start += delta
+def fetch_station_data(station_id, alias, start_date, end_date, base_output=None):
+    return fetch_all_stations({station_id: alias}, start_date, end_date, base_output=base_output)
 
 # === Run script for multiple stations ===
-if __name__ == "__main__":
-    station_map = {
-        "KORMCMIN133": "propdada",
-        "KORMCMIN127": "dustprop"
-    }
+STATION_MAP = {
+    "KORMCMIN133": "propdada",
+    "KORMCMIN127": "dustprop"
+}
 
+def main():
     start = datetime.now() - timedelta(days=365)
     end = datetime.now()
 
-    for station_id, alias in station_map.items():
-        fetch_station_data(station_id, alias, start, end)
+    results = fetch_all_stations(STATION_MAP, start, end)
+    print(f"📦 Fetch summary: {results}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Compile the TWC field mapping (config/full_weather_json_fields.csv) into one
+specialised function per mapping, instead of re-interpreting the mapping
+(startswith / split / nested .get) for every field of every observation.
+
+    extract = compile_extractor(field_map)
+    extract.columns          # weather_raw column order
+    extract(record)          # -> tuple in that order
+    extract_columns(obs, extract)  # -> {column: [values...]}
+"""
+
+# Keys every row carries even if the mapping CSV leaves them out
+BASE_FIELDS = {
+    "station_id": "stationID",
+    "local_time": "obsTimeLocal",
+}
+
+NESTED_PREFIX = "imperial."
+
+def column_sources(field_map):
+    """db column -> (top-level key, nested key or None), in weather_raw column order."""
+    sources = {col: (key, None) for col, key in BASE_FIELDS.items()}
+    for json_key, db_column in field_map.items():
+        if json_key.startswith(NESTED_PREFIX):
+            sources[db_column] = ("imperial", json_key[len(NESTED_PREFIX):])
+        else:
+            sources[db_column] = (json_key, None)
+    return sources
+
+def compile_extractor(field_map):
+    sources = column_sources(field_map)
+    columns = list(sources)
+
+    exprs = []
+    for top, nested in sources.values():
+        if nested is None:
+            exprs.append(f"get({top!r})")
+        else:
+            exprs.append(f"imp_get({nested!r})")
+
+    # Generated body is a single tuple display: no per-field branching at run time
+    src = (
+        "def extract(record, _empty={}):\n"
+        "    get = record.get\n"
+        "    imp_get = (get('imperial') or _empty).get\n"
+        f"    return ({', '.join(exprs)},)\n"
+    )
+    namespace = {}
+    exec(compile(src, "<twc_field_extractor>", "exec"), namespace)
+    extract = namespace["extract"]
+    extract.columns = columns
+    extract.source = src
+    return extract
+
+def extract_columns(observations, extract):
+    """Columnar output ({column: list}) ready for pd.DataFrame without a dict per row."""
+    if not observations:
+        return {col: [] for col in extract.columns}
+    return dict(zip(extract.columns, map(list, zip(*map(extract, observations)))))
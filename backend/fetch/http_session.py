@@ -0,0 +1,14 @@
+"""
+Keep-alive HTTP sessions shared by the TWC history fetcher (fetch_pws_history)
+and the API's current-conditions proxy (pws_proxy).
+"""
+import requests
+from requests.adapters import HTTPAdapter
+
+def make_session(pool_size):
+    """Keep-alive session whose connection pool matches the caller's concurrency."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
@@ -0,0 +1,69 @@
+import os
+import hashlib
+import logging
+
+# Set to 1 to re-ingest every file regardless of what the manifest says
+INGEST_FORCE = os.getenv("INGEST_FORCE", "0") == "1"
+
+def ensure_manifest_table(cur):
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS ingest_manifest (
+            path TEXT PRIMARY KEY,
+            size BIGINT NOT NULL,
+            mtime DOUBLE PRECISION NOT NULL,
+            content_hash TEXT NOT NULL,
+            rows_ingested INTEGER NOT NULL,
+            ingested_at TIMESTAMP NOT NULL DEFAULT NOW()
+        );
+    """)
+
+def file_hash(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+def load_manifest(cur):
+    cur.execute("SELECT path, size, mtime, content_hash FROM ingest_manifest;")
+    return {path: (size, mtime, content_hash) for path, size, mtime, content_hash in cur.fetchall()}
+
+def files_to_ingest(cur, paths, base_dir, force=INGEST_FORCE):
+    """
+    Filter `paths` down to files that are new or changed since they were last
+    ingested. Size + mtime is checked first; the content hash is only computed
+    when those differ, so an untouched archive costs one stat() per file.
+    Returns [(path, manifest_key, size, mtime, content_hash)].
+    """
+    manifest = {} if force else load_manifest(cur)
+    todo, skipped = [], 0
+    for path in paths:
+        key = os.path.relpath(path, base_dir)
+        st = os.stat(path)
+        known = manifest.get(key)
+        if known and known[0] == st.st_size and known[1] == st.st_mtime:
+            skipped += 1
+            continue
+        digest = file_hash(path)
+        if known and known[2] == digest:
+            # Touched but identical (e.g. copied); remember the new mtime and move on
+            cur.execute("UPDATE ingest_manifest SET size = %s, mtime = %s WHERE path = %s;",
+                        (st.st_size, st.st_mtime, key))
+            skipped += 1
+            continue
+        todo.append((path, key, st.st_size, st.st_mtime, digest))
+    logging.info(f"🗂️ Manifest: {len(todo)} new/changed files to ingest, {skipped} unchanged skipped.")
+    return todo
+
+def record_ingested(cur, entry, rows):
+    _, key, size, mtime, digest = entry
+    cur.execute("""
+        INSERT INTO ingest_manifest (path, size, mtime, content_hash, rows_ingested, ingested_at)
+        VALUES (%s, %s, %s, %s, %s, NOW())
+        ON CONFLICT (path) DO UPDATE
+        SET size = EXCLUDED.size,
+            mtime = EXCLUDED.mtime,
+            content_hash = EXCLUDED.content_hash,
+            rows_ingested = EXCLUDED.rows_ingested,
+            ingested_at = NOW()
+    """, (key, size, mtime, digest, rows))
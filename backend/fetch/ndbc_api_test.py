@@ -1,5 +1,6 @@
 #!/usr/bin/env python3
 from ndbc_api import NdbcApi
+from ndbc_cache import cached_client
 import pandas as pd
 import math
 
@@ -7,6 +8,7 @@ import math
 STATIONS = ['46050', '46015', '46027', '46059', '46076', '51002', '44065', '41009', '46011', '46041']
 AIR_COLS   = ['WDIR', 'WSPD', 'GST', 'PRES', 'ATMP', 'DEWP']
 OCEAN_COLS = ['WVHT', 'DPD', 'APD', 'MWD', 'WTMP', 'VIS', 'PTDY', 'TIDE']
+BUOY_COLS  = list(dict.fromkeys(AIR_COLS + OCEAN_COLS))  # fetched once, split below
 START = '2025-01-01'
 END   = '2025-09-01'
 POPULATED_THRESHOLD = 0.30   # 30% of columns must be non-null
@@ -63,23 +65,19 @@ def count_populated_by_station(df: pd.DataFrame, threshold: float, station: list
     return counts
 
 # ---------- fetch ----------
-ndbc_api = NdbcApi()
+ndbc_api = cached_client(NdbcApi())
 
-air_buoys_df = ndbc_api.get_data(
+buoys_df = ndbc_api.get_data(
     station_ids=STATIONS,
     modes=['stdmet', 'cwind'],
     start_time=START,
     end_time=END,
-    cols=AIR_COLS
+    cols=BUOY_COLS
 )
 
-ocean_buoys_df = ndbc_api.get_data(
-    station_ids=STATIONS,
-    modes=['stdmet', 'cwind'],
-    start_time=START,
-    end_time=END,
-    cols=OCEAN_COLS
-)
+# air/ocean projections of the one frame; rows with none of a group's columns are dropped
+air_buoys_df = buoys_df[[c for c in AIR_COLS if c in buoys_df.columns]].dropna(how="all")
+ocean_buoys_df = buoys_df[[c for c in OCEAN_COLS if c in buoys_df.columns]].dropna(how="all")
 
 # ---------- processing ----------
 # only HH:10 (optionally ± MINUTE_TOLERANCE)
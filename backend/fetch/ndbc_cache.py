@@ -0,0 +1,194 @@
+"""
+On-disk cache of parsed NDBC frames, wrapped around an NdbcApi-like client.
+
+    api = cached_client(NdbcApi())
+    df = api.get_data(station_ids=[...], modes=["stdmet", "cwind"], start_time=START, end_time=END)
+
+Every (station, mode) is stored as whole periods in Parquet:
+
+    data_ndbc/46050/stdmet/2025-03.parquet       # a month before the current one
+    data_ndbc/46050/stdmet/2025-09-14.parquet    # a past day of the current month
+    data_ndbc/46050/stdmet/2025-09-15.open.parquet  # today, still filling in
+
+A period only counts as closed NDBC_CACHE_CLOSE_LAG seconds after it ends,
+since realtime observations keep arriving late. Closed periods are served
+from disk forever. Open ones (today, or one that just ended) are refetched
+once their file is older than NDBC_CACHE_OPEN_TTL seconds, and an .open file
+whose period has since closed is refetched once more and stored as closed.
+An empty frame is never stored as closed, so an outage isn't cached forever.
+Consecutive missing periods are fetched in one upstream call and split on
+the way to disk. Frames are cached with all their columns, so requests for
+different `cols` share the same files.
+"""
+from __future__ import annotations
+import os
+import time
+from datetime import datetime, timezone
+from typing import Iterator, List, Optional, Tuple
+
+import pandas as pd
+from dotenv import load_dotenv
+
+load_dotenv()
+
+NDBC_CACHE = os.getenv("NDBC_CACHE", "1") != "0"
+NDBC_CACHE_DIR = os.getenv("NDBC_CACHE_DIR") or os.path.abspath(
+    os.path.join(os.path.dirname(__file__), "..", "..", "data_ndbc"))
+NDBC_CACHE_OPEN_TTL = int(os.getenv("NDBC_CACHE_OPEN_TTL", "900"))  # seconds before today's file is refetched
+NDBC_CACHE_CLOSE_LAG = int(os.getenv("NDBC_CACHE_CLOSE_LAG", "10800"))  # seconds after a period ends before it's final
+
+# A period: (key used in the file name, start, end) with end exclusive, naive UTC
+Period = Tuple[str, pd.Timestamp, pd.Timestamp]
+
+def _naive_utc(value) -> pd.Timestamp:
+    ts = pd.Timestamp(value)
+    return ts.tz_convert("UTC").tz_localize(None) if ts.tzinfo is not None else ts
+
+def iter_periods(start: pd.Timestamp, end: pd.Timestamp, now: pd.Timestamp) -> Iterator[Period]:
+    """Months before the current one, then days of the current month, covering [start, end]."""
+    this_month = now.normalize().replace(day=1)
+    cursor = start.normalize().replace(day=1) if start < this_month else start.normalize()
+    while cursor <= end:
+        if cursor < this_month:
+            nxt = cursor + pd.offsets.MonthBegin(1)
+            yield cursor.strftime("%Y-%m"), cursor, nxt
+        else:
+            nxt = cursor + pd.Timedelta(days=1)
+            yield cursor.strftime("%Y-%m-%d"), cursor, nxt
+        cursor = nxt
+
+class CachedNdbcApi:
+    """NdbcApi.get_data with each (station, mode, period) read from / written to NDBC_CACHE_DIR."""
+
+    def __init__(self, api, cache_dir: str = NDBC_CACHE_DIR, open_ttl: int = NDBC_CACHE_OPEN_TTL,
+                 close_lag: int = NDBC_CACHE_CLOSE_LAG):
+        self.api = api
+        self.cache_dir = cache_dir
+        self.open_ttl = open_ttl
+        self.close_lag = pd.Timedelta(seconds=close_lag)
+        self.hits = 0
+        self.fetches = 0
+
+    # ---- files ----
+
+    def _path(self, station_id: str, mode: str, key: str, is_open: bool) -> str:
+        name = f"{key}.open.parquet" if is_open else f"{key}.parquet"
+        return os.path.join(self.cache_dir, str(station_id), mode, name)
+
+    def _is_closed(self, period: Period, now: pd.Timestamp) -> bool:
+        return period[2] + self.close_lag <= now
+
+    def _cached(self, station_id: str, mode: str, period: Period, now: pd.Timestamp) -> Optional[pd.DataFrame]:
+        key = period[0]
+        closed = self._path(station_id, mode, key, is_open=False)
+        if os.path.exists(closed):
+            return pd.read_parquet(closed)
+        opened = self._path(station_id, mode, key, is_open=True)
+        if not self._is_closed(period, now) and os.path.exists(opened) and time.time() - os.path.getmtime(opened) < self.open_ttl:
+            return pd.read_parquet(opened)
+        return None
+
+    def _store(self, station_id: str, mode: str, period: Period, df: pd.DataFrame, now: pd.Timestamp):
+        key = period[0]
+        is_open = df.empty or not self._is_closed(period, now)
+        path = self._path(station_id, mode, key, is_open)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + ".tmp"
+        df.to_parquet(tmp_path)
+        os.replace(tmp_path, path)
+        if not is_open:
+            stale = self._path(station_id, mode, key, is_open=True)
+            if os.path.exists(stale):
+                os.remove(stale)
+
+    # ---- upstream ----
+
+    def _fetch(self, station_id: str, mode: str, start: pd.Timestamp, end: pd.Timestamp) -> pd.DataFrame:
+        self.fetches += 1
+        raw = self.api.get_data(station_id=station_id, mode=mode,
+                                start_time=start.to_pydatetime(), end_time=end.to_pydatetime(), as_df=True)
+        df = raw.copy() if isinstance(raw, pd.DataFrame) else pd.DataFrame()
+        # Periods are split on the index, so it has to be naive UTC timestamps
+        index = pd.to_datetime(df.index, utc=True, errors="coerce").tz_localize(None)
+        df.index = index.rename("timestamp")
+        return df[index.notna()].sort_index()
+
+    def _fetch_run(self, station_id: str, mode: str, run: List[Period], now: pd.Timestamp) -> List[pd.DataFrame]:
+        """One upstream call for consecutive missing periods, split and stored per period."""
+        start, end = run[0][1], min(run[-1][2], now)
+        df = self._fetch(station_id, mode, start, end)
+        parts = []
+        for period in run:
+            _, period_start, period_end = period
+            part = df[(df.index >= period_start) & (df.index < period_end)]
+            self._store(station_id, mode, period, part, now)
+            parts.append(part)
+        return parts
+
+    def station_frame(self, station_id: str, mode: str, start_time, end_time) -> pd.DataFrame:
+        """All columns for one station and mode over [start_time, end_time], timestamp-indexed."""
+        now = pd.Timestamp(datetime.now(timezone.utc)).tz_localize(None)
+        start = _naive_utc(start_time)
+        end = min(_naive_utc(end_time), now)
+
+        parts, missing = [], []
+        for period in iter_periods(start, end, now):
+            df = self._cached(station_id, mode, period, now)
+            if df is None:
+                missing.append(period)
+                continue
+            self.hits += 1
+            if missing:
+                parts.extend(self._fetch_run(station_id, mode, missing, now))
+                missing = []
+            parts.append(df)
+        if missing:
+            parts.extend(self._fetch_run(station_id, mode, missing, now))
+
+        parts = [p for p in parts if not p.empty]
+        if not parts:
+            return pd.DataFrame(index=pd.DatetimeIndex([], name="timestamp"))
+        df = pd.concat(parts)
+        return df[(df.index >= start) & (df.index <= end)]
+
+    def get_data(self, station_id: Optional[str] = None, mode: Optional[str] = None,
+                 start_time=None, end_time=None, use_timestamp: bool = True, as_df: bool = True,
+                 cols: Optional[List[str]] = None, station_ids: Optional[List[str]] = None,
+                 modes: Optional[List[str]] = None) -> pd.DataFrame:
+        """
+        Same call shapes as NdbcApi.get_data. One station and mode gives a
+        timestamp-indexed frame; station_ids/modes give a [timestamp, station_id]
+        MultiIndex with each station's modes merged on timestamp (earlier modes
+        win where they share a column, e.g. stdmet WSPD over cwind WSPD). In
+        that form a station/mode the upstream call fails for is logged and left
+        out, so one missing buoy or mode doesn't sink the rest.
+        """
+        end_time = end_time or datetime.now(timezone.utc)
+        start_time = start_time or _naive_utc(end_time) - pd.Timedelta(days=45)
+
+        def select(df):
+            return df[[c for c in cols if c in df.columns]] if cols else df
+
+        if station_ids is None and modes is None:
+            return select(self.station_frame(station_id, mode, start_time, end_time))
+
+        frames = []
+        for stn in station_ids or [station_id]:
+            merged = None
+            for m in modes or [mode]:
+                try:
+                    df = self.station_frame(stn, m, start_time, end_time)
+                except Exception as e:
+                    print(f"⚠️ NDBC {stn}/{m} skipped: {type(e).__name__}: {e}")
+                    continue
+                df = df[~df.index.duplicated(keep="first")]
+                merged = df if merged is None else merged.combine_first(df)
+            if merged is not None and not merged.empty:
+                frames.append(merged.assign(station_id=stn).set_index("station_id", append=True))
+        if not frames:
+            return pd.DataFrame(index=pd.MultiIndex.from_arrays([[], []], names=["timestamp", "station_id"]))
+        return select(pd.concat(frames).sort_index())
+
+def cached_client(api, enabled: bool = NDBC_CACHE):
+    """Wrap an NdbcApi-like client in the disk cache unless NDBC_CACHE=0."""
+    return CachedNdbcApi(api) if enabled else api
@@ -23,70 +23,79 @@ Outputs (per station):
   # Sea surface temp (buoys only, if present)
   'sea_temp_avg': 60.4,                                             # °F
   # Raw units used
-  'units': 'us'                                                     # 'us' or 'si'
+  'units': 'us',                                                    # 'us' or 'si'
+  # Only when the station's fetch failed or timed out (buoys)
+  'error': 'timed out after 60s'
 }
 
 Customize the station lists and `LOOKBACK_HOURS` in __main__.
 """
 
 from __future__ import annotations
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from datetime import datetime, timedelta, timezone
-from typing import List, Dict, Optional, Tuple
+from typing import Iterator, List, Dict, Optional, Tuple
 import math
+import os
+import time
 
 import requests
 import pandas as pd
-from ndbc_api import NdbcApi   # pip install ndbc-api
+try:
+    from ndbc_api import NdbcApi   # pip install ndbc-api
+except ImportError:
+    NdbcApi = None
+
+import unit_kernels as kernels
+from ndbc_cache import cached_client
 
 # --------------------------- Config ---------------------------
 
 AWC_METAR = "https://aviationweather.gov/api/data/metar"  # airport METAR JSON
 DEFAULT_UNITS = "us"  # 'us' (°F, mph, inHg) or 'si' (°C, m/s, hPa)
 
+NDBC_CLIENT = os.getenv("NDBC_CLIENT", "ndbc")  # 'fake' = offline fake_ndbc.FakeNdbcApi
+BUOY_FETCH_WORKERS = int(os.getenv("BUOY_FETCH_WORKERS", "4"))  # 1 = one buoy at a time
+BUOY_FETCH_TIMEOUT = float(os.getenv("BUOY_FETCH_TIMEOUT", "60"))  # seconds per station
+
 # --------------------------- Unit helpers ---------------------------
+# Scalar wrappers over unit_kernels (None in or NaN out -> None); use the
+# kernels directly on whole columns.
+
+def _scalar(value) -> Optional[float]:
+    value = float(value)
+    return None if math.isnan(value) else value
 
 def c_to_f(c: Optional[float]) -> Optional[float]:
-    return None if c is None or pd.isna(c) else (c * 9/5 + 32)
+    return _scalar(kernels.c_to_f(c))
 
 def f_to_c(f: Optional[float]) -> Optional[float]:
-    return None if f is None or pd.isna(f) else ((f - 32) * 5/9)
+    return _scalar(kernels.f_to_c(f))
 
 def ms_to_mph(v: Optional[float]) -> Optional[float]:
-    return None if v is None or pd.isna(v) else (v * 2.236936)
+    return _scalar(kernels.ms_to_mph(v))
 
 def kt_to_mps(v: Optional[float]) -> Optional[float]:
-    return None if v is None or pd.isna(v) else (v * 0.514444)
+    return _scalar(kernels.kt_to_mps(v))
 
 def kt_to_mph(v: Optional[float]) -> Optional[float]:
-    return None if v is None or pd.isna(v) else (v * 1.15078)
+    return _scalar(kernels.kt_to_mph(v))
 
 def hpa_to_inhg(v: Optional[float]) -> Optional[float]:
-    return None if v is None or pd.isna(v) else (v / 33.8639)
+    return _scalar(kernels.hpa_to_inhg(v))
 
 def inhg_to_hpa(v: Optional[float]) -> Optional[float]:
-    return None if v is None or pd.isna(v) else (v * 33.8639)
+    return _scalar(kernels.inhg_to_hpa(v))
 
 # --------------------------- Psychrometrics ---------------------------
 
 def rh_from_t_and_td(temp_c: Optional[float], dewpoint_c: Optional[float]) -> Optional[float]:
     """Compute relative humidity (%) from T (°C) and Td (°C)."""
-    if temp_c is None or dewpoint_c is None or pd.isna(temp_c) or pd.isna(dewpoint_c):
-        return None
-    # Magnus approximation
-    a, b = 17.625, 243.04
-    es = math.exp(a * temp_c / (b + temp_c))
-    e  = math.exp(a * dewpoint_c / (b + dewpoint_c))
-    rh = 100.0 * (e / es)
-    return max(0.0, min(100.0, rh))
+    return _scalar(kernels.rh_from_t_and_td(temp_c, dewpoint_c))
 
 def dewpoint_from_t_and_rh(temp_c: Optional[float], rh_percent: Optional[float]) -> Optional[float]:
     """Compute dewpoint (°C) from T (°C) and RH (%)."""
-    if temp_c is None or rh_percent is None or pd.isna(temp_c) or pd.isna(rh_percent) or rh_percent <= 0:
-        return None
-    a, b = 17.625, 243.04
-    gamma = (a * temp_c / (b + temp_c)) + math.log(rh_percent / 100.0)
-    td = (b * gamma) / (a - gamma)
-    return td
+    return _scalar(kernels.dewpoint_from_t_and_rh(temp_c, rh_percent))
 
 # --------------------------- METAR (airports) ---------------------------
 
@@ -189,60 +198,128 @@ def _ensure_buoy_time(df: pd.DataFrame) -> pd.Series:
         return _to_utc_series_any(ts)
     return pd.Series(pd.NaT, index=df.index)
 
-def fetch_buoys_stdmet(buoy_ids: List[str], hours: int = 6) -> Dict[str, pd.DataFrame]:
+def make_ndbc_client(kind: str = NDBC_CLIENT, cached: bool = True):
+    """
+    One NDBC client to share between fetches: the real NdbcApi, behind the disk
+    cache for historical windows (cached=False for short live lookbacks, which
+    the cache would widen to whole days), or the offline fake, never cached so
+    synthetic rows don't land in NDBC_CACHE_DIR.
+    """
+    if kind == "fake":
+        from fake_ndbc import FakeNdbcApi
+        return FakeNdbcApi()
+    if NdbcApi is None:
+        raise ImportError("ndbc-api is not installed (pip install ndbc-api) — or set NDBC_CLIENT=fake")
+    return cached_client(NdbcApi()) if cached else NdbcApi()
+
+def _normalize_stdmet(raw, start_utc: datetime) -> pd.DataFrame:
+    """ndbc-api stdmet frame -> SI columns from start_utc on, sorted by time_utc."""
+    df = raw if isinstance(raw, pd.DataFrame) else pd.DataFrame()
+    if df.empty:
+        return df
+
+    # build/parse time column (may come back tz-naive)
+    t = _ensure_buoy_time(df)
+    df = df.assign(time_utc=t)
+
+    def col(name): return name if name in df.columns else None
+    mapped = pd.DataFrame({
+        "time_utc": df["time_utc"],
+        "temp_c":   df[col("ATMP")] if col("ATMP") else None,
+        "dewpoint_c": df[col("DEWP")] if col("DEWP") else None,
+        "wind_mps": df[col("WSPD")] if col("WSPD") else None,
+        "gust_mps": df[col("GST")]  if col("GST")  else None,
+        "pressure_hpa": df[col("PRES")] if col("PRES") else None,
+        "sea_temp_c": df[col("WTMP")] if col("WTMP") else None,
+    })
+
+    # 🔧 force tz-aware UTC to avoid tz-naive vs tz-aware comparisons
+    mapped["time_utc"] = pd.to_datetime(mapped["time_utc"], utc=True, errors="coerce")
+
+    # numeric coercion
+    for k in ["temp_c","dewpoint_c","wind_mps","gust_mps","pressure_hpa","sea_temp_c"]:
+        if k in mapped.columns:
+            mapped[k] = pd.to_numeric(mapped[k], errors="coerce")
+
+    mapped = mapped.dropna(subset=["time_utc"])
+    return mapped[mapped["time_utc"] >= start_utc].sort_values("time_utc")
+
+def _fetch_buoy(api, stn: str, start_utc: datetime, end_utc: datetime, started: Dict[str, float]) -> pd.DataFrame:
+    started[stn] = time.monotonic()
+    # Naive UTC datetimes: ndbc-api takes them as-is, so the request covers
+    # the lookback window itself rather than whole calendar days
+    raw = api.get_data(station_id=stn, mode="stdmet",
+                       start_time=start_utc.replace(tzinfo=None), end_time=end_utc.replace(tzinfo=None),
+                       as_df=True)
+    return _normalize_stdmet(raw, start_utc)
+
+def iter_buoys_stdmet(
+    buoy_ids: List[str],
+    hours: int = 6,
+    api=None,
+    workers: int = BUOY_FETCH_WORKERS,
+    timeout: float = BUOY_FETCH_TIMEOUT,
+) -> Iterator[Dict]:
+    """
+    Fetch stdmet for each buoy on a pool of `workers` threads sharing one client,
+    yielding {"station_id", "df", "error", "seconds"} as each station finishes.
+    A station that raises or runs longer than `timeout` seconds (counted from
+    when its call started) is yielded with an empty df and the reason in "error";
+    a timed-out call is abandoned, not interrupted.
+    """
+    # Uncached: the lookback is hours, and the cache would fetch whole days of it
+    api = api if api is not None else make_ndbc_client(cached=False)
+    end_utc = datetime.now(timezone.utc)
+    start_utc = end_utc - timedelta(hours=hours)
+
+    started: Dict[str, float] = {}
+    pool = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="ndbc")
+    futures = {pool.submit(_fetch_buoy, api, stn, start_utc, end_utc, started): stn
+               for stn in dict.fromkeys(buoy_ids)}
+
+    def record(stn, df, error):
+        seconds = time.monotonic() - started.get(stn, time.monotonic())
+        if error:
+            print(f"⚠️ buoy {stn}: {error}")
+        return {"station_id": stn, "df": df, "error": error, "seconds": round(seconds, 3)}
+
+    pending = set(futures)
+    try:
+        while pending:
+            now = time.monotonic()
+            overdue = [f for f in pending if futures[f] in started and not f.done()
+                       and now - started[futures[f]] >= timeout]
+            for future in overdue:
+                pending.discard(future)
+                yield record(futures[future], pd.DataFrame(), f"timed out after {timeout:g}s")
+
+            running = [started[futures[f]] for f in pending if futures[f] in started]
+            wait_for = max(0.0, min(running) + timeout - now) if running else timeout
+            done, pending = wait(pending, timeout=wait_for, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    yield record(futures[future], future.result(), None)
+                except Exception as e:
+                    yield record(futures[future], pd.DataFrame(), f"{type(e).__name__}: {e}")
+    finally:
+        # Don't wait on abandoned calls; drop anything not yet started
+        pool.shutdown(wait=False, cancel_futures=True)
+
+def fetch_buoys_stdmet(
+    buoy_ids: List[str],
+    hours: int = 6,
+    api=None,
+    workers: int = BUOY_FETCH_WORKERS,
+    timeout: float = BUOY_FETCH_TIMEOUT,
+) -> Dict[str, Dict]:
     """
     Fetch standard meteorological data for buoys via ndbc-api, then filter to last `hours`.
     Normalize to (SI): time_utc, temp_c (ATMP), dewpoint_c (DEWP), wind_mps (WSPD),
     gust_mps (GST), pressure_hpa (PRES), sea_temp_c (WTMP).
+    Returns {station: {"df", "error", "seconds", ...}} in buoy_ids order; see iter_buoys_stdmet.
     """
-    api = NdbcApi()
-    now_utc = datetime.now(timezone.utc)
-    start_utc = now_utc - timedelta(hours=hours)
-    start_date = start_utc.date().isoformat()
-    end_date   = now_utc.date().isoformat()
-
-    out: Dict[str, pd.DataFrame] = {}
-    for stn in buoy_ids:
-        try:
-            raw = api.get_data(station_id=stn, mode="stdmet",
-                               start_time=start_date, end_time=end_date, as_df=True)
-        except Exception:
-            out[stn] = pd.DataFrame()
-            continue
-
-        df = raw if isinstance(raw, pd.DataFrame) else pd.DataFrame()
-        if df.empty:
-            out[stn] = df
-            continue
-
-        # build/parse time column (may come back tz-naive)
-        t = _ensure_buoy_time(df)
-        df = df.assign(time_utc=t)
-
-        def col(name): return name if name in df.columns else None
-        mapped = pd.DataFrame({
-            "time_utc": df["time_utc"],
-            "temp_c":   df[col("ATMP")] if col("ATMP") else None,
-            "dewpoint_c": df[col("DEWP")] if col("DEWP") else None,
-            "wind_mps": df[col("WSPD")] if col("WSPD") else None,
-            "gust_mps": df[col("GST")]  if col("GST")  else None,
-            "pressure_hpa": df[col("PRES")] if col("PRES") else None,
-            "sea_temp_c": df[col("WTMP")] if col("WTMP") else None,
-        })
-
-        # 🔧 force tz-aware UTC to avoid tz-naive vs tz-aware comparisons
-        mapped["time_utc"] = pd.to_datetime(mapped["time_utc"], utc=True, errors="coerce")
-
-        # numeric coercion
-        for k in ["temp_c","dewpoint_c","wind_mps","gust_mps","pressure_hpa","sea_temp_c"]:
-            if k in mapped.columns:
-                mapped[k] = pd.to_numeric(mapped[k], errors="coerce")
-
-        mapped = mapped.dropna(subset=["time_utc"])
-        mapped = mapped[mapped["time_utc"] >= start_utc].sort_values("time_utc")
-        out[stn] = mapped
-
-    return out
+    results = {r["station_id"]: r for r in iter_buoys_stdmet(buoy_ids, hours, api, workers, timeout)}
+    return {stn: results[stn] for stn in dict.fromkeys(buoy_ids)}
 
 # --------------------------- Aggregation ---------------------------
 
@@ -302,16 +379,16 @@ def to_pws_metrics(df: pd.DataFrame, station_id: str, period_hours: int, source:
     # Relative humidity if missing: compute from temp & dewpoint
     if "dewpoint_c" in df and "temp_c" in df:
         if "humidity" not in df.columns or df["humidity"].isna().all():
-            df["humidity"] = [rh_from_t_and_td(t, d) for t, d in zip(df["temp_c"], df["dewpoint_c"])]
+            df["humidity"] = kernels.rh_from_t_and_td(df["temp_c"], df["dewpoint_c"])
 
     # Unit conversion
     if units == "us":
-        t_col = df["temp_c"].apply(c_to_f) if "temp_c" in df else pd.Series(dtype=float)
-        td_col = df["dewpoint_c"].apply(c_to_f) if "dewpoint_c" in df else pd.Series(dtype=float)
-        w_col = df["wind_mps"].apply(ms_to_mph) if "wind_mps" in df else pd.Series(dtype=float)
-        g_col = df["gust_mps"].apply(ms_to_mph) if "gust_mps" in df else pd.Series(dtype=float)
-        p_col = df["pressure_hpa"].apply(hpa_to_inhg) if "pressure_hpa" in df else pd.Series(dtype=float)
-        st_col= df["sea_temp_c"].apply(c_to_f) if "sea_temp_c" in df else pd.Series(dtype=float)
+        t_col = kernels.c_to_f(df["temp_c"]) if "temp_c" in df else pd.Series(dtype=float)
+        td_col = kernels.c_to_f(df["dewpoint_c"]) if "dewpoint_c" in df else pd.Series(dtype=float)
+        w_col = kernels.ms_to_mph(df["wind_mps"]) if "wind_mps" in df else pd.Series(dtype=float)
+        g_col = kernels.ms_to_mph(df["gust_mps"]) if "gust_mps" in df else pd.Series(dtype=float)
+        p_col = kernels.hpa_to_inhg(df["pressure_hpa"]) if "pressure_hpa" in df else pd.Series(dtype=float)
+        st_col= kernels.c_to_f(df["sea_temp_c"]) if "sea_temp_c" in df else pd.Series(dtype=float)
     else:  # 'si'
         t_col  = df.get("temp_c", pd.Series(dtype=float))
         td_col = df.get("dewpoint_c", pd.Series(dtype=float))
@@ -355,13 +432,15 @@ def fetch_and_aggregate(
     where metrics match the PWS-like schema you use (temp_* / wind_* / humidity_avg / etc.).
     """
     # Fetch
-    buoy_df_map  = fetch_buoys_stdmet(buoy_ids, hours=hours)
+    buoy_results = fetch_buoys_stdmet(buoy_ids, hours=hours)
     metar_df_map = fetch_metars_awc(airport_ids, hours=hours)
 
     # Aggregate
     result = {"BUOY": {}, "METAR": {}}
-    for stn, df in buoy_df_map.items():
-        result["BUOY"][stn] = to_pws_metrics(df, stn, hours, "BUOY", units=units)
+    for stn, fetched in buoy_results.items():
+        result["BUOY"][stn] = to_pws_metrics(fetched["df"], stn, hours, "BUOY", units=units)
+        if fetched["error"]:
+            result["BUOY"][stn]["error"] = fetched["error"]
     for icao, df in metar_df_map.items():
         # For METARs, add humidity from T & Td inside to_pws_metrics
         result["METAR"][icao] = to_pws_metrics(df, icao, hours, "METAR", units=units)
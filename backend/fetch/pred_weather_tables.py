@@ -1,8 +1,11 @@
 #!/usr/bin/env python3
 import os, uuid, math
 import pandas as pd
-from ndbc_api import NdbcApi
-from google.cloud import bigquery
+try:
+    from google.cloud import bigquery
+except ImportError:  # only BigQueryWarehouse needs it; the tests run main() on an in-memory warehouse
+    bigquery = None
+from noa_avc_data_fetch import make_ndbc_client  # NdbcApi behind the disk cache, or NDBC_CLIENT=fake
 
 # -------------------- CONFIG --------------------
 # Set these in your environment or edit here:
@@ -19,8 +22,12 @@ OCEAN_STATIONS = ['46050', '46015', '46027', '46059']
 AIRPORT_STATIONS = ['KMMV', 'KEUG', 'KDLS', 'KONP', 'K6S2', 'KSLE', 'KPDX', 'KALW' ]
 AIR_COLS   = ['WDIR', 'WSPD', 'GST', 'PRES', 'ATMP', 'DEWP']
 OCEAN_COLS = ['WVHT', 'DPD', 'APD', 'MWD', 'WTMP', 'VIS', 'PTDY', 'TIDE']
-START = '2025-01-01'
-END   = '2025-09-01'
+# One request covers both tables; the frame is split into AIR_COLS/OCEAN_COLS in memory
+BUOY_COLS  = list(dict.fromkeys(AIR_COLS + OCEAN_COLS))
+START = os.getenv("BUOY_START", "2025-01-01")  # stations with no rows yet load from here
+END   = os.getenv("BUOY_END") or None            # None = up to now
+# Ignore the per-station high-water marks and reload START..END
+BUOY_FULL_RELOAD = os.getenv("BUOY_FULL_RELOAD", "0") == "1"
 
 # Keep only records around :10 past the hour for ocean
 TARGET_MINUTE    = 10
@@ -37,11 +44,13 @@ def _setup_gcp_creds_from_json_env():
         os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = path
 
 def _bq_client():
+    if bigquery is None:
+        raise ImportError("google-cloud-bigquery is required for BigQuery loads (pip install google-cloud-bigquery)")
     _setup_gcp_creds_from_json_env()
     return bigquery.Client(project=BQ_PROJECT)
 
 def _full_table_id(table_name: str) -> str:
-    return f"{BQ_PROJECT}.{BQ_DATASET2}.{table_name}"
+    return f"{BQ_PROJECT}.{BQ_DATASET}.{table_name}"
 
 def _reset_multiindex(df: pd.DataFrame) -> pd.DataFrame:
     """MultiIndex -> columns: time_utc, station_id, … (forcing UTC)."""
@@ -56,22 +65,82 @@ def _filter_to_minute(df: pd.DataFrame, minute: int = 10, tolerance: str = "0min
     if df.empty:
         return df
     ts = pd.DatetimeIndex(df.index.get_level_values(0))
-    target = ts.floor('H') + pd.to_timedelta(minute, unit='m')
+    target = ts.floor('h') + pd.to_timedelta(minute, unit='m')
     tol = pd.Timedelta(tolerance)
     mask = (ts >= target - tol) & (ts <= target + tol)
     return df[mask]
 
-def _merge_upsert_df(client: bigquery.Client, table_id: str, df: pd.DataFrame, key_cols=("station_id","time_utc")):
+def _project(df: pd.DataFrame, cols) -> pd.DataFrame:
+    """The `cols` slice of a combined buoy frame, minus rows with none of them reported."""
+    present = [c for c in cols if c in df.columns]
+    return df[present].dropna(how="all") if present else df.iloc[0:0, 0:0]
+
+# -------------------- WAREHOUSE --------------------
+class BigQueryWarehouse:
+    """
+    The warehouse calls the loader makes, on BigQuery. tests/fake_warehouse.py
+    has the same methods over in-memory frames.
+    """
+
+    def __init__(self, client=None):
+        self.client = client if client is not None else _bq_client()
+
+    def columns(self, table_id: str) -> list:
+        return [f.name for f in self.client.get_table(table_id).schema]
+
+    def high_water_marks(self, table_id: str, station_ids, station_col="station_id", time_col="time_utc") -> dict:
+        """{station_id: MAX(time_col)} for the stations that already have rows in table_id."""
+        job = self.client.query(
+            f"SELECT {station_col} AS station_id, MAX({time_col}) AS hwm FROM `{table_id}` "
+            f"WHERE {station_col} IN UNNEST(@stations) GROUP BY {station_col}",
+            job_config=bigquery.QueryJobConfig(query_parameters=[
+                bigquery.ArrayQueryParameter("stations", "STRING", list(station_ids)),
+            ]),
+        )
+        return {row["station_id"]: pd.Timestamp(row["hwm"]) for row in job.result() if row["hwm"] is not None}
+
+    def merge(self, table_id: str, df: pd.DataFrame, key_cols):
+        """Load df into a staging table, MERGE it into table_id on key_cols, drop the staging table."""
+        client = self.client
+        # write to staging
+        staging = f"{BQ_PROJECT}.{BQ_DATASET}._stg_{table_id.split('.')[-1]}_{uuid.uuid4().hex[:8]}"
+        client.load_table_from_dataframe(df, staging,
+            job_config=bigquery.LoadJobConfig(write_disposition="WRITE_TRUNCATE")
+        ).result()
+
+        # MERGE
+        cols = list(df.columns)
+        can_merge = all(k in cols for k in key_cols)
+        if can_merge:
+            key_match = " AND ".join([f"T.{k}=S.{k}" for k in key_cols])
+            update_cols = [c for c in cols if c not in key_cols]
+            set_clause = ", ".join([f"{c}=S.{c}" for c in update_cols]) if update_cols else ""
+            insert_cols = ", ".join(cols)
+            insert_vals = ", ".join([f"S.{c}" for c in cols])
+            merge_sql = f"""
+            MERGE `{table_id}` T
+            USING `{staging}` S
+            ON {key_match}
+            {"WHEN MATCHED THEN UPDATE SET " + set_clause if set_clause else ""}
+            WHEN NOT MATCHED THEN INSERT ({insert_cols}) VALUES ({insert_vals});
+            """
+            client.query(merge_sql).result()
+        else:
+            client.query(f"INSERT INTO `{table_id}` SELECT * FROM `{staging}`").result()
+
+        client.delete_table(staging, not_found_ok=True)
+
+def _merge_upsert_df(warehouse, table_id: str, df: pd.DataFrame, key_cols=("station_id","time_utc")) -> int:
     """
     Idempotent write: write to staging then MERGE on key_cols.
     Drops any df columns that don't exist in the table schema.
+    An empty df stages nothing and runs no MERGE. Returns the rows written.
     """
     if df is None or df.empty:
-        print(f"({table_id}) nothing to write.")
-        return
+        print(f"({table_id}) nothing new to write.")
+        return 0
 
-    table = client.get_table(table_id)
-    table_cols = [f.name for f in table.schema]
+    table_cols = warehouse.columns(table_id)
 
     # keep only known columns
     cols = [c for c in df.columns if c in table_cols]
@@ -97,78 +166,88 @@ def _merge_upsert_df(client: bigquery.Client, table_id: str, df: pd.DataFrame, k
             if df[c].dtype == "object":
                 df[c] = pd.to_numeric(df[c], errors="coerce")
 
-    # write to staging
-    staging = f"{BQ_PROJECT}.{BQ_DATASET2}._stg_{table.table_id}_{uuid.uuid4().hex[:8]}"
-    bigquery.LoadJobConfig  # just to make linters happy
-    client.load_table_from_dataframe(df, staging,
-        job_config=bigquery.LoadJobConfig(write_disposition="WRITE_TRUNCATE")
-    ).result()
-
-    # MERGE
-    can_merge = all(k in cols for k in key_cols)
-    if can_merge:
-        key_match = " AND ".join([f"T.{k}=S.{k}" for k in key_cols])
-        update_cols = [c for c in cols if c not in key_cols]
-        set_clause = ", ".join([f"{c}=S.{c}" for c in update_cols]) if update_cols else ""
-        insert_cols = ", ".join(cols)
-        insert_vals = ", ".join([f"S.{c}" for c in cols])
-        merge_sql = f"""
-        MERGE `{table_id}` T
-        USING `{staging}` S
-        ON {key_match}
-        {"WHEN MATCHED THEN UPDATE SET " + set_clause if set_clause else ""}
-        WHEN NOT MATCHED THEN INSERT ({insert_cols}) VALUES ({insert_vals});
-        """
-        client.query(merge_sql).result()
-    else:
-        client.query(f"INSERT INTO `{table_id}` SELECT * FROM `{staging}`").result()
-
-    client.delete_table(staging, not_found_ok=True)
+    warehouse.merge(table_id, df, key_cols)
     print(f"✅ wrote {len(df)} rows -> {table_id}")
+    return len(df)
 
-# -------------------- FETCH + WRITE --------------------
-def main():
-    client = _bq_client()
-    api = NdbcApi()
-
-    # 1) Pull buoys
-    air_df = api.get_data(
-        station_ids=OCEAN_STATIONS,
-        modes=['stdmet', 'cwind'],
-        start_time=START, end_time=END,
-        cols=AIR_COLS
-    )
-
-    ocean_df = api.get_data(
-        station_ids=OCEAN_STATIONS,
-        modes=['stdmet', 'cwind'],
-        start_time=START, end_time=END,
-        cols=OCEAN_COLS
-    )
+# -------------------- INCREMENTAL --------------------
+def _utc(value) -> pd.Timestamp:
+    ts = pd.Timestamp(value)
+    return ts.tz_localize("UTC") if ts.tzinfo is None else ts.tz_convert("UTC")
 
-    # 2) Filter ocean to HH:10 (± tolerance)
-    ocean_10_df = _filter_to_minute(ocean_df, minute=TARGET_MINUTE, tolerance=MINUTE_TOLERANCE)
+def _fetch_starts(marks_by_table: dict, station_ids, start) -> dict:
+    """{station: earliest time any table still needs from it}: its high-water mark, or START without one."""
+    return {stn: min([_utc(marks.get(stn, start)) for marks in marks_by_table.values()] or [_utc(start)])
+            for stn in station_ids}
 
-    # 3) Flatten to columns BigQuery can ingest
-    air_out   = _reset_multiindex(air_df)
-    ocean_out = _reset_multiindex(ocean_10_df)
+def _after_marks(df: pd.DataFrame, marks: dict) -> pd.DataFrame:
+    """Rows newer than their station's high-water mark (every row for stations without one)."""
+    if df.empty or not marks:
+        return df
+    mark = pd.to_datetime(df["station_id"].map({stn: _utc(ts) for stn, ts in marks.items()}), utc=True)
+    return df[mark.isna() | (df["time_utc"] > mark)]
+
+# -------------------- FETCH + WRITE --------------------
+def main(warehouse=None, api=None, full_reload=BUOY_FULL_RELOAD):
+    warehouse = warehouse if warehouse is not None else BigQueryWarehouse()
+    api = api if api is not None else make_ndbc_client()  # closed months come from data_ndbc/ on re-runs
 
-    # 4) Upsert to your two tables
     air_table_id   = _full_table_id(BQ_TABLE_AIR)     # regional_weatherdata.pacific_ocean_air
     water_table_id = _full_table_id(BQ_TABLE_WATER)   # regional_weatherdata.pacific_ocean_water
 
+    # 0) Per-station MAX(time_utc) of each table: only newer rows are fetched and staged
+    marks = {} if full_reload else {
+        table_id: warehouse.high_water_marks(table_id, OCEAN_STATIONS)
+        for table_id in (air_table_id, water_table_id)
+    }
+    starts = _fetch_starts(marks, OCEAN_STATIONS, START)
+    end_utc = _utc(END) if END else pd.Timestamp.now(tz="UTC")
+    # Stations sharing a start are fetched together, so one cold station doesn't pull the rest back to START
+    groups = {}
+    for stn, start_utc in starts.items():
+        if start_utc < end_utc:
+            groups.setdefault(start_utc, []).append(stn)
+    if not groups:
+        print(f"No buoy data newer than {min(starts.values()).isoformat()} to load.")
+        return 0
+    basis = "full reload" if full_reload else "per-station high-water marks"
+
+    # 1) Pull buoys once per group for both tables, then split air/ocean columns
+    frames = []
+    for start_utc, station_ids in sorted(groups.items()):
+        print(f"🌊 Loading buoy rows for {', '.join(station_ids)} from {start_utc.isoformat()} ({basis})")
+        frames.append(api.get_data(
+            station_ids=station_ids,
+            modes=['stdmet', 'cwind'],
+            start_time=start_utc.tz_localize(None).to_pydatetime(),
+            end_time=end_utc.tz_localize(None).to_pydatetime(),
+            cols=BUOY_COLS
+        ))
+    buoys_df = pd.concat(frames).sort_index()
+    air_df   = _project(buoys_df, AIR_COLS)
+    ocean_df = _project(buoys_df, OCEAN_COLS)
+
+    # 2) Filter ocean to HH:10 (± tolerance)
+    ocean_10_df = _filter_to_minute(ocean_df, minute=TARGET_MINUTE, tolerance=MINUTE_TOLERANCE)
+
+    # 3) Flatten to columns BigQuery can ingest, keeping only rows past each table's marks
+    air_out   = _after_marks(_reset_multiindex(air_df), marks.get(air_table_id, {}))
+    ocean_out = _after_marks(_reset_multiindex(ocean_10_df), marks.get(water_table_id, {}))
+
+    # 4) Upsert the deltas to your two tables (an empty delta skips staging and MERGE)
     # Ensure we only try to write columns that exist in the target tables.
     # (If your table schema matches AIR_COLS/OCEAN_COLS + time_utc/station_id/ingested_at, this Just Works™)
-    _merge_upsert_df(client, air_table_id,   air_out)      # keys: station_id+time_utc
-    _merge_upsert_df(client, water_table_id, ocean_out)    # keys: station_id+time_utc
+    written  = _merge_upsert_df(warehouse, air_table_id,   air_out)      # keys: station_id+time_utc
+    written += _merge_upsert_df(warehouse, water_table_id, ocean_out)    # keys: station_id+time_utc
 
     # 5) (Optional) Airports -> pwn_airport
     # If you already have a DataFrame `airport_df` with columns like:
     # time_utc, station_id (ICAO), temp_c, dewpoint_c, wind_mps, gust_mps, pressure_hpa, ...
     # just call:
     #   airport_table_id = _full_table_id(BQ_TABLE_AIRPORT)
-    #   _merge_upsert_df(client, airport_table_id, airport_df)
+    #   _merge_upsert_df(warehouse, airport_table_id, airport_df)
     # I’m keeping this commented until your pwn_airport table exists with final schema.
+    return written
 
 if __name__ == "__main__":
     main()
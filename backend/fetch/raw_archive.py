@@ -0,0 +1,254 @@
+"""
+Columnar archive of the raw PWS history: the JSON windows written by
+fetch_pws_history.py, compacted into Parquet and partitioned as
+
+    data_parquet/station_id=KORMCMIN133/year=2025/month=3/part-0.parquet
+
+Columns are typed like weather_raw (REAL -> float32, epoch -> int64,
+local_time -> timestamp), so a scan reads only the columns it asks for and
+skips whole station/year/month directories and row groups outside the filter.
+Each partition is one file, de-duplicated on local_time, so the overlapping
+windows fetch_pws_history writes (now-365d rolls daily) never double rows.
+
+    python raw_archive.py          # compact new/changed JSON windows
+    read_archive(["KORMCMIN133"], start, end, columns=["local_time", "avg_temp"])
+"""
+import os
+import json
+import logging
+from datetime import datetime
+import pandas as pd
+from dotenv import load_dotenv
+
+load_dotenv()
+
+DATA_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "data"))
+ARCHIVE_DIR = os.getenv("RAW_ARCHIVE_DIR") or os.path.abspath(
+    os.path.join(os.path.dirname(__file__), "..", "..", "data_parquet"))
+# Sidecar manifest of compacted JSON files: {relative path: [size, mtime]}
+COMPACTED_MANIFEST = "_compacted.json"
+ARCHIVE_ROW_GROUP_SIZE = int(os.getenv("RAW_ARCHIVE_ROW_GROUP_SIZE", "65536"))
+PARTITION_FILE = "part-0.parquet"
+PARTITION_COLUMNS = ["station_id", "year", "month"]
+
+# weather_raw types that aren't REAL
+TEXT_COLUMNS = {"station_id", "tz", "utc_time", "qcStatus"}
+BIGINT_COLUMNS = {"epoch"}
+TIMESTAMP_COLUMNS = {"local_time"}
+
+def _pyarrow():
+    try:
+        import pyarrow as pa
+        import pyarrow.compute as pc
+        import pyarrow.dataset as ds
+    except ImportError as e:
+        raise ImportError("pyarrow is required for the Parquet raw archive (pip install pyarrow)") from e
+    return pa, pc, ds
+
+def column_type(column):
+    pa, _, _ = _pyarrow()
+    if column in TEXT_COLUMNS:
+        return pa.string()
+    if column in BIGINT_COLUMNS:
+        return pa.int64()
+    if column in TIMESTAMP_COLUMNS:
+        return pa.timestamp("s")
+    return pa.float32()
+
+def archive_schema(columns):
+    pa, _, _ = _pyarrow()
+    fields = [pa.field(col, column_type(col)) for col in columns if col != "station_id"]
+    return pa.schema(fields + [pa.field("station_id", pa.string()),
+                               pa.field("year", pa.int16()),
+                               pa.field("month", pa.int8())])
+
+def partitioning():
+    pa, _, ds = _pyarrow()
+    return ds.partitioning(
+        pa.schema([("station_id", pa.string()), ("year", pa.int16()), ("month", pa.int8())]),
+        flavor="hive",
+    )
+
+def observations_table(observations, extract):
+    """TWC observations -> typed pyarrow Table with year/month partition columns."""
+    from field_extractor import extract_columns
+
+    pa, pc, _ = _pyarrow()
+    columns = extract_columns(observations, extract)
+    arrays = {}
+    for col, values in columns.items():
+        if col in TIMESTAMP_COLUMNS:
+            arrays[col] = pc.cast(pa.array(values, pa.string()), pa.timestamp("s"))
+        elif col in TEXT_COLUMNS:
+            arrays[col] = pa.array([None if v is None else str(v) for v in values], pa.string())
+        else:
+            arrays[col] = pa.array(values, column_type(col), from_pandas=True)
+    arrays["year"] = pc.cast(pc.year(arrays["local_time"]), pa.int16())
+    arrays["month"] = pc.cast(pc.month(arrays["local_time"]), pa.int8())
+    schema = archive_schema(extract.columns)
+    return pa.table([arrays[name] for name in schema.names], schema=schema)
+
+def partition_dir(archive_dir, station_id, year, month):
+    return os.path.join(archive_dir, f"station_id={station_id}", f"year={year}", f"month={month}")
+
+def write_partition(rows, directory, schema):
+    """
+    Merge rows (a DataFrame of one station/year/month) into that partition's
+    single file, de-duplicated on local_time with the new rows winning. Any
+    other files in the directory (e.g. from older per-window compaction) are
+    folded in and removed. Returns the partition's row count.
+    """
+    pa, _, _ = _pyarrow()
+    import pyarrow.parquet as pq
+
+    existing = []
+    if os.path.isdir(directory):
+        existing = sorted(os.path.join(directory, name) for name in os.listdir(directory)
+                          if name.endswith(".parquet") and not name.startswith((".", "_")))
+    frames = [pq.read_table(path).to_pandas() for path in existing] + [rows[schema.names]]
+    # station_id is fixed within a partition, so local_time alone is the (station_id, local_time) key
+    merged = (pd.concat(frames, ignore_index=True)
+              .drop_duplicates(subset=["local_time"], keep="last")
+              .sort_values("local_time"))
+
+    os.makedirs(directory, exist_ok=True)
+    target = os.path.join(directory, PARTITION_FILE)
+    tmp_path = os.path.join(directory, "." + PARTITION_FILE + ".tmp")  # dot prefix: scans skip it
+    pq.write_table(pa.Table.from_pandas(merged, schema=schema, preserve_index=False), tmp_path,
+                   row_group_size=ARCHIVE_ROW_GROUP_SIZE)
+    os.replace(tmp_path, target)
+    for path in existing:
+        if path != target:
+            os.remove(path)
+    return len(merged)
+
+def compact_file(json_path, extract, archive_dir=ARCHIVE_DIR):
+    """
+    Merge one JSON window into the archive. Every station/year/month it touches
+    is rewritten as one file de-duplicated on (station_id, local_time), so
+    overlapping or repeated windows never duplicate rows. Returns the number of
+    rows read from the window.
+    """
+    pa, _, _ = _pyarrow()
+    with open(json_path, "r") as f:
+        observations = json.load(f).get("observations", [])
+    if not observations:
+        logging.warning(f"⚠️ No observations found in {json_path}")
+        return 0
+
+    table = observations_table(observations, extract)
+    schema = pa.schema([field for field in table.schema if field.name not in PARTITION_COLUMNS])
+    # Rows without a local_time have no partition to go to
+    rows = table.to_pandas().dropna(subset=["local_time"])
+    for (station_id, year, month), part in rows.groupby(PARTITION_COLUMNS):
+        write_partition(part, partition_dir(archive_dir, station_id, int(year), int(month)), schema)
+    return table.num_rows
+
+def _load_compacted(archive_dir):
+    path = os.path.join(archive_dir, COMPACTED_MANIFEST)
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r") as f:
+        return json.load(f)
+
+def _save_compacted(archive_dir, compacted):
+    path = os.path.join(archive_dir, COMPACTED_MANIFEST)
+    tmp_path = path + ".part"
+    with open(tmp_path, "w") as f:
+        json.dump(compacted, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+def compact_archive(paths, extract, data_dir=DATA_DIR, archive_dir=ARCHIVE_DIR, force=False):
+    """Compact JSON windows not yet in the archive (by size + mtime). Returns rows written."""
+    os.makedirs(archive_dir, exist_ok=True)
+    compacted = {} if force else _load_compacted(archive_dir)
+    files = rows = 0
+    for path in paths:
+        key = os.path.relpath(path, data_dir)
+        st = os.stat(path)
+        if compacted.get(key) == [st.st_size, st.st_mtime]:
+            continue
+        rows += compact_file(path, extract, archive_dir)
+        files += 1
+        compacted[key] = [st.st_size, st.st_mtime]
+        # Saved per file so an interrupted run resumes where it stopped
+        _save_compacted(archive_dir, compacted)
+    logging.info(f"🗜️ Compacted {files} JSON windows ({rows} rows) into {archive_dir}")
+    return rows
+
+def _as_datetime(value):
+    return value if isinstance(value, datetime) else datetime.fromisoformat(str(value))
+
+def archive_filter(station_ids=None, start=None, end=None):
+    """
+    Dataset filter for [start, end). The station/year predicates prune partition
+    directories; the local_time predicate is checked against row-group statistics.
+    """
+    pa, _, ds = _pyarrow()
+    predicates = []
+    if station_ids:
+        predicates.append(ds.field("station_id").isin(list(station_ids)))
+    if start is not None:
+        start = _as_datetime(start)
+        predicates.append(ds.field("year") >= start.year)
+        predicates.append(ds.field("local_time") >= pa.scalar(start, pa.timestamp("s")))
+    if end is not None:
+        end = _as_datetime(end)
+        predicates.append(ds.field("year") <= end.year)
+        predicates.append(ds.field("local_time") < pa.scalar(end, pa.timestamp("s")))
+    if not predicates:
+        return None
+    expr = predicates[0]
+    for predicate in predicates[1:]:
+        expr = expr & predicate
+    return expr
+
+def open_archive(archive_dir=ARCHIVE_DIR):
+    _, _, ds = _pyarrow()
+    return ds.dataset(archive_dir, format="parquet", partitioning=partitioning(),
+                      exclude_invalid_files=True)
+
+def archive_stations(archive_dir=ARCHIVE_DIR):
+    """Station ids present in the archive, from the partition directory names."""
+    if not os.path.isdir(archive_dir):
+        return []
+    prefix = "station_id="
+    return sorted(name[len(prefix):] for name in os.listdir(archive_dir) if name.startswith(prefix))
+
+def scan_archive(station_ids=None, start=None, end=None, columns=None, archive_dir=ARCHIVE_DIR,
+                 batch_size=ARCHIVE_ROW_GROUP_SIZE):
+    """Yield pyarrow RecordBatches of `columns` matching the filter, without loading the whole scan."""
+    if not os.path.isdir(archive_dir):
+        return
+    dataset = open_archive(archive_dir)
+    yield from dataset.to_batches(columns=columns, filter=archive_filter(station_ids, start, end),
+                                  batch_size=batch_size)
+
+def read_archive(station_ids=None, start=None, end=None, columns=None, archive_dir=ARCHIVE_DIR):
+    """Filtered, projected read as a pandas DataFrame (None if there is no archive yet)."""
+    if not os.path.isdir(archive_dir):
+        return None
+    dataset = open_archive(archive_dir)
+    table = dataset.to_table(columns=columns, filter=archive_filter(station_ids, start, end))
+    df = table.to_pandas()
+    if "station_id" in df.columns:
+        df["station_id"] = df["station_id"].astype(str)
+    return df
+
+def main():
+    from weatherjson_to_csv import MAPPING_FILE, iter_json_files, load_field_mapping
+    from field_extractor import compile_extractor
+
+    try:
+        _pyarrow()
+    except ImportError as e:
+        logging.warning(f"⚠️ Skipping raw archive compaction: {e}")
+        return
+
+    extract = compile_extractor(load_field_mapping(MAPPING_FILE))
+    return compact_archive(iter_json_files(DATA_DIR), extract,
+                           force=os.getenv("RAW_ARCHIVE_FORCE", "0") == "1")
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+    main()
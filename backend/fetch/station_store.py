@@ -0,0 +1,238 @@
+"""
+Append-only, memory-mapped store of weather_raw-shaped observations for local
+analytics and offline replays. One directory per station:
+
+    data_store/KORMCMIN133/records.bin   fixed-width records sorted by epoch
+                           index.npy     epoch of every INDEX_STRIDE-th record
+                           meta.json     dtype, record count, station tz
+
+records.bin is read with numpy.memmap, so a station/time range is two binary
+searches (sparse index, then one block) and a slice of the mapping, with no
+SQL round trip, JSON parse or copy.
+
+    python station_store.py        # append new observations from the JSON windows
+    StationStore().read_frame("KORMCMIN133", start, end, columns=["avg_temp"])
+"""
+import os
+import json
+import logging
+from zoneinfo import ZoneInfo
+import numpy as np
+import pandas as pd
+from dotenv import load_dotenv
+
+load_dotenv()
+
+DATA_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "data"))
+STORE_DIR = os.getenv("STATION_STORE_DIR") or os.path.abspath(
+    os.path.join(os.path.dirname(__file__), "..", "..", "data_store"))
+INDEX_STRIDE = int(os.getenv("STATION_STORE_INDEX_STRIDE", "1024"))
+# Sidecar list of JSON windows already appended: {relative path: [size, mtime]}
+SYNCED_MANIFEST = "_synced.json"
+
+# weather_raw columns that aren't stored: station_id is the directory, the rest are text
+UNSTORED_COLUMNS = {"station_id", "tz", "utc_time", "qcStatus"}
+
+def record_dtype(columns):
+    """Fixed-width record: epoch, local_time, then every REAL column as float32."""
+    fields = [("epoch", "<i8"), ("local_time", "<M8[s]")]
+    fields += [(col, "<f4") for col in columns
+               if col not in UNSTORED_COLUMNS and col not in ("epoch", "local_time")]
+    return np.dtype(fields)
+
+def frame_to_records(df, dtype):
+    """weather_raw-shaped DataFrame -> structured array, sorted by epoch, one record per epoch."""
+    # Records are keyed by epoch; a row without one can't be placed
+    df = df[pd.to_numeric(df["epoch"], errors="coerce").notna()]
+    records = np.zeros(len(df), dtype=dtype)
+    for name in dtype.names:
+        if name == "local_time":
+            records[name] = pd.to_datetime(df[name]).to_numpy(dtype="datetime64[s]")
+        elif name == "epoch":
+            records[name] = pd.to_numeric(df[name]).to_numpy(dtype="int64")
+        elif name in df:
+            records[name] = pd.to_numeric(df[name], errors="coerce").to_numpy(dtype="float32", na_value=np.nan)
+        else:
+            records[name] = np.nan
+    records = np.sort(records, order="epoch", kind="stable")
+    _, first = np.unique(records["epoch"], return_index=True)
+    return records[first]
+
+class StationStore:
+    def __init__(self, root=STORE_DIR, stride=INDEX_STRIDE):
+        self.root = root
+        self.stride = stride
+
+    def _path(self, station_id, name):
+        return os.path.join(self.root, station_id, name)
+
+    def stations(self):
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(name for name in os.listdir(self.root)
+                      if os.path.exists(self._path(name, "meta.json")))
+
+    def meta(self, station_id):
+        path = self._path(station_id, "meta.json")
+        if not os.path.exists(path):
+            return None
+        with open(path, "r") as f:
+            meta = json.load(f)
+        meta["dtype"] = np.dtype([tuple(field) for field in meta["dtype"]])
+        return meta
+
+    def _write_meta(self, station_id, dtype, count, tz):
+        path = self._path(station_id, "meta.json")
+        tmp_path = path + ".part"
+        with open(tmp_path, "w") as f:
+            json.dump({"dtype": dtype.descr, "count": count, "tz": tz, "stride": self.stride}, f)
+        os.replace(tmp_path, path)
+
+    def records(self, station_id):
+        """Every record for the station as a read-only memmap (empty array if none)."""
+        meta = self.meta(station_id)
+        if meta is None or meta["count"] == 0:
+            dtype = meta["dtype"] if meta else record_dtype([])
+            return np.empty(0, dtype=dtype)
+        # meta.json is written after the data, so count never covers a torn append
+        return np.memmap(self._path(station_id, "records.bin"), dtype=meta["dtype"],
+                         mode="r", shape=(meta["count"],))
+
+    def append(self, station_id, records, tz=None):
+        """
+        Append records newer than the last stored epoch; older ones are dropped,
+        which keeps the file sorted. Returns the number of records written.
+        """
+        meta = self.meta(station_id)
+        count = meta["count"] if meta else 0
+        if meta and meta["dtype"] != records.dtype:
+            raise ValueError(f"Record layout for {station_id} changed; rebuild the store "
+                             f"({meta['dtype']} != {records.dtype})")
+        if count:
+            last = self.records(station_id)["epoch"][-1]
+            records = records[records["epoch"] > last]
+        if len(records) == 0:
+            return 0
+
+        os.makedirs(os.path.join(self.root, station_id), exist_ok=True)
+        data_path = self._path(station_id, "records.bin")
+        with open(data_path, "ab") as f:
+            # Drop any tail left by an append that died before updating meta.json
+            f.truncate(count * records.dtype.itemsize)
+            f.seek(0, os.SEEK_END)
+            f.write(records.tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        # Index before meta: a reader still on the old count just sees extra index
+        # entries past its end, which _search clips
+        old_epochs = self.records(station_id)["epoch"] if count else np.empty(0, dtype="<i8")
+        index = np.concatenate([old_epochs, records["epoch"]])[::self.stride]
+        index_path = self._path(station_id, "index.npy")
+        with open(index_path + ".part", "wb") as f:
+            np.save(f, index)
+        os.replace(index_path + ".part", index_path)
+
+        tz = (meta or {}).get("tz") or tz
+        self._write_meta(station_id, records.dtype, count + len(records), tz)
+        return len(records)
+
+    @staticmethod
+    def _search(records, index, stride, epoch):
+        """First position with records['epoch'] >= epoch, touching one stride of the mapping."""
+        i = int(np.searchsorted(index, epoch, side="left"))
+        lo = min(max(i - 1, 0) * stride, len(records))
+        hi = min(i * stride + 1, len(records))
+        return lo + int(np.searchsorted(records["epoch"][lo:hi], epoch, side="left"))
+
+    def range(self, station_id, start_epoch=None, end_epoch=None):
+        """Records with start_epoch <= epoch < end_epoch, as a zero-copy view of the memmap."""
+        records = self.records(station_id)
+        if len(records) == 0:
+            return records
+        # The index is read with the stride it was built with, whatever this instance uses
+        stride = self.meta(station_id)["stride"]
+        index = np.load(self._path(station_id, "index.npy"))
+        lo = 0 if start_epoch is None else self._search(records, index, stride, start_epoch)
+        hi = len(records) if end_epoch is None else self._search(records, index, stride, end_epoch)
+        return records[lo:hi]
+
+    def read_frame(self, station_id, start=None, end=None, columns=None):
+        """
+        weather_raw-shaped DataFrame for local times in [start, end). Local times
+        are turned into epochs with the station's tz, so the range is still a
+        binary search rather than a scan.
+        """
+        meta = self.meta(station_id)
+        if meta is None:
+            return pd.DataFrame()
+        tz = ZoneInfo(meta["tz"]) if meta.get("tz") else None
+
+        def to_epoch(value):
+            if value is None:
+                return None
+            value = pd.Timestamp(value).to_pydatetime()
+            if tz is None:
+                return None
+            return int(value.replace(tzinfo=tz).timestamp())
+
+        records = self.range(station_id, to_epoch(start), to_epoch(end))
+        if tz is None and (start is not None or end is not None):
+            # No tz recorded: fall back to filtering the local_time field
+            local = records["local_time"]
+            mask = np.ones(len(records), dtype=bool)
+            if start is not None:
+                mask &= local >= np.datetime64(pd.Timestamp(start), "s")
+            if end is not None:
+                mask &= local < np.datetime64(pd.Timestamp(end), "s")
+            records = records[mask]
+
+        names = list(records.dtype.names) if columns is None else [c for c in columns if c in records.dtype.names]
+        df = pd.DataFrame({name: np.asarray(records[name]) for name in names})
+        df.insert(0, "station_id", station_id)
+        return df
+
+def _load_synced(root):
+    path = os.path.join(root, SYNCED_MANIFEST)
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r") as f:
+        return json.load(f)
+
+def _save_synced(root, synced):
+    path = os.path.join(root, SYNCED_MANIFEST)
+    with open(path + ".part", "w") as f:
+        json.dump(synced, f, indent=2, sort_keys=True)
+    os.replace(path + ".part", path)
+
+def sync_from_json(store, paths, extract, data_dir=DATA_DIR):
+    """Append observations from new/changed JSON windows. Returns records appended."""
+    from weatherjson_to_csv import extract_observations
+
+    os.makedirs(store.root, exist_ok=True)
+    synced = _load_synced(store.root)
+    dtype = record_dtype(extract.columns)
+    appended = 0
+    for path in paths:
+        key = os.path.relpath(path, data_dir)
+        st = os.stat(path)
+        if synced.get(key) == [st.st_size, st.st_mtime]:
+            continue
+        df = extract_observations(path, extract)
+        for station_id, group in (df.groupby("station_id") if not df.empty else []):
+            tz = group["tz"].dropna().iloc[0] if "tz" in group and group["tz"].notna().any() else None
+            appended += store.append(station_id, frame_to_records(group, dtype), tz=tz)
+        synced[key] = [st.st_size, st.st_mtime]
+        _save_synced(store.root, synced)
+    logging.info(f"💾 Appended {appended} records to the station store at {store.root}")
+    return appended
+
+def main():
+    from weatherjson_to_csv import MAPPING_FILE, iter_json_files, load_field_mapping
+    from field_extractor import compile_extractor
+
+    extract = compile_extractor(load_field_mapping(MAPPING_FILE))
+    return sync_from_json(StationStore(), iter_json_files(DATA_DIR), extract)
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+    main()
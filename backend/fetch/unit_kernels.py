@@ -0,0 +1,93 @@
+"""
+Array versions of the unit conversions and Magnus psychrometrics used by
+noa_avc_data_fetch.
+
+Every function takes a scalar, list, ndarray or Series and works on the whole
+input at once (no per-element Python calls). None and NaN propagate as NaN; a
+Series in gives a Series back on the same index, anything else gives a float64
+ndarray (0-d for scalars).
+
+    temp_f = c_to_f(df["temp_c"])
+    rh = rh_from_t_and_td(df["temp_c"], df["dewpoint_c"])   # % clipped to 0..100
+"""
+from __future__ import annotations
+from typing import Union
+
+import numpy as np
+import pandas as pd
+
+ArrayLike = Union[float, None, list, np.ndarray, pd.Series]
+
+# Magnus coefficients (Alduchov & Eskridge), °C
+MAGNUS_A = 17.625
+MAGNUS_B = 243.04
+
+MS_TO_MPH = 2.236936
+KT_TO_MPS = 0.514444
+KT_TO_MPH = 1.15078
+HPA_PER_INHG = 33.8639
+
+def as_float_array(x: ArrayLike) -> np.ndarray:
+    """float64 view/copy of x with None and pd.NA as NaN; non-numeric values become NaN too."""
+    if isinstance(x, pd.Series):
+        return pd.to_numeric(x, errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+    try:
+        return np.asarray(x, dtype=np.float64)
+    except (TypeError, ValueError):
+        # Mixed object input (strings, pd.NA): coerce element-wise, keeping the shape
+        values = np.asarray(x, dtype=object)
+        flat = pd.to_numeric(pd.Series(values.ravel()), errors="coerce")
+        return flat.to_numpy(dtype=np.float64, na_value=np.nan).reshape(values.shape)
+
+def _like(result: np.ndarray, *inputs: ArrayLike) -> ArrayLike:
+    """Give a Series back (same index) when the first Series input was one."""
+    for x in inputs:
+        if isinstance(x, pd.Series):
+            return pd.Series(result, index=x.index, name=x.name)
+    return result
+
+# ---- Unit conversions ----
+
+def c_to_f(c: ArrayLike) -> ArrayLike:
+    return _like(as_float_array(c) * 1.8 + 32.0, c)
+
+def f_to_c(f: ArrayLike) -> ArrayLike:
+    return _like((as_float_array(f) - 32.0) / 1.8, f)
+
+def ms_to_mph(v: ArrayLike) -> ArrayLike:
+    return _like(as_float_array(v) * MS_TO_MPH, v)
+
+def kt_to_mps(v: ArrayLike) -> ArrayLike:
+    return _like(as_float_array(v) * KT_TO_MPS, v)
+
+def kt_to_mph(v: ArrayLike) -> ArrayLike:
+    return _like(as_float_array(v) * KT_TO_MPH, v)
+
+def hpa_to_inhg(v: ArrayLike) -> ArrayLike:
+    return _like(as_float_array(v) / HPA_PER_INHG, v)
+
+def inhg_to_hpa(v: ArrayLike) -> ArrayLike:
+    return _like(as_float_array(v) * HPA_PER_INHG, v)
+
+# ---- Psychrometrics ----
+
+def _magnus_gamma(temp_c: np.ndarray) -> np.ndarray:
+    return MAGNUS_A * temp_c / (MAGNUS_B + temp_c)
+
+def rh_from_t_and_td(temp_c: ArrayLike, dewpoint_c: ArrayLike) -> ArrayLike:
+    """Relative humidity (%) from T and Td (°C), clipped to 0..100; NaN where either is missing."""
+    t = as_float_array(temp_c)
+    td = as_float_array(dewpoint_c)
+    # e/es as one exp of the difference; np.clip leaves NaN alone
+    with np.errstate(invalid="ignore", over="ignore"):
+        rh = 100.0 * np.exp(_magnus_gamma(td) - _magnus_gamma(t))
+    return _like(np.clip(rh, 0.0, 100.0), temp_c, dewpoint_c)
+
+def dewpoint_from_t_and_rh(temp_c: ArrayLike, rh_percent: ArrayLike) -> ArrayLike:
+    """Dewpoint (°C) from T (°C) and RH (%); NaN where either is missing or RH <= 0."""
+    t = as_float_array(temp_c)
+    rh = as_float_array(rh_percent)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        gamma = _magnus_gamma(t) + np.log(np.where(rh > 0, rh, np.nan) / 100.0)
+        td = MAGNUS_B * gamma / (MAGNUS_A - gamma)
+    return _like(td, temp_c, rh_percent)
@@ -1,9 +1,14 @@
 import os
+import io
+import csv
 import json
 import pandas as pd
 import psycopg2
 from psycopg2.extras import execute_values
 import logging
+from datetime import timedelta
+from ingest_manifest import INGEST_FORCE, ensure_manifest_table, files_to_ingest, record_ingested
+from field_extractor import compile_extractor, extract_columns
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
 
@@ -14,12 +19,18 @@ DATA_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "
 # PostgreSQL connection
 DATABASE_URL = os.getenv("DATABASE_URL")
 
+# stream (file-by-file, COPY in fixed-size batches), archive (same COPY path, read from the
+# Parquet archive built by raw_archive.py) or memory (legacy: one DataFrame, one execute_values)
+INGEST_MODE = os.getenv("INGEST_MODE", "stream")
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "5000"))
+
 def load_field_mapping(path):
     df = pd.read_csv(path)
     print("CSV columns:", df.columns)
-    return {row["Source Field (from JSON)"]: row["Suggested DB Column Name"] for _, row in df.iterrows()}
+    return dict(zip(df["Source Field (from JSON)"], df["Suggested DB Column Name"]))
 
-def extract_observations(json_path, field_map):
+def extract_observations(json_path, extract):
+    """One file -> DataFrame, built column-wise by a compile_extractor() function."""
     with open(json_path, "r") as f:
         data = json.load(f)
 
@@ -28,21 +39,136 @@ def extract_observations(json_path, field_map):
         logging.warning(f"⚠️ No observations found in {json_path}")
         return pd.DataFrame()
 
-    rows = []
-    for record in obs:
-        flat = {
-            "station_id": record.get("stationID"),
-            "local_time": record.get("obsTimeLocal"),
-        }
-        for json_key, db_column in field_map.items():
-            if json_key.startswith("imperial."):
-                nested_key = json_key.split(".", 1)[1]
-                flat[db_column] = record.get("imperial", {}).get(nested_key)
-            else:
-                flat[db_column] = record.get(json_key)
-        rows.append(flat)
-
-    return pd.DataFrame(rows)
+    return pd.DataFrame(extract_columns(obs, extract), columns=extract.columns)
+
+def iter_json_files(data_dir):
+    for subfolder in sorted(os.listdir(data_dir)):
+        folder_path = os.path.join(data_dir, subfolder)
+        if not os.path.isdir(folder_path):
+            continue
+        for filename in sorted(os.listdir(folder_path)):
+            if filename.endswith(".json"):
+                yield os.path.join(folder_path, filename)
+
+def iter_observation_rows(json_path, extract):
+    """Yield one tuple per observation (in `extract.columns` order) from a single file."""
+    with open(json_path, "r") as f:
+        data = json.load(f)
+
+    obs = data.get("observations", [])
+    if not obs:
+        logging.warning(f"⚠️ No observations found in {json_path}")
+        return
+
+    yield from map(extract, obs)
+
+def iter_row_batches(entries, extract, batch_size=INGEST_BATCH_SIZE):
+    """
+    Fixed-size row batches across files, deduplicated on (station_id, local_time)
+    within the batch. Duplicates across batches are dropped by ON CONFLICT DO
+    NOTHING at insert time; since batches commit in order, the first copy wins
+    just like drop_duplicates() did.
+
+    `entries` come from ingest_manifest.files_to_ingest. Each batch is yielded with
+    the files whose last rows it carries, as [(entry, rows_in_file)], so the
+    manifest can be updated in the same transaction that commits those rows.
+    """
+    batch, seen, completed = [], set(), []
+    for entry in entries:
+        file_rows = 0
+        for row in iter_observation_rows(entry[0], extract):
+            file_rows += 1
+            key = (row[0], row[1])
+            if key in seen:
+                continue
+            seen.add(key)
+            batch.append(row)
+            if len(batch) >= batch_size:
+                yield batch, completed
+                batch, seen, completed = [], set(), []
+        completed.append((entry, file_rows))
+    if batch or completed:
+        yield batch, completed
+
+def copy_batch(cur, staging, columns, rows):
+    """COPY one batch into the staging table and move it into weather_raw. Returns rows inserted."""
+    buf = io.StringIO()
+    csv.writer(buf).writerows(rows)  # None -> empty unquoted field -> NULL
+    buf.seek(0)
+    col_list = ", ".join(columns)
+    cur.copy_expert(f"COPY {staging} ({col_list}) FROM STDIN WITH (FORMAT csv)", buf)
+    cur.execute(f"""
+        INSERT INTO weather_raw ({col_list})
+        SELECT {col_list} FROM {staging}
+        ON CONFLICT (station_id, local_time) DO NOTHING
+    """)
+    inserted = cur.rowcount
+    cur.execute(f"TRUNCATE {staging};")
+    return inserted
+
+def ingest_streaming(conn, paths, extract, batch_size=INGEST_BATCH_SIZE):
+    """
+    Peak memory is one parsed file plus one batch, whatever the archive size.
+    Files already recorded in ingest_manifest with the same size/mtime or content
+    hash are skipped, so run time tracks new files rather than the archive.
+    """
+    columns = extract.columns
+    staging = "_stg_weather_raw"
+    total_rows = total_inserted = 0
+    with conn.cursor() as cur:
+        ensure_manifest_table(cur)
+        entries = files_to_ingest(cur, paths, DATA_DIR)
+        cur.execute(f"DROP TABLE IF EXISTS pg_temp.{staging};")
+        cur.execute(f"CREATE TEMP TABLE {staging} AS SELECT {', '.join(columns)} FROM weather_raw WITH NO DATA;")
+        conn.commit()
+        for batch, completed in iter_row_batches(entries, extract, batch_size):
+            inserted = copy_batch(cur, staging, columns, batch) if batch else 0
+            for entry, file_rows in completed:
+                record_ingested(cur, entry, file_rows)
+            conn.commit()
+            total_rows += len(batch)
+            total_inserted += inserted
+            logging.info(f"📦 Batch of {len(batch)} rows, {inserted} new, "
+                         f"{len(completed)} files completed (running total {total_inserted})")
+    logging.info(f"✅ Streamed {total_rows} rows, inserted {total_inserted} new into weather_raw.")
+    return total_inserted
+
+def ingest_from_archive(conn, columns, batch_size=INGEST_BATCH_SIZE):
+    """
+    Load weather_raw from the Parquet archive instead of the JSON files. Each
+    station is scanned only past its latest local_time already in weather_raw,
+    so the archive is pruned by partition and row-group statistics rather than
+    re-read; INGEST_FORCE=1 scans everything (backfill).
+    """
+    from raw_archive import archive_stations, scan_archive
+
+    staging = "_stg_weather_raw"
+    total_rows = total_inserted = 0
+    with conn.cursor() as cur:
+        high_water = {}
+        if not INGEST_FORCE:
+            cur.execute("SELECT station_id, MAX(local_time) FROM weather_raw GROUP BY station_id;")
+            high_water = dict(cur.fetchall())
+        cur.execute(f"DROP TABLE IF EXISTS pg_temp.{staging};")
+        cur.execute(f"CREATE TEMP TABLE {staging} AS SELECT {', '.join(columns)} FROM weather_raw WITH NO DATA;")
+        conn.commit()
+
+        for station_id in archive_stations():
+            # Stations with no rows yet are read in full; the rest from their high-water mark on
+            latest = high_water.get(station_id)
+            start = latest + timedelta(seconds=1) if latest is not None else None
+            for batch in scan_archive(station_ids=[station_id], start=start, columns=columns,
+                                      batch_size=batch_size):
+                rows = list(zip(*(batch.column(c).to_pylist() for c in columns)))
+                if not rows:
+                    continue
+                inserted = copy_batch(cur, staging, columns, rows)
+                conn.commit()
+                total_rows += len(rows)
+                total_inserted += inserted
+                logging.info(f"📦 Archive batch of {len(rows)} rows, {inserted} new (running total {total_inserted})")
+    logging.info(f"✅ Read {total_rows} rows from the archive, inserted {total_inserted} new into weather_raw.")
+    return total_inserted
 
 def main():
     logging.info(f"📁 Reading JSON files from: {os.path.abspath(DATA_DIR)}")
@@ -51,7 +177,24 @@ def main():
         logging.error(f"❌ Field mapping file not found: {MAPPING_FILE}")
         return
 
-    field_map = load_field_mapping(MAPPING_FILE)
+    extract = compile_extractor(load_field_mapping(MAPPING_FILE))
+
+    if INGEST_MODE == "archive":
+        try:
+            with psycopg2.connect(DATABASE_URL) as conn:
+                return ingest_from_archive(conn, extract.columns)
+        except Exception as e:
+            logging.error(f"❌ Failed to insert into PostgreSQL: {e}")
+            return
+
+    if INGEST_MODE == "stream":
+        try:
+            with psycopg2.connect(DATABASE_URL) as conn:
+                return ingest_streaming(conn, iter_json_files(DATA_DIR), extract)
+        except Exception as e:
+            logging.error(f"❌ Failed to insert into PostgreSQL: {e}")
+            return
+
     all_dfs = []
 
     for subfolder in os.listdir(DATA_DIR):
@@ -62,7 +205,7 @@ def main():
         for filename in os.listdir(folder_path):
             if filename.endswith(".json"):
                 json_path = os.path.join(folder_path, filename)
-                df = extract_observations(json_path, field_map)
+                df = extract_observations(json_path, extract)
                 if not df.empty:
                     all_dfs.append(df)
 
@@ -85,6 +228,7 @@ def main():
                 """
                 execute_values(cur, insert_query, values)
         logging.info("✅ Conversion complete and saved to PostgreSQL.")
+        return len(values)
     except Exception as e:
         logging.error(f"❌ Failed to insert into PostgreSQL: {e}")
 
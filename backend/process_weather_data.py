@@ -3,6 +3,7 @@ from sqlalchemy import create_engine, text
 from dotenv import load_dotenv
 
 import os
+import sys
 from dotenv import load_dotenv
 
 # Always load .env from project root
@@ -16,6 +17,68 @@ print("✅ Loaded DATABASE_URL:", DATABASE_URL)  # Optional debug
 # SQLAlchemy engine
 engine = create_engine(DATABASE_URL)
 
+# raw_archive / station_store / fetch_pws_history live in fetch/ and import their siblings by bare name
+FETCH_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fetch")
+if FETCH_DIR not in sys.path:
+    sys.path.append(FETCH_DIR)
+
+# weather_raw column -> the flattened JSON name process_raw() expects
+RAW_JSON_COLUMNS = {
+    "local_time": "obsTimeLocal",
+    "avg_temp": "imperial.temp",
+    "avg_humidity": "humidity",
+    "avg_wnd_spd": "imperial.windSpeed",
+    "precip_rate": "imperial.precipRate",
+}
+
+def _twc_station_id(station_id):
+    # Files are named by alias; the archive and the station store are keyed by TWC station id
+    try:
+        from fetch_pws_history import STATION_MAP
+    except ImportError:
+        return station_id
+    aliases = {alias: sid for sid, alias in STATION_MAP.items()}
+    return aliases.get(station_id, station_id)
+
+def _day_bounds(date_str):
+    day = pd.Timestamp(date_str).to_pydatetime()
+    return day, day + pd.Timedelta(days=1)
+
+def load_stored_weather_data(station_id, date_str):
+    """
+    One station-day from the memory-mapped station store, shaped like the per-day JSON.
+    Like load_archived_weather_data, for replays only; run_all() doesn't read it.
+    """
+    start, end = _day_bounds(date_str)
+    try:
+        from station_store import StationStore
+        df = StationStore().read_frame(_twc_station_id(station_id), start, end, columns=list(RAW_JSON_COLUMNS))
+    except ImportError:
+        return None
+    if df.empty:
+        return None
+    df = df.rename(columns=RAW_JSON_COLUMNS)
+    df["station_id"] = station_id
+    return df
+
+def load_archived_weather_data(station_id, date_str):
+    """
+    One station-day from the Parquet raw archive, shaped like the per-day JSON.
+    For replays and analysis only: run_all() doesn't read it, since those rows
+    are already in weather_raw and the columns don't match process_raw().
+    """
+    start, end = _day_bounds(date_str)
+    try:
+        from raw_archive import read_archive
+        df = read_archive([_twc_station_id(station_id)], start, end, columns=list(RAW_JSON_COLUMNS))
+    except ImportError:
+        return None
+    if df is None or df.empty:
+        return None
+    df = df.rename(columns=RAW_JSON_COLUMNS)
+    df["station_id"] = station_id
+    return df
+
 def load_weather_data(station_id, date_str):
     path = os.path.join("..", "data", station_id, f"{date_str}.json")
     if not os.path.exists(path):
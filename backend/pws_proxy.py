@@ -0,0 +1,258 @@
+"""
+Cached, coalescing proxy for TWC current observations (/api/pws_current).
+
+- Each station has its own entry, fresh for PWS_CACHE_TTL seconds.
+- Concurrent misses for one station share a single in-flight upstream call.
+- Once an entry goes stale it is still served for up to PWS_STALE_TTL seconds
+  while one background refresh runs (stale-while-revalidate), flagged
+  stale=True with its age_seconds.
+- Only when upstream answers 204, returns no observations or fails is the last
+  good observation served with fallback=True.
+- Upstream calls go through one keep-alive session. Point TWC_BASE_URL at a
+  local fake server to test without api.weather.com.
+"""
+import os
+import time
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+import requests
+
+from fetch.http_session import make_session
+
+TWC_BASE_URL = os.getenv("TWC_BASE_URL", "https://api.weather.com")
+PWS_CACHE_TTL = int(os.getenv("PWS_CACHE_TTL", "60"))  # seconds
+PWS_STALE_TTL = int(os.getenv("PWS_STALE_TTL", "600"))  # how long past TTL a stale entry may be served
+PWS_ERROR_TTL = int(os.getenv("PWS_ERROR_TTL", "5"))  # upstream failures with nothing to fall back on
+PWS_UPSTREAM_TIMEOUT = float(os.getenv("PWS_UPSTREAM_TIMEOUT", "8"))
+PWS_UPSTREAM_CONCURRENCY = int(os.getenv("PWS_UPSTREAM_CONCURRENCY", "8"))
+PWS_BATCH_DEADLINE = float(os.getenv("PWS_BATCH_DEADLINE", "3"))  # seconds a batch waits on upstream
+
+EXPIRED_RESULT = {"expired": True, "message": "No recent observation"}
+
+def parse_observation(obs):
+    """TWC observation (units=e) -> the /api/pws_current payload."""
+    imp = obs.get("imperial", {})  # because we requested units=e
+    return {
+        "station_id": obs.get("stationID"),
+        "timestamp_local": obs.get("obsTimeLocal"),
+        "timestamp_utc": obs.get("obsTimeUtc"),
+        "humidity": obs.get("humidity"),
+        "uv": obs.get("uv"),
+        "solar_radiation": obs.get("solarRadiation"),
+        "wind_dir": obs.get("winddir"),
+        # imperial block
+        "temp": imp.get("temp"),
+        "dew_point": imp.get("dewpt"),
+        "wind_speed": imp.get("windSpeed"),
+        "wind_gust": imp.get("windGust"),
+        "wind_chill": imp.get("windChill"),
+        "heat_index": imp.get("heatIndex"),
+        "pressure": imp.get("pressure"),
+        "precip": imp.get("precipRate"),
+        "precip_total": imp.get("precipTotal"),
+        "elev": imp.get("elev"),
+        # flags
+        "expired": False,
+        "fallback": False,
+        "stale": False,
+    }
+
+class _Entry:
+    __slots__ = ("result", "status", "fetched_at", "expires_at", "last_good")
+
+    def __init__(self, result, status, fetched_at, expires_at, last_good):
+        self.result = result
+        self.status = status
+        self.fetched_at = fetched_at
+        self.expires_at = expires_at
+        self.last_good = last_good  # (result, fetched_at) of the newest real observation
+
+class PWSCurrentCache:
+    def __init__(self, api_key, base_url=TWC_BASE_URL, ttl=PWS_CACHE_TTL, stale_ttl=PWS_STALE_TTL,
+                 timeout=PWS_UPSTREAM_TIMEOUT, max_in_flight=PWS_UPSTREAM_CONCURRENCY):
+        self.api_key = api_key
+        self.base_url = base_url
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.timeout = timeout
+        self.session = make_session(max_in_flight)
+        # Bounds the upstream calls in flight at once, whatever the number of callers
+        self._pool = ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix="pws-upstream")
+        self._entries = {}
+        self._in_flight = {}
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=512)
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.upstream_calls = 0
+        self.upstream_errors = 0
+
+    # ---------- upstream ----------
+
+    def _fetch(self, station_id):
+        """One upstream call -> (result, http status, is a real observation)."""
+        params = {
+            "stationId": station_id,
+            "format": "json",
+            "units": "e",                 # e = English (°F, mph, inHg, inches)
+            "numericPrecision": "decimal",
+            "apiKey": self.api_key,
+        }
+        start = time.perf_counter()
+        try:
+            r = self.session.get(f"{self.base_url}/v2/pws/observations/current",
+                                 params=params, timeout=self.timeout)
+        finally:
+            with self._lock:
+                self.upstream_calls += 1
+                self._latencies.append(time.perf_counter() - start)
+
+        # Some stations return 204 or 200 with empty observations when >60 min old
+        if r.status_code == 204:
+            return dict(EXPIRED_RESULT), 200, False
+        try:
+            r.raise_for_status()
+        except requests.HTTPError as e:
+            detail = str(e).replace(self.api_key, "***") if self.api_key else str(e)  # URL carries the key
+            return {"error": "TWC HTTP error", "detail": detail, "expired": True}, 200, False
+        obs_list = r.json().get("observations") or []
+        if not obs_list:
+            # TWC returns no obs when data is older than 60min (“data expired” case)
+            return dict(EXPIRED_RESULT), 200, False
+        return parse_observation(obs_list[0]), 200, True
+
+    def _refresh(self, station_id):
+        try:
+            try:
+                result, status, good = self._fetch(station_id)
+                ttl = self.ttl
+            except Exception as e:
+                result, status, good = {"error": "Upstream error", "detail": str(e)}, 502, False
+                ttl = PWS_ERROR_TTL
+            now = time.time()
+            with self._lock:
+                if "error" in result:
+                    self.upstream_errors += 1
+                prev = self._entries.get(station_id)
+                last_good = (result, now) if good else (prev.last_good if prev else None)
+                if not good and last_good is not None:
+                    # Keep showing the last real observation, flagged as such
+                    result, status = self._fallback(last_good, now, expired=result.get("expired", True)), 200
+                self._entries[station_id] = _Entry(result, status, now, now + ttl, last_good)
+            return result, status
+        finally:
+            with self._lock:
+                self._in_flight.pop(station_id, None)
+
+    def _fallback(self, last_good, now, expired=False):
+        result, fetched_at = last_good
+        return {**result, "fallback": True, "expired": expired, "age_seconds": round(now - fetched_at, 1)}
+
+    def _start_refresh(self, station_id):
+        """The in-flight refresh for this station, starting one if there is none (caller holds the lock)."""
+        future = self._in_flight.get(station_id)
+        if future is None:
+            future = self._pool.submit(self._refresh, station_id)
+            self._in_flight[station_id] = future
+        else:
+            self.coalesced += 1
+        return future
+
+    # ---------- lookups ----------
+
+    def lookup(self, station_id):
+        """
+        Non-blocking half of get(): (result, status, None) when the cache can
+        answer now (fresh, or stale with a refresh started), otherwise
+        (None, None, future) for the upstream call to wait on.
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(station_id)
+            if entry is not None and now < entry.expires_at:
+                self.hits += 1
+                return entry.result, entry.status, None
+            future = self._start_refresh(station_id)
+            # A failed fetch with nothing to fall back on is retried, not served stale
+            servable = entry is not None and (entry.status == 200 or entry.last_good is not None)
+            if servable and now < entry.expires_at + self.stale_ttl:
+                self.stale_hits += 1
+                return self._stale(entry, now), entry.status, None
+            self.misses += 1
+            return None, None, future
+
+    def _stale(self, entry, now):
+        """
+        The cached payload as the last refresh left it, flagged stale with its
+        age. It only says fallback=True if that refresh itself failed.
+        """
+        fetched_at = entry.last_good[1] if entry.last_good is not None else entry.fetched_at
+        return {**entry.result, "stale": True, "age_seconds": round(now - fetched_at, 1)}
+
+    def resolve(self, station_id, future, timeout):
+        """Wait up to `timeout` for a lookup() miss; on timeout fall back to anything cached."""
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeout:
+            now = time.time()
+            with self._lock:
+                entry = self._entries.get(station_id)
+            if entry is not None and entry.last_good is not None:
+                return self._fallback(entry.last_good, now, expired=True), 200
+            return {"error": "Upstream timeout", "expired": True, "fallback": False}, 504
+
+    def get(self, station_id, timeout=None):
+        """(payload, http status) for one station, from cache or a coalesced upstream call."""
+        result, status, future = self.lookup(station_id)
+        if future is None:
+            return result, status
+        return self.resolve(station_id, future, self.timeout + 1 if timeout is None else timeout)
+
+    def get_many(self, station_ids, deadline=PWS_BATCH_DEADLINE):
+        """
+        {station_id: (payload, status)} for several stations. Cached stations
+        answer at once; the rest are fetched concurrently (at most
+        max_in_flight upstream calls at a time) and each is waited on only until
+        `deadline` seconds after the call started. A station that misses the
+        deadline gets its last observation (fallback=True) or a timeout entry,
+        and its fetch carries on in the background to warm the cache.
+        """
+        deadline_at = time.monotonic() + deadline
+        results, pending = {}, {}
+        for station_id in dict.fromkeys(station_ids):
+            result, status, future = self.lookup(station_id)
+            if future is None:
+                results[station_id] = (result, status)
+            else:
+                pending[station_id] = future
+        for station_id, future in pending.items():
+            results[station_id] = self.resolve(station_id, future, max(0.0, deadline_at - time.monotonic()))
+        return results
+
+    def stats(self):
+        with self._lock:
+            latencies = sorted(self._latencies)
+            lookups = self.hits + self.stale_hits + self.misses
+            stats = {
+                "entries": len(self._entries),
+                "in_flight": len(self._in_flight),
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "hit_ratio": round((self.hits + self.stale_hits) / lookups, 4) if lookups else None,
+                "upstream_calls": self.upstream_calls,
+                "upstream_errors": self.upstream_errors,
+            }
+        if latencies:
+            stats["upstream_latency_ms"] = {
+                "avg": round(1000 * sum(latencies) / len(latencies), 1),
+                "p50": round(1000 * latencies[len(latencies) // 2], 1),
+                "p95": round(1000 * latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))], 1),
+                "max": round(1000 * latencies[-1], 1),
+            }
+        return stats
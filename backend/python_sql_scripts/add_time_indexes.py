@@ -0,0 +1,28 @@
+import os
+from dotenv import load_dotenv
+from sqlalchemy import create_engine, text
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+ENV_PATH = os.path.join(ROOT_DIR, ".env")
+load_dotenv(ENV_PATH)
+
+DATABASE_URL = os.getenv("DATABASE_URL")
+engine = create_engine(DATABASE_URL)
+
+# Time-bounded API queries filter on (station_id, <time column>); without these
+# indexes every request scans a station's full history.
+INDEXES = {
+    "idx_weather_raw_station_time": ("weather_raw", "station_id, local_time"),
+    "idx_weather_hourly_station_time": ("weather_hourly", "station_id, local_time"),
+    "idx_weather_daily_station_date": ("weather_daily", "station_id, date"),
+}
+
+def main():
+    with engine.begin() as conn:
+        for name, (table, columns) in INDEXES.items():
+            print(f"🛠 Ensuring index {name} on {table} ({columns})")
+            conn.execute(text(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({columns});"))
+    print("✅ Indexes in place.")
+
+if __name__ == "__main__":
+    main()
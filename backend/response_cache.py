@@ -0,0 +1,211 @@
+import os
+import select
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+import psycopg2
+from flask import Response, request
+
+from fetch.cache_invalidation import CACHE_INVALIDATION_CHANNEL
+from response_format import negotiate_format
+
+RESPONSE_CACHE_BACKEND = os.getenv("RESPONSE_CACHE_BACKEND", "memory")  # memory | none
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "512"))
+RESPONSE_CACHE_DEFAULT_TTL = int(os.getenv("RESPONSE_CACHE_TTL", "120"))  # seconds
+
+# Short windows change every pipeline run; long windows barely move.
+PERIOD_TTLS = {
+    "1d": 120,
+    "7d": 600,
+    "30d": 1800,
+    "ytd": 3600,
+}
+
+# Response headers stored with the body and replayed on a hit
+REPLAYED_HEADERS = ("Vary", "X-Next-Cursor")
+
+# Request args that make up the cache key (besides the endpoint itself)
+KEY_ARGS = ("period", "column", "columns", "hours", "limit", "max_points", "downsample",
+            "page_size", "cursor", "stream")
+
+
+class LRUResponseCache:
+    """Bounded in-process cache with per-entry TTL, LRU eviction and table tags."""
+
+    def __init__(self, max_entries=RESPONSE_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (expires_epoch, tables, value)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.time():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[2]
+
+    def set(self, key, value, ttl, tables=()):
+        with self._lock:
+            self._entries[key] = (time.time() + ttl, frozenset(tables), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, tables=None):
+        """Drop entries built from any of `tables` (all entries if None)."""
+        with self._lock:
+            if tables is None:
+                dropped = len(self._entries)
+                self._entries.clear()
+            else:
+                tables = set(tables)
+                stale = [k for k, (_, tags, _) in self._entries.items() if tags & tables]
+                for k in stale:
+                    del self._entries[k]
+                dropped = len(stale)
+            self.invalidations += dropped
+            return dropped
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "backend": "memory",
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+
+class NullResponseCache:
+    """Drop-in replacement that never stores anything (RESPONSE_CACHE_BACKEND=none)."""
+
+    def get(self, key):
+        return None
+
+    def set(self, key, value, ttl, tables=()):
+        pass
+
+    def invalidate(self, tables=None):
+        return 0
+
+    def stats(self):
+        return {"backend": "none"}
+
+
+def make_response_cache(backend=RESPONSE_CACHE_BACKEND):
+    if backend == "none":
+        return NullResponseCache()
+    if backend == "memory":
+        return LRUResponseCache()
+    raise ValueError(f"Unknown RESPONSE_CACHE_BACKEND '{backend}'")
+
+
+response_cache = make_response_cache()
+
+
+def request_cache_key():
+    station_ids = request.args.get("station_id") or request.args.get("station_ids") or ""
+    stations = tuple(sorted(s for s in station_ids.split(",") if s))
+    # The negotiated encoding (?format= or Accept) changes the body, so it is part of the key
+    return (request.path, stations, negotiate_format()) + tuple(request.args.get(a) for a in KEY_ARGS)
+
+
+def ttl_for_period(period):
+    return PERIOD_TTLS.get(period, RESPONSE_CACHE_DEFAULT_TTL)
+
+
+def cached_response(tables):
+    """
+    Cache successful (200) responses of a view, tagged with the tables it reads
+    so a pipeline write to any of them drops the entry.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            start_invalidation_listener()
+            key = request_cache_key()
+            cached = response_cache.get(key)
+            if cached is not None:
+                body, mimetype, headers = cached
+                return Response(body, status=200, mimetype=mimetype, headers=headers)
+
+            rv = view(*args, **kwargs)
+            resp = rv[0] if isinstance(rv, tuple) else rv
+            status = rv[1] if isinstance(rv, tuple) and len(rv) > 1 else resp.status_code
+            # Streamed bodies are generated on the fly and can't be replayed
+            if status == 200 and isinstance(resp, Response) and not resp.is_streamed:
+                response_cache.set(
+                    key,
+                    (resp.get_data(), resp.mimetype,
+                     {h: resp.headers[h] for h in REPLAYED_HEADERS if h in resp.headers}),
+                    ttl_for_period(request.args.get("period")),
+                    tables
+                )
+            return rv
+        return wrapper
+    return decorator
+
+
+# ---------- write-driven invalidation (Postgres LISTEN/NOTIFY) ----------
+
+_listener_started = False
+_listener_lock = threading.Lock()
+
+
+def _listen_forever(dsn):
+    while True:
+        conn = None
+        try:
+            conn = psycopg2.connect(dsn)
+            conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+            with conn.cursor() as cur:
+                cur.execute(f"LISTEN {CACHE_INVALIDATION_CHANNEL};")
+            # Anything written while we were disconnected is unknown -> start clean
+            response_cache.invalidate()
+            print(f"👂 Listening for cache invalidations on '{CACHE_INVALIDATION_CHANNEL}'")
+            while True:
+                if select.select([conn], [], [], 60) == ([], [], []):
+                    continue
+                conn.poll()
+                while conn.notifies:
+                    note = conn.notifies.pop(0)
+                    tables = [t for t in note.payload.split(",") if t] or None
+                    dropped = response_cache.invalidate(tables)
+                    print(f"🧹 Cache invalidated for {note.payload or 'all tables'} ({dropped} entries)")
+        except Exception as e:
+            print(f"⚠️ Cache invalidation listener error, retrying in 30s: {e}")
+            time.sleep(30)
+        finally:
+            if conn is not None:
+                conn.close()
+
+
+def start_invalidation_listener(dsn=None):
+    """Start the per-process LISTEN thread once; TTLs still apply if it can't connect."""
+    global _listener_started
+    if _listener_started or isinstance(response_cache, NullResponseCache):
+        return
+    with _listener_lock:
+        if _listener_started:
+            return
+        dsn = dsn or os.getenv("DATABASE_URL")
+        if dsn:
+            threading.Thread(target=_listen_forever, args=(dsn,), daemon=True).start()
+        _listener_started = True
@@ -0,0 +1,145 @@
+"""
+Opt-in compact encodings for the time-series endpoints, plus response compression.
+
+    ?format=columnar                        -> {"columns": [...], "timestamps": [epoch s...],
+                                                "data": {column: [...]}}
+    Accept: application/msgpack             -> the same payload as MessagePack
+    Accept: application/vnd.apache.arrow.stream -> Arrow IPC stream (ts as int64 epoch seconds;
+                                                the JSON payload's extra keys, e.g. next_cursor,
+                                                JSON-encoded in the schema metadata)
+
+Without either, endpoints keep their row-oriented JSON. Columnar payloads are
+built a column at a time, so there is no dict per row and no strftime per
+timestamp. msgpack, brotli and pyarrow are optional; asking for an encoding
+whose package is missing falls back to columnar JSON.
+"""
+import os
+import io
+import gzip
+import json
+
+import numpy as np
+import pandas as pd
+from flask import Response, jsonify, request
+
+MSGPACK_MIMETYPES = ("application/msgpack", "application/x-msgpack")
+ARROW_MIMETYPE = "application/vnd.apache.arrow.stream"
+FORMATS = ("records", "columnar", "msgpack", "arrow")
+
+# Bodies smaller than this go out uncompressed; the headers would eat the saving
+RESPONSE_COMPRESS_MIN_BYTES = int(os.getenv("RESPONSE_COMPRESS_MIN_BYTES", "2048"))
+RESPONSE_GZIP_LEVEL = int(os.getenv("RESPONSE_GZIP_LEVEL", "6"))
+RESPONSE_BROTLI_QUALITY = int(os.getenv("RESPONSE_BROTLI_QUALITY", "5"))
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+def negotiate_format():
+    """records (legacy JSON), columnar, msgpack or arrow, from ?format= or an explicit Accept type."""
+    fmt = request.args.get("format")
+    if fmt in FORMATS:
+        return fmt
+    # Only explicit types count: a browser's */* must keep getting the legacy JSON
+    accepted = {mimetype for mimetype, quality in request.accept_mimetypes if quality > 0}
+    if accepted & set(MSGPACK_MIMETYPES):
+        return "msgpack"
+    if ARROW_MIMETYPE in accepted:
+        return "arrow"
+    return "records"
+
+def vary_on_accept(response):
+    """Mark a negotiated response as depending on Accept, so caches don't mix up the encodings."""
+    response.vary.add("Accept")
+    return response
+
+def _epoch_seconds(series):
+    return pd.to_datetime(series).to_numpy(dtype="datetime64[s]").astype("int64")
+
+def _column_values(series):
+    """Column -> JSON/msgpack-safe list with None for missing values."""
+    if pd.api.types.is_datetime64_any_dtype(series):
+        values = _epoch_seconds(series).astype(object)
+        values[series.isna().to_numpy()] = None
+        return values.tolist()
+    if pd.api.types.is_float_dtype(series):
+        values = series.to_numpy(dtype="float64")
+        return np.where(np.isnan(values), None, values).tolist()
+    return series.astype(object).where(series.notna(), None).tolist()
+
+def columnar_payload(df, ts_column, extra=None):
+    columns = [c for c in df.columns if c != ts_column]
+    payload = dict(extra or {})
+    payload["columns"] = columns
+    payload["timestamps"] = _epoch_seconds(df[ts_column]).tolist()
+    payload["data"] = {c: _column_values(df[c]) for c in columns}
+    return payload
+
+def _arrow_body(df, ts_column, extra=None):
+    import pyarrow as pa
+
+    df = df.copy()
+    df[ts_column] = _epoch_seconds(df[ts_column])
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    if extra:
+        metadata = dict(table.schema.metadata or {})
+        metadata.update({key.encode(): json.dumps(value).encode() for key, value in extra.items()})
+        table = table.replace_schema_metadata(metadata)
+    sink = io.BytesIO()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue()
+
+def _msgpack_default(value):
+    # DATE columns and other stragglers in object columns
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return str(value)
+
+def columnar_response(df, ts_column, fmt, extra=None):
+    """Encode df (one timestamp column + value columns) in the negotiated columnar format."""
+    response = None
+    if fmt == "arrow":
+        try:
+            response = Response(_arrow_body(df, ts_column, extra), mimetype=ARROW_MIMETYPE)
+        except ImportError:
+            pass
+    if response is None:
+        payload = columnar_payload(df, ts_column, extra)
+        if fmt == "msgpack" and msgpack is not None:
+            response = Response(msgpack.packb(payload, default=_msgpack_default), mimetype=MSGPACK_MIMETYPES[0])
+        else:
+            response = jsonify(payload)
+    return vary_on_accept(response)
+
+def _accepted_encodings():
+    return {enc.lower() for enc, quality in request.accept_encodings if quality > 0}
+
+def compress_response(response):
+    """after_request hook: brotli or gzip for large, not yet encoded, non-streamed bodies."""
+    if (response.status_code != 200 or response.direct_passthrough
+            or response.is_streamed or "Content-Encoding" in response.headers):
+        return response
+    encodings = _accepted_encodings()
+    if "br" not in encodings and "gzip" not in encodings:
+        return response
+    body = response.get_data()
+    if len(body) < RESPONSE_COMPRESS_MIN_BYTES:
+        return response
+
+    if "br" in encodings and brotli is not None:
+        response.set_data(brotli.compress(body, quality=RESPONSE_BROTLI_QUALITY))
+        response.headers["Content-Encoding"] = "br"
+    elif "gzip" in encodings:
+        response.set_data(gzip.compress(body, compresslevel=RESPONSE_GZIP_LEVEL))
+        response.headers["Content-Encoding"] = "gzip"
+    else:
+        return response
+    response.vary.add("Accept-Encoding")
+    return response
@@ -6,8 +6,15 @@ import logging
 import sys
 import os
 import io
+import json
+import time
+import uuid
+import importlib
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from pathlib import Path
 from datetime import datetime
+from sqlalchemy import create_engine
 
 # 🔧 Force UTF-8 encoding for stdout (fixes emoji crash on Windows)
 sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
@@ -17,6 +24,7 @@ BASE_DIR = Path(__file__).resolve().parent
 LOG_DIR = BASE_DIR / "logs"
 LOG_DIR.mkdir(exist_ok=True)
 log_file = LOG_DIR / f"pipeline_log_{datetime.now().strftime('%Y%m%d_%H%M%S')}.log"
+RUN_LOG = LOG_DIR / "pipeline_runs.jsonl"  # one JSON record per stage per run
 
 # 🪵 Configure logging
 logging.basicConfig(
@@ -29,16 +37,35 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Scripts to run in order (relative paths from project root)
+# inprocess (import stages, run the DAG on a thread pool) or subprocess (legacy, one script at a time)
+PIPELINE_MODE = os.getenv("PIPELINE_MODE", "inprocess")
+PIPELINE_WORKERS = int(os.getenv("PIPELINE_WORKERS", "2"))
+
+# Scripts to run in order (relative paths from project root) — used by subprocess mode
 scripts = [
     "fetch/fetch_pws_history.py",
+    "fetch/raw_archive.py",  # compact new JSON windows into the Parquet archive
+    "fetch/station_store.py",  # append new observations to the memory-mapped station store
     "fetch/weatherjson_to_csv.py",
     "process_weather_data.py",
-    "fetch/aggregate_to_daily.py",
-    "fetch/aggregate_to_hourly.py",
+    "fetch/aggregate_weather.py",  # hourly + daily rollups in one pass over weather_raw
     "fetch/inject_sales.py"
 ]
 
+# Stage name -> (module, callable, stages that must finish first). Dependencies only
+# order the work: as before, a failed stage is logged and the pipeline carries on.
+STAGES = {
+    "fetch_pws_history": ("fetch_pws_history", "main", []),
+    "raw_archive": ("raw_archive", "main", ["fetch_pws_history"]),
+    # INGEST_MODE=archive reads the Parquet archive, so ingest waits for compaction
+    "weatherjson_to_csv": ("weatherjson_to_csv", "main", ["fetch_pws_history", "raw_archive"]),
+    "process_weather_data": ("process_weather_data", "main", ["weatherjson_to_csv"]),
+    "station_store": ("station_store", "main", ["fetch_pws_history"]),
+    # AGGREGATE_SOURCE=store aggregates from the station store, so it must be current
+    "aggregate_weather": ("aggregate_weather", "main", ["process_weather_data", "station_store"]),
+    "inject_sales": ("inject_sales", "main", []),
+}
+
 def run_script(script_path):
     try:
         logger.info(f"▶️ Running {script_path}...")
@@ -60,11 +87,127 @@ def run_script(script_path):
         logger.error(f"❌ Error running {script_path}")
         logger.error(e.stderr)
 
+# ---------- in-process DAG runner ----------
+
+_stage_local = threading.local()
+
+class _StageOutput(io.TextIOBase):
+    """
+    Stands in for sys.stdout while stages run so their print() output still lands
+    in the pipeline log, tagged with the stage that printed it (stages run on
+    several threads at once, so contextlib.redirect_stdout can't be used).
+    """
+
+    def __init__(self, fallback):
+        self.fallback = fallback
+        self._buffers = {}
+
+    def write(self, s):
+        stage = getattr(_stage_local, "name", None)
+        if stage is None:
+            return self.fallback.write(s)
+        buf = self._buffers.get(stage, "") + s
+        *lines, rest = buf.split("\n")
+        for line in lines:
+            if line.strip():
+                logger.info(f"[{stage}] {line}")
+        self._buffers[stage] = rest
+        return len(s)
+
+    def flush_stage(self, stage):
+        rest = self._buffers.pop(stage, "")
+        if rest.strip():
+            logger.info(f"[{stage}] {rest}")
+
+    def flush(self):
+        self.fallback.flush()
+
+def _load_stage(module_name, func_name, engine):
+    module = importlib.import_module(module_name)
+    # Stage modules create their own engine at import; point them at the shared one
+    if engine is not None and hasattr(module, "engine"):
+        module.engine = engine
+    return getattr(module, func_name)
+
+def run_stage(run_id, name, engine):
+    module_name, func_name, _ = STAGES[name]
+    _stage_local.name = name
+    record = {"run_id": run_id, "stage": name, "started_at": datetime.now().isoformat()}
+    start = time.perf_counter()
+    try:
+        logger.info(f"▶️ Running {name}...")
+        result = _load_stage(module_name, func_name, engine)()
+        record["status"] = "ok"
+        record["rows"] = result if isinstance(result, int) else None
+    except (Exception, SystemExit) as e:  # scripts may sys.exit(); keep the pipeline going
+        logger.error(f"❌ Error running {name}: {e!r}")
+        record["status"] = "error"
+        record["rows"] = None
+        record["error"] = repr(e)
+    finally:
+        _stage_local.name = None
+        if isinstance(sys.stdout, _StageOutput):
+            sys.stdout.flush_stage(name)
+    record["seconds"] = round(time.perf_counter() - start, 3)
+    logger.info(f"⏱️ {name} finished in {record['seconds']}s ({record['status']}, rows={record['rows']})")
+    return record
+
+def run_dag(run_id, engine, workers=PIPELINE_WORKERS):
+    pending = {name: set(deps) for name, (_, _, deps) in STAGES.items()}
+    done = set()
+    records = []
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        running = {}
+        while pending or running:
+            ready = [name for name, deps in pending.items() if deps <= done]
+            for name in ready:
+                del pending[name]
+                running[pool.submit(run_stage, run_id, name, engine)] = name
+            if not running:
+                raise RuntimeError(f"Pipeline DAG has unsatisfiable dependencies: {pending}")
+
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                done.add(running.pop(future))
+                records.append(future.result())
+    return records
+
+def write_run_log(records):
+    with open(RUN_LOG, "a", encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(record) + "\n")
+
 def run_pipeline():
     logger.info("🚀 Starting weather data pipeline...\n")
-    for script in scripts:
-        run_script(script)
-    logger.info("\n✅ Pipeline complete.")
+    if PIPELINE_MODE == "subprocess":
+        for script in scripts:
+            run_script(script)
+        logger.info("\n✅ Pipeline complete.")
+        return
+
+    # Stage modules import their siblings by bare name, as when run as scripts
+    for path in (BASE_DIR, BASE_DIR / "fetch"):
+        if str(path) not in sys.path:
+            sys.path.insert(0, str(path))
+
+    run_id = uuid.uuid4().hex[:12]
+    database_url = os.getenv("DATABASE_URL")
+    engine = create_engine(database_url) if database_url else None
+    stdout = sys.stdout
+    sys.stdout = _StageOutput(stdout)
+    try:
+        records = run_dag(run_id, engine)
+    finally:
+        sys.stdout = stdout
+        if engine is not None:
+            engine.dispose()
+
+    write_run_log(records)
+    total = sum(r["seconds"] for r in records)
+    failed = [r["stage"] for r in records if r["status"] != "ok"]
+    logger.info(f"\n✅ Pipeline {run_id} complete: {len(records)} stages, {total:.1f}s of stage time"
+                + (f", failed: {', '.join(failed)}" if failed else ""))
 
 if __name__ == "__main__":
-    run_pipeline()
\ No newline at end of file
+    run_pipeline()
@@ -0,0 +1,83 @@
+import os
+import threading
+import time
+
+SCHEMA_CATALOG_TABLES = ("weather_raw", "weather_hourly", "weather_daily")
+SCHEMA_CATALOG_REFRESH = int(os.getenv("SCHEMA_CATALOG_REFRESH", "900"))  # seconds, 0 = no timer
+# A lookup miss may trigger a reload (e.g. after an ALTER TABLE), but at most this often
+SCHEMA_CATALOG_MISS_REFRESH = int(os.getenv("SCHEMA_CATALOG_MISS_REFRESH", "60"))
+
+
+class SchemaCatalog:
+    """
+    Process-wide copy of the weather tables' columns, so column validation does not
+    need a pool checkout and an information_schema round trip per request.
+    `conn_factory` is a context manager yielding a psycopg2 connection (pooled_conn).
+    """
+
+    def __init__(self, conn_factory, tables=SCHEMA_CATALOG_TABLES, refresh_interval=SCHEMA_CATALOG_REFRESH):
+        self.conn_factory = conn_factory
+        self.tables = tuple(tables)
+        self.refresh_interval = refresh_interval
+        self._columns = {}  # table -> [column, ...] in ordinal order
+        self._column_sets = {}  # table -> frozenset(columns)
+        self._loaded_at = None
+        self._lock = threading.Lock()
+        self._timer_started = False
+
+    def refresh(self):
+        with self.conn_factory() as conn:
+            with conn.cursor() as cur:
+                cur.execute("""
+                    SELECT table_name, column_name
+                    FROM information_schema.columns
+                    WHERE table_name = ANY(%s)
+                    ORDER BY table_name, ordinal_position;
+                """, (list(self.tables),))
+                rows = cur.fetchall()
+
+        columns = {table: [] for table in self.tables}
+        for table, column in rows:
+            columns[table].append(column)
+
+        with self._lock:
+            self._columns = columns
+            self._column_sets = {t: frozenset(c) for t, c in columns.items()}
+            self._loaded_at = time.time()
+        print("📚 Schema catalog loaded: " + ", ".join(f"{t}={len(c)}" for t, c in columns.items()))
+
+    def ensure_loaded(self):
+        if self._loaded_at is None:
+            self.refresh()
+        self._start_timer()
+
+    def columns(self, table):
+        self.ensure_loaded()
+        return list(self._columns.get(table, []))
+
+    def has_column(self, table, column):
+        self.ensure_loaded()
+        if column in self._column_sets.get(table, ()):
+            return True
+        # Unknown column: reload once in a while in case the schema changed under us
+        if time.time() - self._loaded_at >= SCHEMA_CATALOG_MISS_REFRESH:
+            self.refresh()
+            return column in self._column_sets.get(table, ())
+        return False
+
+    def _start_timer(self):
+        if self._timer_started or self.refresh_interval <= 0:
+            return
+        with self._lock:
+            if self._timer_started:
+                return
+            self._timer_started = True
+        threading.Thread(target=self._refresh_forever, daemon=True).start()
+
+    def _refresh_forever(self):
+        while True:
+            time.sleep(self.refresh_interval)
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"⚠️ Schema catalog refresh failed, keeping previous copy: {e}")
@@ -0,0 +1,20 @@
+import os
+import sys
+
+import pytest
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+# Modules import each other the way app.py and the fetch scripts do: flat from
+# backend/ and from backend/fetch/
+for path in (TESTS_DIR, os.path.join(BACKEND_DIR, "fetch"), BACKEND_DIR):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+from fake_twc import FakeTWC  # noqa: E402
+
+@pytest.fixture
+def fake_twc():
+    server = FakeTWC()
+    yield server
+    server.stop()
@@ -0,0 +1,79 @@
+"""
+Local stand-in for api.weather.com, for pointing TWC_BASE_URL / base_url at.
+
+Responses are scripted per path and consumed in order (the last one repeats);
+unscripted paths answer from `default`. Every request is logged in .calls with
+its query parameters and arrival time.
+"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+HISTORY_PATH = "/v2/pws/history/hourly"
+CURRENT_PATH = "/v2/pws/observations/current"
+
+def observations(station_id, count=1):
+    return {"observations": [
+        {"stationID": station_id, "obsTimeLocal": f"2025-01-01 {i % 24:02d}:00:00",
+         "obsTimeUtc": f"2025-01-01T{i % 24:02d}:00:00Z", "humidity": 50, "imperial": {"temp": 41.5}}
+        for i in range(count)
+    ]}
+
+class FakeTWC:
+    def __init__(self):
+        self.calls = []
+        self.scripts = {}
+        self.delay = 0.0
+        self.default = lambda path, params: (200, {}, observations(params.get("stationId", "KTEST")))
+        self._lock = threading.Lock()
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self.server.daemon_threads = True
+        self.base_url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def respond(self, path, *responses):
+        """Queue (status, headers, body) responses for path; body may be a dict (sent as JSON) or None."""
+        with self._lock:
+            self.scripts[path] = list(responses)
+
+    def calls_to(self, path):
+        return [c for c in self.calls if c["path"] == path]
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _next(self, path, params):
+        with self._lock:
+            self.calls.append({"path": path, "params": params, "at": time.monotonic()})
+            script = self.scripts.get(path)
+            if script:
+                return script.pop(0) if len(script) > 1 else script[0]
+        return self.default(path, params)
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                params = {k: v[0] for k, v in parse_qs(url.query).items()}
+                status, headers, body = fake._next(url.path, params)
+                if fake.delay:
+                    time.sleep(fake.delay)
+                data = json.dumps(body).encode() if isinstance(body, (dict, list)) else (body or b"")
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                if data:
+                    self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        return Handler
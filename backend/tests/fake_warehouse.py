@@ -0,0 +1,41 @@
+"""
+In-memory stand-in for pred_weather_tables.BigQueryWarehouse, so the tests
+run the incremental buoy load without BigQuery:
+
+    from fake_ndbc import FakeNdbcApi
+    wh = FakeWarehouse({air_table_id: ["station_id", "time_utc", "WSPD", ...], ...})
+    pred_weather_tables.main(warehouse=wh, api=FakeNdbcApi())
+
+Tables are DataFrames and merge() upserts on the key columns like the MERGE
+does. High-water-mark queries and merges are recorded in .mark_queries and
+.merges, so a second run with nothing new can be checked to stage nothing.
+"""
+from __future__ import annotations
+from typing import Dict, List
+
+import pandas as pd
+
+class FakeWarehouse:
+    def __init__(self, tables: Dict[str, List[str]]):
+        self.tables = {table_id: pd.DataFrame(columns=cols) for table_id, cols in tables.items()}
+        self.mark_queries: List[str] = []
+        self.merges: List[tuple] = []
+
+    def columns(self, table_id: str) -> list:
+        return list(self.tables[table_id].columns)
+
+    def high_water_marks(self, table_id: str, station_ids, station_col="station_id", time_col="time_utc") -> dict:
+        self.mark_queries.append(table_id)
+        table = self.tables[table_id]
+        rows = table[table[station_col].isin(list(station_ids))]
+        latest = pd.to_datetime(rows[time_col], utc=True).groupby(rows[station_col]).max()
+        return {stn: ts for stn, ts in latest.items() if pd.notna(ts)}
+
+    def merge(self, table_id: str, df: pd.DataFrame, key_cols):
+        self.merges.append((table_id, len(df)))
+        table = self.tables[table_id]
+        incoming = df.reindex(columns=table.columns)
+        combined = incoming if table.empty else pd.concat([table, incoming], ignore_index=True)
+        if all(k in df.columns for k in key_cols):
+            combined = combined.drop_duplicates(subset=list(key_cols), keep="last")
+        self.tables[table_id] = combined.reset_index(drop=True)
@@ -0,0 +1,154 @@
+import importlib
+import json
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("psycopg2")
+pytest.importorskip("flask")
+
+@pytest.fixture
+def api(monkeypatch):
+    """app.py with the database replaced: queries are recorded and answered by api.answer(sql, params)."""
+    monkeypatch.setenv("DATABASE_URL", "postgresql://test@127.0.0.1:1/test")
+    app = importlib.import_module("app")
+    import response_cache
+    monkeypatch.setattr(response_cache, "_listener_started", True)
+    app.response_cache.invalidate()
+
+    class Api:
+        queries = []
+        answer = staticmethod(lambda sql, params: pd.DataFrame())
+        client = app.app.test_client()
+        module = app
+
+    class FakeCursor:
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            return False
+
+        def execute(self, sql, params=None):
+            Api.queries.append((sql, params))
+            self.rows = list(Api.answer(sql, params).itertuples(index=False, name=None))
+
+        def fetchall(self):
+            return self.rows
+
+    class FakeConn:
+        def cursor(self, *args, **kwargs):
+            return FakeCursor()
+
+    @contextmanager
+    def fake_conn():
+        yield FakeConn()
+
+    def read_sql_query(sql, conn, params=None, **kwargs):
+        Api.queries.append((sql, params))
+        return Api.answer(sql, params)
+
+    monkeypatch.setattr(app, "pooled_conn", fake_conn)
+    monkeypatch.setattr(app, "column_exists", lambda table, column: True)
+    monkeypatch.setattr(app.pd, "read_sql_query", read_sql_query)
+    return Api
+
+def _hourly(station_ids, hours=3):
+    ts = pd.date_range("2025-01-01", periods=hours, freq="h")
+    return pd.concat([pd.DataFrame({"station_id": sid, "ts": ts, "temp_avg": range(hours)}) for sid in station_ids],
+                     ignore_index=True)
+
+@pytest.mark.parametrize("columns", ["station_id,temp_avg", "temp_avg,local_time,station_id", "temp_avg,ts"])
+def test_graph_batch_ignores_key_columns(api, columns):
+    api.answer = lambda sql, params: _hourly(params)
+    resp = api.client.get(f"/api/graph_batch?station_ids=A,B&period=7d&columns={columns}")
+
+    assert resp.status_code == 200
+    body = resp.get_json()
+    assert body["columns"] == ["temp_avg"]
+    assert set(body["series"]) == {"A", "B"}
+    assert body["series"]["A"]["values"]["temp_avg"] == [0, 1, 2]
+    select = api.queries[0][0].split("FROM")[0]
+    assert select.count("station_id") == 1 and "local_time," not in select.split("AS ts")[1]
+
+def test_graph_batch_with_only_key_columns_is_rejected(api):
+    resp = api.client.get("/api/graph_batch?station_ids=A&period=7d&columns=station_id,local_time")
+    assert resp.status_code == 400
+    assert api.queries == []
+
+@pytest.mark.parametrize("max_points", [12, 13, 50])
+def test_graph_batch_max_points_caps_rows_across_columns(api, max_points):
+    columns = ["temp_avg", "humidity_avg", "wind_gust_max", "precip_sum"]
+    ts = pd.date_range("2025-01-01", periods=500, freq="h")
+    rng = np.random.default_rng(0)
+
+    def answer(sql, params):
+        return pd.concat([pd.DataFrame({"station_id": sid, "ts": ts, **{c: rng.normal(size=len(ts)) for c in columns}})
+                          for sid in params], ignore_index=True)
+
+    api.answer = answer
+    resp = api.client.get(f"/api/graph_batch?station_ids=A,B&period=7d&columns={','.join(columns)}"
+                          f"&max_points={max_points}")
+    assert resp.status_code == 200
+    for series in resp.get_json()["series"].values():
+        assert 0 < len(series["timestamps"]) <= max_points
+
+def test_graph_batch_rejects_max_points_below_three_per_column(api):
+    resp = api.client.get("/api/graph_batch?station_ids=A&period=7d&columns=a,b,c,d&max_points=6")
+    assert resp.status_code == 400
+    assert "12" in resp.get_json()["error"]
+    assert api.queries == []
+
+def _table_rows(n, station_id="A"):
+    ts = pd.date_range("2025-01-01", periods=n, freq="h")[::-1]
+    return pd.DataFrame({"local_time": ts, "station_id": station_id, "temp_avg": range(n)})
+
+def test_table_data_hours_without_page_size_returns_whole_window(api):
+    api.answer = lambda sql, params: _table_rows(250)
+    resp = api.client.get("/api/table_data?station_id=A&hours=300&columns=temp_avg")
+
+    assert resp.status_code == 200
+    body = resp.get_json()
+    assert len(body["rows"]) == 250 and body["next_cursor"] is None
+    assert "LIMIT" not in api.queries[0][0]
+
+def test_table_data_pages_with_keyset_cursor(api):
+    rows = _table_rows(250)
+    api.answer = lambda sql, params: rows.head(params[-1])
+    first = api.client.get("/api/table_data?station_id=A&hours=300&page_size=100&columns=temp_avg").get_json()
+    assert len(first["rows"]) == 100 and first["next_cursor"]
+
+    api.client.get(f"/api/table_data?station_id=A&hours=300&page_size=100&columns=temp_avg&cursor={first['next_cursor']}")
+    sql, params = api.queries[-1]
+    # The plain local_time bound is what the (station_id, local_time) index can range-scan on
+    assert "local_time <= %s AND (local_time, station_id) < (%s, %s)" in sql
+    assert params[-4] == params[-3]
+
+def test_table_data_without_hours_defaults_to_one_page(api):
+    api.answer = lambda sql, params: _table_rows(params[-1])
+    body = api.client.get("/api/table_data?station_id=A&columns=temp_avg").get_json()
+    assert len(body["rows"]) == api.module.TABLE_PAGE_SIZE and body["next_cursor"]
+
+@pytest.mark.parametrize("accept", ["application/json", "application/vnd.apache.arrow.stream", "application/msgpack"])
+def test_negotiated_responses_vary_on_accept(api, accept):
+    api.answer = lambda sql, params: _table_rows(params[-1])
+    resp = api.client.get("/api/table_data?station_id=A&columns=temp_avg&page_size=5", headers={"Accept": accept})
+    assert resp.status_code == 200
+    assert "Accept" in resp.headers.get("Vary", "")
+
+    api.answer = lambda sql, params: _hourly(params)
+    resp = api.client.get("/api/graph_data?station_id=A&period=7d&column=temp_avg", headers={"Accept": accept})
+    assert "Accept" in resp.headers.get("Vary", "")
+
+def test_arrow_table_data_carries_next_cursor_in_schema_metadata(api):
+    pa = pytest.importorskip("pyarrow")
+    api.answer = lambda sql, params: _table_rows(params[-1])
+    resp = api.client.get("/api/table_data?station_id=A&columns=temp_avg&page_size=5",
+                          headers={"Accept": "application/vnd.apache.arrow.stream"})
+
+    table = pa.ipc.open_stream(resp.data).read_all()
+    assert table.num_rows == 5
+    cursor = json.loads(table.schema.metadata[b"next_cursor"])
+    assert cursor and cursor == resp.headers["X-Next-Cursor"]
@@ -0,0 +1,66 @@
+import time
+
+import noa_avc_data_fetch as noaa
+from fake_ndbc import FakeNdbcApi
+
+def test_slow_station_times_out_without_holding_up_the_rest():
+    api = FakeNdbcApi(latency={"46050": 0.1, "46015": 3.0, "46027": 0.2})
+    start = time.monotonic()
+    finished = []
+    for result in noaa.iter_buoys_stdmet(["46050", "46015", "46027"], hours=6, api=api, workers=3, timeout=1.0):
+        finished.append((result["station_id"], result["error"]))
+    elapsed = time.monotonic() - start
+
+    # Yielded as they complete, and the timeout doesn't wait for the slow call
+    assert finished == [("46050", None), ("46027", None), ("46015", "timed out after 1s")]
+    assert elapsed < 2.0
+
+def test_failing_station_is_reported_not_emptied():
+    api = FakeNdbcApi(failures={"46059": "HTTP 503 from NDBC"})
+    results = noaa.fetch_buoys_stdmet(["46050", "46059"], hours=6, api=api, workers=2)
+
+    assert list(results) == ["46050", "46059"]
+    assert results["46050"]["error"] is None and len(results["46050"]["df"]) > 0
+    assert results["46059"]["error"] == "RuntimeError: HTTP 503 from NDBC"
+    assert results["46059"]["df"].empty
+
+def test_request_covers_the_lookback_not_whole_days():
+    api = FakeNdbcApi()
+    df = noaa.fetch_buoys_stdmet(["46050"], hours=6, api=api)["46050"]["df"]
+
+    call = api.calls[0]
+    assert call["end_time"] - call["start_time"] == noaa.timedelta(hours=6)
+    assert df["time_utc"].min() >= df["time_utc"].max() - noaa.timedelta(hours=6)
+
+def test_failures_reach_the_aggregated_metrics(monkeypatch):
+    api = FakeNdbcApi(failures={"46059": "boom"})
+    monkeypatch.setattr(noaa, "make_ndbc_client", lambda **kwargs: api)
+    monkeypatch.setattr(noaa, "fetch_metars_awc", lambda ids, hours=6: {})
+    result = noaa.fetch_and_aggregate(["46050", "46059"], [], hours=6)
+
+    assert "error" not in result["BUOY"]["46050"] and result["BUOY"]["46050"]["count"] > 0
+    assert result["BUOY"]["46059"]["error"] == "RuntimeError: boom"
+
+def test_fake_client_is_not_cached():
+    # Synthetic rows must never be written where real NDBC periods are kept
+    assert isinstance(noaa.make_ndbc_client("fake"), FakeNdbcApi)
+
+def test_live_lookback_skips_the_period_cache(monkeypatch):
+    from ndbc_cache import CachedNdbcApi
+
+    clients = []
+
+    class RecordingApi(FakeNdbcApi):
+        def __init__(self):
+            super().__init__()
+            clients.append(self)
+
+    monkeypatch.setattr(noaa, "NdbcApi", RecordingApi)
+    assert isinstance(noaa.make_ndbc_client("ndbc"), CachedNdbcApi)
+    assert isinstance(noaa.make_ndbc_client("ndbc", cached=False), RecordingApi)
+
+    # The default client for a short lookback asks upstream for just those hours, not whole days
+    clients.clear()
+    noaa.fetch_buoys_stdmet(["46050"], hours=2)
+    call = clients[0].calls[0]
+    assert call["end_time"] - call["start_time"] == noaa.timedelta(hours=2)
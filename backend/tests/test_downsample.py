@@ -0,0 +1,27 @@
+import numpy as np
+import pytest
+
+from downsample import DOWNSAMPLE_METHODS, downsample, minmax_indices
+
+def _series(n=1000):
+    rnd = np.random.default_rng(0)
+    y = rnd.normal(50, 10, n)
+    y[rnd.random(n) < 0.05] = np.nan
+    return np.arange(n, dtype=np.float64), y
+
+@pytest.mark.parametrize("method", DOWNSAMPLE_METHODS)
+@pytest.mark.parametrize("max_points", [1, 2, 3, 4, 5, 7, 50, 999, 1000, 5000])
+def test_never_exceeds_budget(method, max_points):
+    x, y = _series()
+    keep = downsample(x, y, max_points, method)
+    assert len(keep) <= max_points
+    assert np.all(np.diff(keep) > 0)
+
+def test_minmax_with_three_points_keeps_endpoints_and_the_extreme():
+    y = np.array([5.0, 4.0, 6.0, 40.0, 5.0, np.nan, 5.0])
+    assert minmax_indices(y, 3).tolist() == [0, 3, 6]
+
+def test_minmax_keeps_bucket_peaks():
+    x, y = _series()
+    keep = minmax_indices(y, 200)
+    assert np.nanargmax(y) in keep and np.nanargmin(y) in keep
@@ -0,0 +1,83 @@
+import os
+import time
+from datetime import datetime
+
+import fetch_pws_history as fph
+from fake_twc import HISTORY_PATH, observations
+
+def _window(tmp_path, start="20250101", end="20250131"):
+    return ("KTEST1", "alias", start, end, str(tmp_path / f"KTEST1_{start}_{end}.json"))
+
+def _fast_limiter():
+    return fph.TokenBucket(rate_per_min=60_000, burst=100)
+
+def test_retry_after_is_honoured(fake_twc, tmp_path):
+    fake_twc.respond(HISTORY_PATH,
+                     (429, {"Retry-After": "0.3"}, None),
+                     (200, {}, observations("KTEST1", 3)))
+    window = _window(tmp_path)
+    with fph.make_session(1) as session:
+        status = fph.fetch_window(session, _fast_limiter(), "key", window, base_url=fake_twc.base_url)
+
+    calls = fake_twc.calls_to(HISTORY_PATH)
+    assert status == "saved"
+    assert len(calls) == 2
+    assert calls[1]["at"] - calls[0]["at"] >= 0.3
+    assert os.path.exists(window[-1])
+
+def test_5xx_backs_off_exponentially_then_gives_up(fake_twc, tmp_path, monkeypatch):
+    slept = []
+    monkeypatch.setattr(fph.time, "sleep", slept.append)
+    fake_twc.respond(HISTORY_PATH, (503, {}, None), (500, {}, None), (502, {}, None))
+    window = _window(tmp_path)
+    with fph.make_session(1) as session:
+        status = fph.fetch_window(session, _fast_limiter(), "key", window,
+                                  base_url=fake_twc.base_url, max_retries=2)
+
+    assert status == "gave up after retries"
+    assert slept == [1, 2]
+    assert len(fake_twc.calls_to(HISTORY_PATH)) == 3
+    assert not os.path.exists(window[-1])
+
+def test_5xx_recovers_and_4xx_is_not_retried(fake_twc, tmp_path, monkeypatch):
+    monkeypatch.setattr(fph.time, "sleep", lambda seconds: None)
+    fake_twc.respond(HISTORY_PATH, (503, {}, None), (200, {}, observations("KTEST1")))
+    with fph.make_session(1) as session:
+        assert fph.fetch_window(session, _fast_limiter(), "key", _window(tmp_path),
+                                base_url=fake_twc.base_url) == "saved"
+
+    fake_twc.calls.clear()
+    fake_twc.respond(HISTORY_PATH, (404, {}, {"error": "nope"}))
+    with fph.make_session(1) as session:
+        status = fph.fetch_window(session, _fast_limiter(), "key", _window(tmp_path, "20250201", "20250228"),
+                                  base_url=fake_twc.base_url)
+    assert status.startswith("error 404")
+    assert len(fake_twc.calls_to(HISTORY_PATH)) == 1
+
+def test_token_bucket_paces_calls():
+    bucket = fph.TokenBucket(rate_per_min=600, burst=1)  # one call every 0.1s
+    start = time.monotonic()
+    for _ in range(5):
+        bucket.acquire()
+    assert time.monotonic() - start >= 0.38
+
+def test_fetch_all_stations_is_paced_and_resumes(fake_twc, tmp_path):
+    start, end = datetime(2025, 1, 1), datetime(2025, 4, 30)  # 4 windows of 31 days
+    kwargs = dict(base_output=str(tmp_path), concurrency=4, rate_per_min=1200,  # 20/s
+                  base_url=fake_twc.base_url, api_key="key")
+
+    assert fph.fetch_all_stations({"KTEST1": "alias"}, start, end, **kwargs) == {"saved": 4}
+    arrivals = sorted(c["at"] for c in fake_twc.calls_to(HISTORY_PATH))
+    assert len(arrivals) == 4
+    assert arrivals[-1] - arrivals[0] >= 3 * 0.05 * 0.8  # concurrency doesn't beat the rate limit
+
+    # Windows on disk are skipped; a missing one is the only call of the rerun
+    saved = sorted(os.listdir(tmp_path / "alias"))
+    os.remove(tmp_path / "alias" / saved[1])
+    fake_twc.calls.clear()
+    assert fph.fetch_all_stations({"KTEST1": "alias"}, start, end, **kwargs) == {"saved": 1}
+    assert [c["params"]["startDate"] for c in fake_twc.calls_to(HISTORY_PATH)] == [saved[1].split("_")[1]]
+
+    fake_twc.calls.clear()
+    assert fph.fetch_all_stations({"KTEST1": "alias"}, start, end, **kwargs) == {}
+    assert fake_twc.calls == []
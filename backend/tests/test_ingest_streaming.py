@@ -0,0 +1,141 @@
+import csv
+import json
+import os
+from datetime import datetime, timedelta
+
+import pytest
+
+pytest.importorskip("psycopg2")
+
+import weatherjson_to_csv as wjc  # noqa: E402
+from field_extractor import compile_extractor  # noqa: E402
+
+EXTRACT = compile_extractor({"stationID": "station_id", "obsTimeLocal": "local_time", "imperial.tempAvg": "avg_temp"})
+
+class FakePg:
+    """
+    Just enough of Postgres for the streaming ingest: weather_raw keyed on
+    (station_id, local_time) with ON CONFLICT DO NOTHING, the ingest_manifest
+    table, a staging table for COPY, and writes that only land on commit().
+    fail_copies = {n} makes the n-th COPY (1-based) raise.
+    """
+
+    def __init__(self, fail_copies=()):
+        self.raw, self.manifest = {}, {}
+        self.fail_copies = set(fail_copies)
+        self.copies = 0
+        self._reset()
+
+    def _reset(self):
+        self.pending_raw, self.pending_manifest, self.staging = {}, {}, []
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def commit(self):
+        self.raw.update(self.pending_raw)
+        self.manifest.update(self.pending_manifest)
+        self._reset()
+
+    def rollback(self):
+        self._reset()
+
+class FakeCursor:
+    def __init__(self, db):
+        self.db = db
+        self.rows, self.rowcount = [], 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params=None):
+        db = self.db
+        if "FROM ingest_manifest" in sql:
+            self.rows = [(path, *entry[:3]) for path, entry in db.manifest.items()]
+        elif "UPDATE ingest_manifest" in sql:
+            size, mtime, path = params
+            db.pending_manifest[path] = (size, mtime, *db.manifest[path][2:])
+        elif "INSERT INTO ingest_manifest" in sql:
+            path, size, mtime, digest, rows = params
+            db.pending_manifest[path] = (size, mtime, digest, rows)
+        elif "INSERT INTO weather_raw" in sql:
+            self.rowcount = 0
+            for row in db.staging:
+                key = (row[0], row[1])
+                if key not in db.raw and key not in db.pending_raw:
+                    db.pending_raw[key] = tuple(row)
+                    self.rowcount += 1
+        elif sql.lstrip().startswith(("TRUNCATE", "CREATE TEMP", "DROP TABLE")):
+            db.staging = []
+
+    def fetchall(self):
+        return self.rows
+
+    def copy_expert(self, sql, buf):
+        self.db.copies += 1
+        if self.db.copies in self.db.fail_copies:
+            raise RuntimeError("COPY failed")
+        self.db.staging.extend(csv.reader(buf))
+
+def _write(path, start, hours, temp=50):
+    obs = [{"stationID": "KTEST1", "obsTimeLocal": (start + timedelta(hours=i)).strftime("%Y-%m-%d %H:%M:%S"),
+            "imperial": {"tempAvg": temp}} for i in range(hours)]
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps({"observations": obs}))
+    return str(path)
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(wjc, "DATA_DIR", str(tmp_path))
+    # Three windows of 5 hours, each overlapping the next by one hour
+    for i in range(3):
+        _write(tmp_path / "alias" / f"KTEST1_{i}.json", datetime(2025, 1, 1) + timedelta(hours=4 * i), 5)
+    return tmp_path
+
+def _ingest(db, data_dir, batch_size=5000):
+    return wjc.ingest_streaming(db, wjc.iter_json_files(str(data_dir)), EXTRACT, batch_size=batch_size)
+
+def test_batch_boundaries_give_the_same_rows_as_one_pass(data_dir):
+    single = FakePg()
+    assert _ingest(single, data_dir) == 13
+    for batch_size in (1, 2, 4, 5, 7):
+        db = FakePg()
+        assert _ingest(db, data_dir, batch_size) == 13
+        assert db.raw == single.raw
+        assert sorted(db.manifest) == sorted(single.manifest)
+
+def test_unchanged_files_are_skipped_and_changed_ones_reingested(data_dir):
+    db = FakePg()
+    _ingest(db, data_dir)
+    entries = wjc.files_to_ingest(db.cursor(), wjc.iter_json_files(str(data_dir)), str(data_dir))
+    assert entries == []
+
+    # Touched but identical: still skipped, with the new mtime remembered
+    touched = data_dir / "alias" / "KTEST1_0.json"
+    os.utime(touched, (1, 1))
+    assert wjc.files_to_ingest(db.cursor(), wjc.iter_json_files(str(data_dir)), str(data_dir)) == []
+
+    # Same size, new content and mtime; then a longer file
+    _write(touched, datetime(2025, 1, 1), 5, temp=60)
+    os.utime(touched, (2, 2))
+    grown = _write(data_dir / "alias" / "KTEST1_2.json", datetime(2025, 1, 1, 8), 8)
+    entries = wjc.files_to_ingest(db.cursor(), wjc.iter_json_files(str(data_dir)), str(data_dir))
+    assert sorted(e[1] for e in entries) == [os.path.join("alias", "KTEST1_0.json"), os.path.join("alias", "KTEST1_2.json")]
+
+    assert _ingest(db, data_dir) == 3  # the three hours the longer window added
+    assert db.manifest[os.path.relpath(grown, data_dir)][3] == 8
+
+def test_failed_batch_leaves_its_files_unrecorded(data_dir):
+    db = FakePg(fail_copies={2})
+    with pytest.raises(RuntimeError):
+        _ingest(db, data_dir, batch_size=5)
+    # The first batch committed its rows, but a file is only recorded with the batch carrying its last row
+    assert len(db.raw) == 5
+    assert db.manifest == {}
+
+    db.fail_copies = set()
+    assert _ingest(db, data_dir, batch_size=5) == 8
+    assert len(db.raw) == 13 and len(db.manifest) == 3
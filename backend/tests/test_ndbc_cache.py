@@ -0,0 +1,63 @@
+import os
+
+import pandas as pd
+
+from fake_ndbc import FakeNdbcApi
+from ndbc_cache import CachedNdbcApi
+
+def _files(cache_dir):
+    return sorted(name for _, _, names in os.walk(cache_dir) for name in names)
+
+def _last_two_days():
+    now = pd.Timestamp.now(tz="UTC")
+    return now - pd.Timedelta(days=2), now - pd.Timedelta(days=1)
+
+def test_recent_periods_stay_open_until_the_close_lag_passes(tmp_path):
+    start, end = _last_two_days()
+    api = FakeNdbcApi()
+    # A lag longer than the request's age: nothing it touched is final yet
+    cache = CachedNdbcApi(api, cache_dir=str(tmp_path), close_lag=10 * 86400)
+    cache.get_data(station_id="46050", mode="stdmet", start_time=start, end_time=end)
+    assert _files(tmp_path) and all(name.endswith(".open.parquet") for name in _files(tmp_path))
+
+    # Within the open TTL the .open files are still served
+    cache.get_data(station_id="46050", mode="stdmet", start_time=start, end_time=end)
+    assert len(api.calls) == 1
+
+    # Once past the lag, the periods are refetched once and stored as closed
+    closing = CachedNdbcApi(api, cache_dir=str(tmp_path), close_lag=0)
+    closing.get_data(station_id="46050", mode="stdmet", start_time=start, end_time=end)
+    assert len(api.calls) == 2
+    assert _files(tmp_path) and not any(name.endswith(".open.parquet") for name in _files(tmp_path))
+    closing.get_data(station_id="46050", mode="stdmet", start_time=start, end_time=end)
+    assert len(api.calls) == 2
+
+def test_empty_frames_are_not_stored_as_closed(tmp_path):
+    start, end = _last_two_days()
+
+    class EmptyApi:
+        calls = 0
+
+        def get_data(self, **kwargs):
+            self.calls += 1
+            return pd.DataFrame()
+
+    api = EmptyApi()
+    cache = CachedNdbcApi(api, cache_dir=str(tmp_path), open_ttl=0, close_lag=0)
+    assert cache.get_data(station_id="46050", mode="stdmet", start_time=start, end_time=end).empty
+    assert all(name.endswith(".open.parquet") for name in _files(tmp_path))
+
+    # An outage is retried rather than served from disk forever
+    cache.get_data(station_id="46050", mode="stdmet", start_time=start, end_time=end)
+    assert api.calls == 2
+
+def test_failing_station_is_skipped_in_multi_station_calls(tmp_path):
+    start, end = _last_two_days()
+    api = FakeNdbcApi(failures={"46059": "HTTP 404 from NDBC"})
+    cache = CachedNdbcApi(api, cache_dir=str(tmp_path))
+    df = cache.get_data(station_ids=["46050", "46059", "46027"], modes=["stdmet", "cwind"],
+                        start_time=start, end_time=end)
+
+    assert sorted(df.index.get_level_values("station_id").unique()) == ["46027", "46050"]
+    # Nothing is cached for the failed station, so the next run asks again
+    assert not (tmp_path / "46059").exists()
@@ -0,0 +1,77 @@
+import pandas as pd
+import pytest
+
+import pred_weather_tables as pwt
+from fake_ndbc import FakeNdbcApi
+from fake_warehouse import FakeWarehouse
+
+AIR = pwt._full_table_id(pwt.BQ_TABLE_AIR)
+WATER = pwt._full_table_id(pwt.BQ_TABLE_WATER)
+
+def _warehouse():
+    keys = ["station_id", "time_utc"]
+    return FakeWarehouse({AIR: keys + pwt.AIR_COLS + ["ingested_at"],
+                          WATER: keys + pwt.OCEAN_COLS + ["ingested_at"]})
+
+@pytest.fixture
+def window(monkeypatch):
+    """Pin the load window to the two days before a fixed 10-minute mark; returns a setter for END."""
+    end = pd.Timestamp.now(tz="UTC").floor("10min") - pd.Timedelta(hours=2)
+    monkeypatch.setattr(pwt, "START", (end - pd.Timedelta(days=2)).isoformat())
+
+    def set_end(value):
+        monkeypatch.setattr(pwt, "END", value.isoformat())
+        return value
+
+    set_end(end)
+    return set_end
+
+def test_second_run_with_nothing_new_merges_nothing(window):
+    warehouse, api = _warehouse(), FakeNdbcApi()
+    assert pwt.main(warehouse=warehouse, api=api, full_reload=False) > 0
+    merges = list(warehouse.merges)
+    assert [table for table, _ in merges] == [AIR, WATER]
+
+    assert pwt.main(warehouse=warehouse, api=api, full_reload=False) == 0
+    assert warehouse.merges == merges
+
+def test_delta_is_trimmed_to_rows_past_the_marks(window):
+    end = pd.Timestamp(pwt.END)
+    warehouse, api = _warehouse(), FakeNdbcApi()
+    pwt.main(warehouse=warehouse, api=api, full_reload=False)
+    marks = warehouse.high_water_marks(AIR, pwt.OCEAN_STATIONS)
+
+    window(end + pd.Timedelta(hours=1))
+    api.calls.clear()
+    written = pwt.main(warehouse=warehouse, api=api, full_reload=False)
+
+    # Only the new hour is fetched and staged: six 10-minute air rows and one :10 ocean row per station
+    assert all(pwt._utc(call["start_time"]) >= end - pd.Timedelta(hours=1) for call in api.calls)
+    assert warehouse.merges[-2:] == [(AIR, 6 * len(pwt.OCEAN_STATIONS)), (WATER, len(pwt.OCEAN_STATIONS))]
+    assert written == 7 * len(pwt.OCEAN_STATIONS)
+    for table in (AIR, WATER):
+        assert not warehouse.tables[table].duplicated(["station_id", "time_utc"]).any()
+    assert all(ts == end for ts in marks.values())
+
+    # Same tables as one load over the whole window
+    fresh = _warehouse()
+    pwt.main(warehouse=fresh, api=FakeNdbcApi(), full_reload=False)
+    for table in (AIR, WATER):
+        assert len(fresh.tables[table]) == len(warehouse.tables[table])
+
+def test_cold_station_does_not_pull_the_others_back_to_start(window, monkeypatch):
+    end = pd.Timestamp(pwt.END)
+    warm, cold = pwt.OCEAN_STATIONS[:-1], pwt.OCEAN_STATIONS[-1]
+    warehouse, api = _warehouse(), FakeNdbcApi()
+    monkeypatch.setattr(pwt, "OCEAN_STATIONS", warm)
+    pwt.main(warehouse=warehouse, api=api, full_reload=False)
+
+    monkeypatch.setattr(pwt, "OCEAN_STATIONS", warm + [cold])
+    window(end + pd.Timedelta(hours=1))
+    api.calls.clear()
+    pwt.main(warehouse=warehouse, api=api, full_reload=False)
+
+    starts = {call["station_id"]: pwt._utc(call["start_time"]) for call in api.calls}
+    assert starts[cold] == pwt._utc(pwt.START)
+    assert all(starts[stn] >= end - pd.Timedelta(hours=1) for stn in warm)
+    assert (warehouse.tables[AIR]["station_id"] == cold).sum() > 6 * 24
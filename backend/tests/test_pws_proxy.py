@@ -0,0 +1,97 @@
+import time
+
+from fake_twc import CURRENT_PATH
+from pws_proxy import PWSCurrentCache
+
+def _cache(fake_twc, **kwargs):
+    kwargs.setdefault("ttl", 0.2)
+    kwargs.setdefault("stale_ttl", 30)
+    return PWSCurrentCache("test-key", base_url=fake_twc.base_url, timeout=2, **kwargs)
+
+def _wait_for_refresh(cache, station_id, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while station_id in cache._in_flight and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+def test_stale_hit_on_healthy_upstream_is_not_a_fallback(fake_twc):
+    cache = _cache(fake_twc)
+    result, status = cache.get("KTEST1")
+    assert status == 200 and result["fallback"] is False and result["stale"] is False
+
+    time.sleep(0.3)  # past the TTL
+    result, status = cache.get("KTEST1")
+    assert status == 200
+    assert result["stale"] is True and result["fallback"] is False
+    assert result["age_seconds"] >= 0.3
+
+    _wait_for_refresh(cache, "KTEST1")
+    result, _ = cache.get("KTEST1")
+    assert result["stale"] is False and result["fallback"] is False
+
+def test_concurrent_misses_share_one_upstream_call(fake_twc):
+    from concurrent.futures import ThreadPoolExecutor
+
+    fake_twc.delay = 0.3
+    cache = _cache(fake_twc, ttl=60)
+    with ThreadPoolExecutor(max_workers=20) as pool:
+        results = list(pool.map(lambda _: cache.get("KTEST1"), range(20)))
+
+    assert len(fake_twc.calls_to(CURRENT_PATH)) == 1
+    assert all(status == 200 and result["temp"] == 41.5 for result, status in results)
+    assert cache.stats()["coalesced"] == 19
+
+def _refresh_after_ttl(cache, station_id):
+    time.sleep(0.3)
+    cache.get(station_id)  # stale hit; starts the refresh
+    _wait_for_refresh(cache, station_id)
+    return cache.get(station_id)
+
+def test_204_falls_back_to_last_good_observation(fake_twc):
+    cache = _cache(fake_twc)
+    assert cache.get("KTEST1")[0]["fallback"] is False
+
+    fake_twc.respond(CURRENT_PATH, (204, {}, None))
+    result, status = _refresh_after_ttl(cache, "KTEST1")
+    assert status == 200
+    assert result["fallback"] is True and result["expired"] is True
+    assert result["temp"] == 41.5
+
+def test_500_falls_back_and_masks_the_api_key(fake_twc):
+    cache = _cache(fake_twc)
+    cache.get("KTEST1")
+
+    fake_twc.respond(CURRENT_PATH, (500, {}, None))
+    result, status = _refresh_after_ttl(cache, "KTEST1")
+    assert status == 200
+    assert result["fallback"] is True and result["temp"] == 41.5
+    assert cache.stats()["upstream_errors"] == 1
+
+    # Nothing to fall back on: the error itself, without the key from the URL
+    result, status = cache.get("KOTHER")
+    assert "error" in result and result["expired"] is True
+    assert "test-key" not in result["detail"]
+
+def test_get_many_waits_only_until_the_deadline(fake_twc):
+    observe = fake_twc.default
+
+    def slow_for_kslow(path, params):
+        if params.get("stationId") == "KSLOW":
+            time.sleep(1.0)
+        return observe(path, params)
+
+    fake_twc.default = slow_for_kslow
+    cache = _cache(fake_twc, ttl=60)
+    start = time.monotonic()
+    results = cache.get_many(["KFAST", "KSLOW", "KFAST"], deadline=0.3)
+    elapsed = time.monotonic() - start
+
+    assert elapsed < 0.8
+    assert list(results) == ["KFAST", "KSLOW"]
+    assert results["KFAST"][1] == 200 and results["KFAST"][0]["station_id"] == "KFAST"
+    assert results["KSLOW"][1] == 504 and results["KSLOW"][0]["expired"] is True
+
+    # The slow fetch carried on in the background and warmed the cache
+    _wait_for_refresh(cache, "KSLOW")
+    result, status = cache.get("KSLOW")
+    assert status == 200 and result["station_id"] == "KSLOW"
+    assert len(fake_twc.calls_to(CURRENT_PATH)) == 2
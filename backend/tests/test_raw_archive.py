@@ -0,0 +1,51 @@
+import json
+import os
+from datetime import datetime, timedelta
+
+import pytest
+
+pytest.importorskip("pyarrow")
+
+import raw_archive  # noqa: E402
+from field_extractor import compile_extractor  # noqa: E402
+
+EXTRACT = compile_extractor({"epoch": "epoch", "imperial.tempAvg": "avg_temp"})
+
+def _window(path, start, hours, temp=50.0):
+    obs = []
+    for i in range(hours):
+        t = start + timedelta(hours=i)
+        obs.append({"stationID": "KTEST1", "obsTimeLocal": t.strftime("%Y-%m-%d %H:%M:%S"),
+                    "epoch": int(t.timestamp()), "imperial": {"tempAvg": temp}})
+    with open(path, "w") as f:
+        json.dump({"observations": obs}, f)
+    return str(path)
+
+def _parquet_files(archive_dir):
+    return sorted(os.path.relpath(os.path.join(root, name), archive_dir)
+                  for root, _, names in os.walk(archive_dir) for name in names if name.endswith(".parquet"))
+
+def test_overlapping_windows_do_not_duplicate_rows(tmp_path):
+    archive_dir = str(tmp_path / "archive")
+    # Two windows a day apart, as the rolling now-365d fetch produces; they share 24 hours
+    first = _window(tmp_path / "w1.json", datetime(2025, 1, 31, 0), 48, temp=50.0)
+    second = _window(tmp_path / "w2.json", datetime(2025, 2, 1, 0), 48, temp=60.0)
+    raw_archive.compact_archive([first, second], EXTRACT, data_dir=str(tmp_path), archive_dir=archive_dir)
+
+    df = raw_archive.read_archive(["KTEST1"], archive_dir=archive_dir)
+    assert len(df) == 72
+    assert not df.duplicated(["station_id", "local_time"]).any()
+    # The later window's values win on the overlap
+    overlap = df[df["local_time"] == datetime(2025, 2, 1, 12)]
+    assert overlap["avg_temp"].tolist() == [60.0]
+    assert _parquet_files(archive_dir) == [
+        os.path.join("station_id=KTEST1", "year=2025", "month=1", raw_archive.PARTITION_FILE),
+        os.path.join("station_id=KTEST1", "year=2025", "month=2", raw_archive.PARTITION_FILE),
+    ]
+
+def test_forced_recompaction_is_idempotent(tmp_path):
+    archive_dir = str(tmp_path / "archive")
+    window = _window(tmp_path / "w1.json", datetime(2025, 3, 1), 24)
+    for _ in range(2):
+        raw_archive.compact_archive([window], EXTRACT, data_dir=str(tmp_path), archive_dir=archive_dir, force=True)
+    assert len(raw_archive.read_archive(archive_dir=archive_dir)) == 24
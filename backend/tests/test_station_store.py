@@ -0,0 +1,17 @@
+import numpy as np
+import pandas as pd
+
+from station_store import StationStore, frame_to_records, record_dtype
+
+def _frame(epochs):
+    times = pd.date_range("2025-03-01", periods=len(epochs), freq="h")
+    return pd.DataFrame({"epoch": epochs, "local_time": times, "avg_temp": np.arange(len(epochs), dtype=float)})
+
+def test_rows_without_an_epoch_are_dropped(tmp_path):
+    dtype = record_dtype(["epoch", "local_time", "avg_temp"])
+    records = frame_to_records(_frame([1740819600, None, 1740826800, 1740819600]), dtype)
+    assert records["epoch"].tolist() == [1740819600, 1740826800]
+
+    store = StationStore(root=str(tmp_path), stride=2)
+    assert store.append("KTEST1", records) == 2
+    assert store.read_frame("KTEST1", columns=["avg_temp"])["avg_temp"].tolist() == [0.0, 2.0]
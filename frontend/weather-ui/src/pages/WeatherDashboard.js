@@ -65,22 +65,30 @@ function WeatherDashboard() {
     const newGraphs = {};
     const newCurrent = {};
 
-    await Promise.all(
-      selectedStations.map(async (station) => {
-        try {
-          const [graphRes, currentRes] = await Promise.all([
-            axios.get(`${API_BASE}/api/graph_data?station_id=${station}&period=${selectedPeriod}&column=${selectedMetric}`),
-            axios.get(`${API_BASE}/api/current_data_live?station_id=${station}`)
-          ]);
-
-          newGraphs[station] = graphRes.data;
-          newCurrent[station] = currentRes.data;
-
-        } catch (err) {
-          console.error(`Fetch failed for ${station}:`, err.message);
-        }
+    // One batch request for every selected station's series
+    const graphRequest = axios
+      .get(`${API_BASE}/api/graph_batch?station_ids=${selectedStations.join(',')}&period=${selectedPeriod}&columns=${selectedMetric}`)
+      .then((graphRes) => {
+        Object.entries(graphRes.data.series || {}).forEach(([station, series]) => {
+          newGraphs[station] = {
+            timestamps: series.timestamps,
+            values: series.values[selectedMetric] || []
+          };
+        });
       })
-    );
+      .catch((err) => console.error('Graph fetch failed:', err.message));
+
+    // Current conditions for every station in one call; slow stations come back flagged
+    const currentRequest = axios
+      .get(`${API_BASE}/api/pws_current_batch?station_ids=${selectedStations.join(',')}`)
+      .then((currentRes) => {
+        Object.entries(currentRes.data.stations || {}).forEach(([station, current]) => {
+          newCurrent[station] = { ...current, timestamp: current.timestamp_local };
+        });
+      })
+      .catch((err) => console.error('Current conditions fetch failed:', err.message));
+
+    await Promise.all([graphRequest, currentRequest]);
 
     setGraphSeries(newGraphs);
     setCurrentData(newCurrent);